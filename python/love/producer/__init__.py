@@ -25,11 +25,18 @@ except ImportError:
     __version__ = "?"
 
 from .love_manager_client import *
+from .love_manager_compression import *
+from .love_manager_encoder import *
 from .love_manager_message import *
+from .love_manager_send_queue import *
+from .love_manager_spool import *
 from .love_producer_base import *
 from .love_producer_csc import *
 from .love_producer_factory import *
 from .love_producer_script_queue import *
 from .love_producer_set import *
+from .love_producer_supervisor import *
 from .love_producer_watcher import *
+from .love_topic_delta import *
+from .love_topic_serializer import *
 from .producer_utils import *
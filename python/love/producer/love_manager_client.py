@@ -25,9 +25,33 @@ import json
 import logging
 import os
 import textwrap
-from typing import Optional
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple, Union
 
 import aiohttp
+from love.producer.love_manager_compression import (
+    CompressionStats,
+    DeflateCompressionEstimator,
+    ZstdMessageCompressor,
+)
+from love.producer.love_manager_encoder import (
+    MessageEncoder,
+    MsgpackMessageEncoder,
+    get_message_encoder,
+)
+from love.producer.love_manager_send_queue import (
+    BackpressureMonitor,
+    InitialDataScheduler,
+    MessageBatcher,
+    MessagePriority,
+    QueueMarker,
+    SendQueue,
+    get_message_priority,
+    tag_message,
+)
+from love.producer.love_manager_spool import MessageSpool
+from love.producer.love_producer_base import LoveProducerBase
 from love.producer.love_producer_factory import LoveProducerFactory
 
 from .producer_utils import ConnectedTaskDoneError
@@ -50,11 +74,123 @@ class LoveManagerClient:
         self.connected_task: Optional[asyncio.Future] = None
         self.done_task: Optional[asyncio.Future] = None
         self._register_producers_loop_task: Optional[asyncio.Task] = None
+        self._send_queue_writer_task: Optional[asyncio.Task] = None
+        self._spool_replay_task: Optional[asyncio.Task] = None
+        self._initial_data_task: Optional[asyncio.Task] = None
+        self._resume_reply: Optional[asyncio.Future] = None
 
         self.producers: list = []
+        # Producers that may reply to requests from the manager, indexed by
+        # (csc, salindex, stream). None matches any salindex or stream.
+        self._reply_routes: Dict[tuple, list] = dict()
+        # SAL indices in the routes of each csc.
+        self._reply_salindices: Dict[str, list] = dict()
+        # Identical requests received within this window (seconds) are
+        # answered only once; replies are broadcast by the manager to every
+        # subscriber of the stream.
+        self.reply_coalesce_window: float = float(
+            os.environ.get("LOVE_PRODUCER_REPLY_COALESCE_WINDOW", "0.5")
+        )
+        self._recent_requests: Dict[str, float] = dict()
+        self.coalesced_requests: int = 0
+
+        # Categories of the messages from the manager handled by the client,
+        # other messages are discarded before parsing them.
+        self.handled_categories: Tuple[str, ...] = ("initial_state", "resume")
+        # Requests from the manager are handled concurrently, up to
+        # max_concurrent_replies at a time and in order for each producer.
+        # 0 handles them one at a time, in order.
+        self.max_concurrent_replies: int = int(
+            os.environ.get("LOVE_PRODUCER_MAX_CONCURRENT_REPLIES", "8")
+        )
+        self.max_pending_requests: int = 256
+        self._reply_semaphore: Optional[asyncio.Semaphore] = None
+        self._producer_reply_locks: Dict[int, asyncio.Lock] = dict()
+        self._request_tasks: set = set()
 
         self._send_message_lock = asyncio.Lock()
 
+        self.conflate: bool = os.environ.get(
+            "LOVE_PRODUCER_CONFLATE", "True"
+        ).lower() in ("true", "1")
+        self.send_queue = SendQueue(conflate=self.conflate)
+        self.backpressure = BackpressureMonitor.from_config(
+            os.environ.get("LOVE_PRODUCER_BACKPRESSURE", "")
+        )
+        self.backpressure.add_callback(self.handle_backpressure)
+        self._websocket_ready = asyncio.Event()
+        self.batcher = MessageBatcher.from_config(
+            os.environ.get("LOVE_PRODUCER_BATCH", "")
+        )
+
+        spool_path = os.environ.get("LOVE_PRODUCER_SPOOL_PATH", "")
+        self.spool: Optional[MessageSpool] = (
+            MessageSpool(
+                spool_path,
+                size=int(os.environ.get("LOVE_PRODUCER_SPOOL_SIZE", "16777216")),
+                log=self.log,
+            )
+            if spool_path
+            else None
+        )
+        self.spool_replay_rate: float = float(
+            os.environ.get("LOVE_PRODUCER_SPOOL_REPLAY_RATE", "50")
+        )
+        # Priority classes that spilled messages to the spool; their
+        # messages that must be delivered are spooled, behind the spilled
+        # ones, until the spool is drained.
+        self._spilled_priorities: set = set()
+
+        self.resume: bool = os.environ.get("LOVE_PRODUCER_RESUME", "False").lower() in (
+            "true",
+            "1",
+        )
+        self.session: str = uuid.uuid4().hex
+
+        self.bulk_snapshot: bool = os.environ.get(
+            "LOVE_PRODUCER_BULK_SNAPSHOT", "False"
+        ).lower() in ("true", "1")
+        self.snapshot_byte_budget: int = int(
+            os.environ.get("LOVE_PRODUCER_SNAPSHOT_BYTE_BUDGET", "1048576")
+        )
+        self.initial_data_scheduler = InitialDataScheduler(
+            bytes_per_second=float(
+                os.environ.get("LOVE_PRODUCER_INITIAL_DATA_RATE", "0")
+            ),
+            backpressure=self.backpressure,
+        )
+        self.time_to_initial_data: Optional[float] = None
+        self._initial_data_start: float = 0.0
+        self._initial_data_marker: Optional[QueueMarker] = None
+        self.resume_timeout: float = 5.0
+
+        self.wire_format: str = os.environ.get("LOVE_PRODUCER_WIRE_FORMAT", "json")
+        self.connection_wire_format: str = "json"
+        # Encoder of the messages built by the client itself, following the
+        # wire format negotiated for the connection.
+        self.encoder: MessageEncoder = get_message_encoder()
+        self.binary_encoder: Optional[MessageEncoder] = (
+            MsgpackMessageEncoder() if MsgpackMessageEncoder.is_available() else None
+        )
+
+        if self.wire_format != "json" and self.binary_encoder is None:
+            self.log.warning(
+                f"Wire format {self.wire_format} requested but MessagePack is not "
+                "installed. Using json."
+            )
+
+        self.compression: str = os.environ.get("LOVE_PRODUCER_COMPRESSION", "none")
+        self.connection_compression: str = "none"
+        self.compressor: Optional[ZstdMessageCompressor] = None
+        self.deflate_estimator: Optional[DeflateCompressionEstimator] = None
+        self._zstd_compressors: dict = dict()
+
+        if self.compression == "zstd" and not ZstdMessageCompressor.is_available():
+            self.log.warning(
+                "zstd compression requested but zstandard is not installed. "
+                "Sending uncompressed messages."
+            )
+
     async def handle_connection_with_manager(self) -> None:
         """Keep connection to manager alive and handle incomming requests.
         If connection is closed try to reconnect until process is stopped.
@@ -92,7 +228,13 @@ class LoveManagerClient:
         while not self.done_task.done():
             try:
                 async with aiohttp.ClientSession() as session:
-                    self.websocket = await session.ws_connect(self.url)
+                    self.websocket = await session.ws_connect(
+                        self.url,
+                        protocols=self.websocket_protocols,
+                        compress=15 if self.compression == "deflate" else 0,
+                    )
+                    self.handle_wire_format()
+                    await self.handle_compression()
 
                     if self.connected_task.done():
                         raise ConnectedTaskDoneError(
@@ -100,8 +242,16 @@ class LoveManagerClient:
                         )
                     else:
                         self.connected_task.set_result(True)
+                        # Drop what was left from the previous connection,
+                        # except for the messages that must be delivered.
+                        self.send_queue.clear(keep_must_deliver=True)
+                        self.batcher.clear()
+                        self._websocket_ready.set()
 
-                        yield connection_attempt
+                        try:
+                            yield connection_attempt
+                        finally:
+                            self._websocket_ready.clear()
 
                         connection_attempt = 0
             except (
@@ -122,6 +272,136 @@ class LoveManagerClient:
                 )
                 await self.handle_wait_retry()
 
+    def handle_wire_format(self) -> None:
+        """Set the producers message encoder according to the wire format
+        negotiated with the manager for the current connection.
+
+        The binary format is requested with a websocket subprotocol. It is
+        only used if the manager accepts it in the handshake, otherwise
+        messages are sent as json.
+        """
+        wire_format, _ = self.negotiated_protocol
+
+        if wire_format == self.connection_wire_format:
+            return
+
+        self.log.info(f"Using {wire_format} wire format.")
+
+        encoder = (
+            self.binary_encoder
+            if wire_format == MsgpackMessageEncoder.name
+            else get_message_encoder()
+        )
+
+        for producer in self.producers:
+            producer.set_message_encoder(encoder)
+
+        self.encoder = encoder
+        self.connection_wire_format = wire_format
+
+    async def handle_compression(self) -> None:
+        """Set up compression of the messages sent to the manager for the
+        current connection.
+
+        permessage-deflate is negotiated by the websocket library itself. zstd
+        is requested with a websocket subprotocol and, when the manager accepts
+        it, the dictionary used to compress the messages is sent (uncompressed)
+        before any other message. The dictionary is trained from the message
+        templates of the producers and kept for subsequent connections.
+        """
+        compression = (
+            "deflate" if self.websocket.compress else self.negotiated_protocol[1]
+        )
+
+        if compression != self.connection_compression:
+            self.log.info(f"Using {compression} compression.")
+
+        self.connection_compression = compression
+        self.compressor = None
+
+        if compression == ZstdMessageCompressor.name:
+            async with self._send_message_lock:
+                self.compressor = self.get_zstd_compressor()
+                await self.websocket.send_str(self.compressor.get_dictionary_message())
+        elif compression == "deflate" and self.deflate_estimator is None:
+            self.deflate_estimator = DeflateCompressionEstimator()
+
+    def get_zstd_compressor(self) -> ZstdMessageCompressor:
+        """Return the zstd compressor for the current wire format.
+
+        Returns
+        -------
+        `ZstdMessageCompressor`
+            Compressor, with a dictionary trained from the producers
+            compression samples.
+        """
+        if self.connection_wire_format not in self._zstd_compressors:
+            samples = [
+                sample.encode() if isinstance(sample, str) else sample
+                for producer in self.producers
+                for sample in producer.get_compression_samples()
+            ]
+            self.log.debug(f"Training zstd dictionary with {len(samples)} samples.")
+            self._zstd_compressors[self.connection_wire_format] = ZstdMessageCompressor(
+                samples, log=self.log
+            )
+
+        return self._zstd_compressors[self.connection_wire_format]
+
+    def report_compression_stats(self) -> None:
+        """Log the compression ratio and cost for the current connection."""
+        if self.compression_stats is not None:
+            self.log.info(f"Compression stats: {self.compression_stats}")
+
+    def report_send_queue_stats(self) -> None:
+        """Log the send queue depth, wait times and drops, and the number of
+        batched messages.
+        """
+        self.log.info(
+            f"Send queue stats: {self.send_queue.get_stats()}; "
+            f"batches sent: {self.batcher.batches_sent} "
+            f"({self.batcher.messages_batched} messages); "
+            f"backpressure: {self.backpressure.get_stats()}; "
+            f"coalesced requests: {self.coalesced_requests}."
+        )
+
+    def get_write_buffer_size(self) -> int:
+        """Return the number of bytes in the websocket transport write
+        buffer, 0 if not connected.
+        """
+        transport = getattr(getattr(self.websocket, "_writer", None), "transport", None)
+        if transport is None or transport.is_closing():
+            return 0
+        return transport.get_write_buffer_size()
+
+    def update_backpressure(self) -> None:
+        """Update the backpressure state from the size of the send queue and
+        the websocket transport write buffer.
+        """
+        self.backpressure.update(self.send_queue.nbytes + self.get_write_buffer_size())
+
+    def handle_backpressure(self, active: bool) -> None:
+        """Handle backpressure being activated or released.
+
+        Under backpressure, messages of the same data stream are conflated in
+        the send queue even if conflation is disabled.
+
+        Parameters
+        ----------
+        active : `bool`
+            Is backpressure active?
+        """
+        self.send_queue.conflate = self.conflate or active
+        if active:
+            self.log.warning(
+                f"Manager is not keeping up: {self.backpressure.pending_bytes} bytes "
+                "pending. Reducing data rate."
+            )
+        else:
+            self.log.info(
+                f"Backpressure released: {self.backpressure.pending_bytes} bytes pending."
+            )
+
     async def handle_wait_retry(self) -> None:
         """Handle retrying to connect to manager."""
         if self.connected_task.done():
@@ -154,9 +434,43 @@ class LoveManagerClient:
                 self._register_producers_loop()
             )
 
-        await self._send_initial_data()
+        if self._send_queue_writer_task is None or self._send_queue_writer_task.done():
+            self.log.debug("Creating send_queue_writer_task.")
+            self._send_queue_writer_task = asyncio.create_task(
+                self._send_queue_writer()
+            )
+
+        for task in (self._initial_data_task, self._spool_replay_task):
+            if task is not None:
+                task.cancel()
+        self._initial_data_task = asyncio.create_task(self._synchronize_manager())
+
         await self._handle_message_reception()
 
+    async def _synchronize_manager(self) -> None:
+        """Bring the manager up to date after connecting.
+
+        The topic schemas are sent first, once per connection, so the manager
+        can read the payloads that follow. Messages spooled while
+        disconnected are replayed next, so the stale events they hold are
+        sent before, and do not overwrite, the current state. Then the
+        connection is resumed, if `resume` is set, or all initial data is
+        sent.
+        """
+        await self._send_schemas()
+
+        if self.spool is not None and len(self.spool) > 0:
+            self._spool_replay_task = asyncio.create_task(self._replay_spool())
+            await self._spool_replay_task
+
+            if not self._websocket_ready.is_set():
+                return
+
+        if self.resume:
+            await self._resume_connection()
+        else:
+            await self._send_initial_data()
+
     async def _register_producers_loop(self) -> None:
         """Register producers with the manager periodically."""
         while not self.done_task.done():
@@ -168,18 +482,311 @@ class LoveManagerClient:
                         initial_state_message
                     ) in producer.get_initial_state_messages_as_json():
                         await self.send_message(initial_state_message)
+                self.report_compression_stats()
+                self.report_send_queue_stats()
                 await asyncio.sleep(self.register_initial_data_wait_time)
             except Exception as e:
                 self.log.exception(f"Error in register_producers_loop: {e}")
 
-    async def _send_initial_data(self) -> None:
-        """Send initial data from producers."""
+    async def _send_queue_writer(self) -> None:
+        """Send the messages in the send queue to the manager, while
+        connected.
+        """
+        loop = asyncio.get_running_loop()
+
+        while not self.done_task.done():
+            try:
+                await self._websocket_ready.wait()
+
+                deadline = self.batcher.next_deadline
+                message = await self.send_queue.get(
+                    timeout=(
+                        max(deadline - loop.time(), 0.0)
+                        if deadline is not None
+                        else None
+                    )
+                )
+
+                ready_messages = (
+                    self.batcher.add(message, loop.time())
+                    if message is not None
+                    else []
+                )
+                ready_messages += self.batcher.pop_expired(loop.time())
+
+                for ready_message in ready_messages:
+                    if isinstance(ready_message, QueueMarker):
+                        # Markers of earlier connections are discarded.
+                        if ready_message is self._initial_data_marker:
+                            self.handle_initial_data_sent()
+                    else:
+                        await self.write_message(ready_message)
+
+                self.update_backpressure()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.log.exception(f"Error in send_queue_writer: {e}")
+
+    async def _resume_connection(self) -> None:
+        """Resume the connection with the manager, sending only the data it
+        missed.
+
+        The manager is asked for the last sequence number it received from
+        each data stream of this producer session. Producers then send only
+        the stored samples with newer sequence numbers. If the manager does
+        not know the session (e.g. the producer or the manager restarted),
+        does not reply within `resume_timeout` or replies with invalid
+        streams, all initial data is sent.
+        """
+        self._resume_reply = asyncio.get_running_loop().create_future()
+
+        await self.send_message(
+            self.encoder.dumps(
+                dict(
+                    category="resume",
+                    option="request",
+                    session=self.session,
+                    producer_snd=time.time(),
+                )
+            )
+        )
 
+        try:
+            reply = await asyncio.wait_for(self._resume_reply, self.resume_timeout)
+        except asyncio.TimeoutError:
+            self.log.warning(
+                f"No resume reply from manager after {self.resume_timeout}s. "
+                "Sending initial data."
+            )
+            await self._send_initial_data()
+            return
+        finally:
+            self._resume_reply = None
+
+        if reply.get("session", None) != self.session:
+            self.log.info(
+                "Manager has no history of this session. Sending initial data."
+            )
+            await self._send_initial_data()
+            return
+
+        try:
+            last_sequences = {
+                (stream["csc"], stream["salindex"], stream["stream"]): int(
+                    stream["sequence"]
+                )
+                for stream in reply.get("streams", [])
+            }
+        except (KeyError, TypeError, ValueError):
+            self.log.warning(
+                f"Invalid resume reply from manager: {reply}. Sending initial data."
+            )
+            await self._send_initial_data()
+            return
+
+        sent = 0
         for producer in self.producers:
-            self.log.debug(
-                f"Sending initial data for {producer.component_name} producer."
+            sent += await producer.send_missed_data(last_sequences)
+
+        self.log.info(f"Resumed connection with manager; sent {sent} missed samples.")
+
+    async def _replay_spool(self) -> None:
+        """Send the messages spooled while disconnected, oldest first.
+
+        Messages are replayed at most `spool_replay_rate` per second, and
+        not at all under backpressure or while the event class of the send
+        queue is full, so live traffic is not starved.
+        Replayed messages keep their original ``producer_snd``. Replays
+        after connecting are followed by the initial data, see
+        `_synchronize_manager`.
+        """
+        self.log.info(f"Replaying {len(self.spool)} spooled messages.")
+
+        replayed = 0
+
+        while self._websocket_ready.is_set() and len(self.spool) > 0:
+            if self.backpressure.active or self.send_queue.is_full(
+                MessagePriority.EVENT
+            ):
+                await asyncio.sleep(1.0 / self.spool_replay_rate)
+                continue
+
+            message = self.spool.pop()
+
+            if isinstance(message, bytes) and self.connection_wire_format == "json":
+                self.log.warning(
+                    "Dropping spooled binary message: manager does not accept "
+                    "the binary wire format."
+                )
+                continue
+
+            self.send_queue.put_nowait(
+                tag_message(message, MessagePriority.EVENT, must_deliver=True)
             )
-            await producer.send_initial_data()
+            replayed += 1
+
+            await asyncio.sleep(1.0 / self.spool_replay_rate)
+
+        self.spool.flush()
+        if len(self.spool) == 0:
+            self._spilled_priorities.clear()
+        self.log.info(f"Replayed {replayed} spooled messages; {len(self.spool)} left.")
+
+    def spool_message(self, message: Union[str, bytes]) -> bool:
+        """Spool a message that must be delivered, to be sent once
+        connected to the manager.
+
+        Parameters
+        ----------
+        message : `str` or `bytes`
+            Message.
+
+        Returns
+        -------
+        `bool`
+            `True` if the message was spooled, `False` if no spool is
+            configured or the message is not flagged as ``must_deliver``.
+        """
+        if self.spool is None or not getattr(message, "must_deliver", False):
+            return False
+        return self.spool.append(message)
+
+    async def _send_schemas(self) -> None:
+        """Send schema messages from producers."""
+
+        for producer in self.producers:
+            for schema_message in producer.get_schema_messages_as_json():
+                await self.send_message(schema_message)
+
+    async def _send_initial_data(self) -> None:
+        """Send initial data from producers.
+
+        The initial data messages of all producers are ordered by importance
+        and paced by `initial_data_scheduler`. In bulk snapshot mode they are
+        first joined into a few large messages, see `join_snapshot`. The time
+        until all initial data is written to the websocket is measured and
+        stored in `time_to_initial_data`.
+        """
+        self._initial_data_start = asyncio.get_running_loop().time()
+
+        messages = self.initial_data_scheduler.order(
+            [
+                (name, message)
+                for producer in self.producers
+                for name, message in producer.get_initial_data_messages().items()
+            ]
+        )
+
+        if self.bulk_snapshot:
+            messages = self.get_initial_data_snapshot(messages)
+
+        await self.initial_data_scheduler.send(messages, self.send_message)
+
+        # Initial data messages are sent in order within their priority
+        # class, so the marker is dequeued after all of them.
+        self._initial_data_marker = QueueMarker(MessagePriority.EVENT)
+        await self.send_message(self._initial_data_marker)
+
+    def get_initial_data_snapshot(
+        self, messages: List[Union[str, bytes]]
+    ) -> List[Union[str, bytes]]:
+        """Join initial data messages into bulk snapshot messages.
+
+        Messages with the same envelope (category and producer metadata) are
+        joined into messages with several ``data`` entries, of up to
+        `snapshot_byte_budget` bytes. Snapshot messages are queued with
+        event priority, so they are sent interleaved with live traffic, and
+        are compressed like any other message.
+
+        Parameters
+        ----------
+        messages : `list` of `str` or `bytes`
+            Initial data messages.
+
+        Returns
+        -------
+        `list` of `str` or `bytes`
+            Snapshot messages, in order of their first message, followed by
+            the messages that could not be joined.
+        """
+        snapshot_parts: dict = dict()
+        other_messages = []
+
+        for message in messages:
+            parts = getattr(message, "parts", None)
+            if parts is None:
+                other_messages.append(message)
+            else:
+                snapshot_parts.setdefault(parts.envelope_key, []).append(parts)
+
+        snapshots = [
+            snapshot
+            for envelope_parts in snapshot_parts.values()
+            for snapshot in self.join_snapshot(envelope_parts)
+        ]
+
+        self.log.info(
+            f"Sending initial data snapshot: {len(messages) - len(other_messages)} "
+            f"samples in {len(snapshots)} messages "
+            f"({sum(len(snapshot) for snapshot in snapshots)} bytes)."
+        )
+
+        return snapshots + other_messages
+
+    def join_snapshot(self, envelope_parts: list) -> List[Union[str, bytes]]:
+        """Join messages with the same envelope into snapshot messages.
+
+        Each snapshot message keeps the ``producer_snd`` of its oldest
+        message, so the manager does not take stale samples for new ones.
+
+        Parameters
+        ----------
+        envelope_parts : `list` of `MessageParts`
+            Parts of the messages.
+
+        Returns
+        -------
+        `list` of `str` or `bytes`
+            Snapshot messages, of up to `snapshot_byte_budget` bytes (unless a
+            single payload is larger).
+        """
+        snapshots = []
+        chunk = []
+        chunk_size = 0
+
+        for parts in envelope_parts + [None]:
+            if len(chunk) > 0 and (
+                parts is None
+                or chunk_size + len(parts.payload) > self.snapshot_byte_budget
+            ):
+                first = chunk[0]
+                snapshots.append(
+                    tag_message(
+                        first.encoder.join_batch(
+                            first.prefix,
+                            [chunk_parts.payload for chunk_parts in chunk],
+                            min(chunk_parts.timestamp for chunk_parts in chunk),
+                            first.suffix,
+                        ),
+                        MessagePriority.EVENT,
+                    )
+                )
+                chunk = []
+                chunk_size = 0
+            if parts is not None:
+                chunk.append(parts)
+                chunk_size += len(parts.payload)
+
+        return snapshots
+
+    def handle_initial_data_sent(self) -> None:
+        """Record the time it took to send all initial data."""
+        self._initial_data_marker = None
+        self.time_to_initial_data = (
+            asyncio.get_running_loop().time() - self._initial_data_start
+        )
+        self.log.info(f"Initial data sent in {self.time_to_initial_data:.3f}s.")
 
     async def _handle_message_reception(self) -> None:
         """Handle message reception from LOVE manager.
@@ -193,17 +800,86 @@ class LoveManagerClient:
             self.log.debug("Start handling message reception...")
 
             async for message in self.websocket:
+                if not self.is_message_handled(message):
+                    continue
+
                 message_data = self.parse_websocket_message(message)
-                await self.handle_producers_reply_to_server(message_data)
+
+                if self.max_concurrent_replies > 0:
+                    await self.dispatch_message(message_data)
+                else:
+                    await self.handle_producers_reply_to_server(message_data)
 
         else:
             raise RuntimeError(
                 "No connection to manager. Run connect_to_manager before running handle_message_reception."
             )
 
+    def is_message_handled(self, websocket_message: aiohttp.WSMessage) -> bool:
+        """Check, without parsing it, if a message from the manager may be of
+        one of the `handled_categories`.
+
+        Parameters
+        ----------
+        websocket_message: `aiohttp.WSMessage`
+            Message received from the manager.
+
+        Returns
+        -------
+        `bool`
+            `False` if the message can be discarded.
+        """
+        if websocket_message.type == aiohttp.WSMsgType.TEXT:
+            return any(
+                category in websocket_message.data
+                for category in self.handled_categories
+            )
+        elif websocket_message.type == aiohttp.WSMsgType.BINARY:
+            return any(
+                category.encode() in websocket_message.data
+                for category in self.handled_categories
+            )
+        else:
+            return False
+
+    async def dispatch_message(self, message_data: dict) -> None:
+        """Handle a message from the manager in a background task.
+
+        Waits for a pending request to be handled if there are already
+        `max_pending_requests`, so the messages are not read faster than they
+        are handled.
+
+        Parameters
+        ----------
+        message_data: `dict`
+            Data payload from the message received from the server.
+        """
+        while len(self._request_tasks) >= self.max_pending_requests:
+            await asyncio.wait(self._request_tasks, return_when=asyncio.FIRST_COMPLETED)
+
+        task = asyncio.create_task(self.handle_producers_reply_to_server(message_data))
+        self._request_tasks.add(task)
+        task.add_done_callback(self.handle_request_task_done)
+
+    def handle_request_task_done(self, task: asyncio.Task) -> None:
+        """Forget a request task and log its error, if any.
+
+        Parameters
+        ----------
+        task : `asyncio.Task`
+            Task created by `dispatch_message`.
+        """
+        self._request_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.log.error(
+                "Error handling request from manager.", exc_info=task.exception()
+            )
+
     def parse_websocket_message(self, websocket_message: str) -> dict:
         """Parse input json message string to dictionary if message is of
-        type `aiohttp.WSMsgType.TEXT`, if not return empty dictionary.
+        type `aiohttp.WSMsgType.TEXT`, or MessagePack data if message is of
+        type `aiohttp.WSMsgType.BINARY` and the binary wire format is in use.
+        If not return empty dictionary.
 
         Parameters
         ----------
@@ -215,11 +891,15 @@ class LoveManagerClient:
         `dict`
             Resulting dictionary from parsing json string.
         """
-        return (
-            json.loads(websocket_message.data)
-            if websocket_message.type == aiohttp.WSMsgType.TEXT
-            else dict()
-        )
+        if websocket_message.type == aiohttp.WSMsgType.TEXT:
+            return json.loads(websocket_message.data)
+        elif (
+            websocket_message.type == aiohttp.WSMsgType.BINARY
+            and self.connection_wire_format == MsgpackMessageEncoder.name
+        ):
+            return self.binary_encoder.loads(websocket_message.data)
+        else:
+            return dict()
 
     async def handle_producers_reply_to_server(self, message_data: dict) -> None:
         """Given the input message data, handle any reply needed from the
@@ -233,16 +913,163 @@ class LoveManagerClient:
 
         self.log.debug(f"Received message from server: {message_data}")
 
+        if message_data.get("category", None) == "resume":
+            if self._resume_reply is not None and not self._resume_reply.done():
+                self._resume_reply.set_result(message_data)
+            return
+
         if self.need_reply_from_producers(message_data):
-            await asyncio.gather(
-                *[
-                    producer.reply_to_message_data(message_data)
-                    for producer in self.producers
-                ]
-            )
+            if self.coalesce_request(message_data):
+                self.log.debug("Request already answered recently.")
+                return
+            producers = self.get_reply_producers(message_data)
+            if len(producers) > 0:
+                await asyncio.gather(
+                    *[
+                        self.reply_in_order(producer, message_data)
+                        for producer in producers
+                    ]
+                )
+            else:
+                self.log.debug("No producer handles the request.")
         else:
             self.log.debug("No reply from producers needed.")
 
+    async def reply_in_order(
+        self, producer: LoveProducerBase, message_data: dict
+    ) -> None:
+        """Reply to a request from the manager with a producer, after its
+        replies to the previous requests.
+
+        At most `max_concurrent_replies` replies, from all producers, are
+        sent at the same time. Errors are logged, so they do not stop the
+        replies of other producers nor the message reception.
+
+        Parameters
+        ----------
+        producer : `LoveProducerBase`
+            Producer that replies.
+        message_data: `dict`
+            Data payload from the message received from the server.
+        """
+        if self.max_concurrent_replies <= 0:
+            await self._reply(producer, message_data)
+            return
+
+        if self._reply_semaphore is None:
+            self._reply_semaphore = asyncio.Semaphore(self.max_concurrent_replies)
+
+        lock = self._producer_reply_locks.setdefault(id(producer), asyncio.Lock())
+
+        async with lock, self._reply_semaphore:
+            await self._reply(producer, message_data)
+
+    async def _reply(self, producer: LoveProducerBase, message_data: dict) -> None:
+        try:
+            await producer.reply_to_message_data(message_data)
+        except Exception:
+            self.log.exception(
+                f"Error replying to request with {producer.component_name}."
+            )
+
+    def coalesce_request(self, message_data: dict) -> bool:
+        """Check if an identical request was received within the
+        `reply_coalesce_window`.
+
+        Parameters
+        ----------
+        message_data: `dict`
+            Data from the server to process.
+
+        Returns
+        -------
+        `bool`
+            `True` if the request was already received recently and does not
+            need a reply, `False` otherwise.
+        """
+        if self.reply_coalesce_window <= 0.0:
+            return False
+
+        now = time.monotonic()
+
+        # Requests are stored in the order they are received, so expired
+        # ones are at the beginning.
+        for key, timestamp in list(self._recent_requests.items()):
+            if now - timestamp < self.reply_coalesce_window:
+                break
+            del self._recent_requests[key]
+
+        try:
+            key = json.dumps(message_data.get("data"), sort_keys=True)
+        except (TypeError, ValueError):
+            return False
+
+        if key in self._recent_requests:
+            self.coalesced_requests += 1
+            return True
+
+        self._recent_requests[key] = now
+        return False
+
+    def add_reply_routes(self, producer: LoveProducerBase) -> None:
+        """Add the producer to the index of producers that may reply to
+        requests from the manager.
+
+        Parameters
+        ----------
+        producer : `LoveProducerBase`
+            Producer to add.
+        """
+        for route in producer.get_reply_routes():
+            producers = self._reply_routes.setdefault(route, [])
+            if producer not in producers:
+                producers.append(producer)
+            salindices = self._reply_salindices.setdefault(route[0], [])
+            if route[1] not in salindices:
+                salindices.append(route[1])
+
+    def get_reply_producers(self, message_data: dict) -> list:
+        """Return the producers that may reply to a request from the manager.
+
+        Requests without salindex are routed to the producers of every
+        salindex of the csc.
+
+        Parameters
+        ----------
+        message_data: `dict`
+            Data from the server to process.
+
+        Returns
+        -------
+        `list` of `LoveProducerBase`
+            Producers that may reply to the request.
+        """
+        try:
+            data = message_data["data"][0]
+            csc = data["csc"]
+            salindex = data.get("salindex", None)
+            stream = data.get("data", dict()).get("event_name", None)
+        except (KeyError, IndexError, TypeError, AttributeError):
+            return []
+
+        salindices = (
+            self._reply_salindices.get(csc, [])
+            if salindex is None
+            else [salindex, None]
+        )
+
+        producers: list = []
+        for route in (
+            (csc, route_salindex, route_stream)
+            for route_salindex in salindices
+            for route_stream in (stream, None)
+        ):
+            for producer in self._reply_routes.get(route, []):
+                if producer not in producers:
+                    producers.append(producer)
+
+        return producers
+
     def need_reply_from_producers(self, message_data: dict) -> bool:
         """Determine if input message_data from the server requires a reply
         from the producers.
@@ -269,25 +1096,124 @@ class LoveManagerClient:
                 **kwargs,
             )
             producer.send_message = self.send_message
+            producer.backpressure = self.backpressure
             self.producers.append(producer)
+            self.add_reply_routes(producer)
+
+    async def send_message(self, message: Union[str, bytes]) -> None:
+        """Queue a given message to be sent through websockets.
+
+        This never blocks: messages are added to `send_queue` and sent by
+        the writer task, highest priority first. See `SendQueue` for how
+        messages are dropped when the queue is full, `MessageBatcher`
+        for how messages are batched, and `BackpressureMonitor` for how
+        producers are signaled to reduce their data rate.
+
+        While disconnected, messages that must be delivered are spooled, if
+        a spool is configured (see `MessageSpool`), and replayed once
+        connected. So are the messages that must be delivered but are
+        rejected by a full send queue, see `handle_rejected_message`, and
+        the ones that follow them in the same priority class until the spool
+        is drained, so they are delivered in order. Other messages are
+        dropped while disconnected.
+
+        Parameters
+        ----------
+        message: `str` or `bytes`
+            JSON string to send to manager, optionally tagged with its send
+            priority (see `tag_message`).
+        """
+        if (
+            not self._websocket_ready.is_set()
+            or get_message_priority(message) in self._spilled_priorities
+        ) and self.spool_message(message):
+            return
+
+        if not self._websocket_ready.is_set() and not getattr(
+            message, "must_deliver", False
+        ):
+            # Stale by the time the connection is back; the manager gets the
+            # current state from the initial data.
+            self.send_queue.dropped[get_message_priority(message)] += 1
+            return
+
+        if self.websocket:
+            if not self.send_queue.put_nowait(message) and getattr(
+                message, "must_deliver", False
+            ):
+                self.handle_rejected_message(message)
+            self.update_backpressure()
+        else:
+            self.log.warning(
+                "No connection to manager. Run connect_to_manager before send_message."
+            )
+
+    def handle_rejected_message(self, message: Union[str, bytes]) -> None:
+        """Handle a message that must be delivered but was rejected by the
+        send queue, because its priority class is full of such messages.
+
+        The message is spooled, and the spool replayed if connected, or
+        dropped with an error if no spool is configured. Later messages of
+        the same priority class that must be delivered are spooled too,
+        until the spool is drained, see `send_message`.
+
+        Parameters
+        ----------
+        message : `str` or `bytes`
+            Rejected message.
+        """
+        if not self.spool_message(message):
+            self.log.error(
+                "Send queue full. Dropping message that must be delivered; "
+                "set LOVE_PRODUCER_SPOOL_PATH to spool these messages instead."
+            )
+            return
+
+        self.log.warning("Send queue full. Message spooled.")
+        self._spilled_priorities.add(get_message_priority(message))
 
-    async def send_message(self, message: str) -> None:
+        if self._websocket_ready.is_set() and (
+            self._spool_replay_task is None or self._spool_replay_task.done()
+        ):
+            self._spool_replay_task = asyncio.create_task(self._replay_spool())
+
+    async def write_message(self, message: Union[str, bytes]) -> None:
         """Send a given message through websockets
 
         Parameters
         ----------
-        message: `str`
-            JSON string to send to manager.
+        message: `str` or `bytes`
+            JSON string to send to manager. Binary messages (produced when the
+            binary wire format is in use) are sent as binary frames. Messages
+            are compressed, and sent as binary frames, when zstd compression
+            is in use.
         """
         if self.websocket:
             try:
-                self.log.debug(
-                    f"send_message: {textwrap.shorten(message, width=self.text_width_max)}"
-                )
                 async with self._send_message_lock:
-                    await asyncio.shield(self.websocket.send_str(message))
+                    data = message
+                    if self.compressor is not None:
+                        data = self.compressor.compress(message)
+                    elif self.deflate_estimator is not None and (
+                        self.connection_compression == "deflate"
+                    ):
+                        self.deflate_estimator.sample(message)
+                    if isinstance(data, bytes):
+                        self.log.debug(f"send_message: <{len(data)} bytes>")
+                        send = self.websocket.send_bytes
+                    else:
+                        self.log.debug(
+                            f"send_message: {textwrap.shorten(data, width=self.text_width_max)}"
+                        )
+                        send = self.websocket.send_str
+                    await asyncio.shield(send(data))
             except Exception:
-                self.log.exception("Error sending message to manager.")
+                if self.spool_message(message):
+                    self.log.warning(
+                        "Error sending message to manager. Message spooled."
+                    )
+                else:
+                    self.log.exception("Error sending message to manager.")
         else:
             self.log.warning(
                 "No connection to manager. Run connect_to_manager before send_message."
@@ -300,6 +1226,22 @@ class LoveManagerClient:
         if self.done_task is not None and not self.done_task.done():
             self.done_task.set_result(True)
 
+        for task in (
+            self._send_queue_writer_task,
+            self._spool_replay_task,
+            self._initial_data_task,
+            *self._request_tasks,
+        ):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+        if self.spool is not None:
+            self.spool.close()
+
         if self.websocket is not None:
             await self.websocket.close()
 
@@ -311,6 +1253,64 @@ class LoveManagerClient:
     def manager_password(self) -> str:
         return os.environ.get("PROCESS_CONNECTION_PASS", "")
 
+    @property
+    def binary_websocket_protocol(self) -> str:
+        return f"love.{MsgpackMessageEncoder.name}"
+
+    @property
+    def websocket_protocols(self) -> tuple:
+        """Websocket subprotocols requested to the manager, in order of
+        preference.
+
+        Protocols are named ``love.<wire format>[+<compression>]``. Not
+        requesting any protocol means json without application level
+        compression.
+        """
+        wire_formats = ["json"]
+        if self.wire_format == MsgpackMessageEncoder.name and (
+            self.binary_encoder is not None
+        ):
+            wire_formats.insert(0, MsgpackMessageEncoder.name)
+
+        use_zstd = (
+            self.compression == ZstdMessageCompressor.name
+            and ZstdMessageCompressor.is_available()
+        )
+
+        protocols = []
+        for wire_format in wire_formats:
+            if use_zstd:
+                protocols.append(f"love.{wire_format}+{ZstdMessageCompressor.name}")
+            if wire_format != "json":
+                protocols.append(f"love.{wire_format}")
+
+        return tuple(protocols)
+
+    @property
+    def negotiated_protocol(self) -> Tuple[str, str]:
+        """Wire format and compression accepted by the manager for the
+        current connection."""
+        protocol = self.websocket.protocol if self.websocket is not None else None
+
+        if not protocol or not protocol.startswith("love."):
+            return "json", "none"
+
+        wire_format, _, compression = protocol.split(".", 1)[1].partition("+")
+
+        return wire_format, compression if compression else "none"
+
+    @property
+    def compression_stats(self) -> Optional[CompressionStats]:
+        """Compression ratio and cost for the current connection, `None` if
+        messages are not compressed."""
+        if self.compressor is not None:
+            return self.compressor.stats
+        if self.deflate_estimator is not None and (
+            self.connection_compression == "deflate"
+        ):
+            return self.deflate_estimator.stats
+        return None
+
     @property
     def url(self) -> str:
         if self.manager_hostname is None:
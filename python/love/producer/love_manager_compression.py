@@ -0,0 +1,243 @@
+# This file is part of LOVE-producer.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by Inria Chile and
+# the LSST Project (https://www.lsst.org).
+#
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership and dependencies.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+__all__ = [
+    "CompressionStats",
+    "DeflateCompressionEstimator",
+    "ZstdMessageCompressor",
+]
+
+import base64
+import json
+import logging
+import time
+import zlib
+from typing import List, Optional, Union
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class CompressionStats:
+    """Accumulate compression ratio and cost of the messages sent to the
+    manager.
+
+    Parameters
+    ----------
+    name : `str`
+        Name of the compression method.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.messages = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.compression_time = 0.0
+
+    def record(self, bytes_in: int, bytes_out: int, compression_time: float) -> None:
+        """Record the compression of one message.
+
+        Parameters
+        ----------
+        bytes_in : `int`
+            Size of the message before compression.
+        bytes_out : `int`
+            Size of the message after compression.
+        compression_time : `float`
+            Time spent compressing the message (seconds).
+        """
+        self.messages += 1
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+        self.compression_time += compression_time
+
+    @property
+    def ratio(self) -> float:
+        """Compression ratio (uncompressed size / compressed size)."""
+        return self.bytes_in / self.bytes_out if self.bytes_out > 0 else 1.0
+
+    @property
+    def time_per_megabyte(self) -> float:
+        """Compression time per megabyte of input (seconds)."""
+        return (
+            self.compression_time / (self.bytes_in / 1e6) if self.bytes_in > 0 else 0.0
+        )
+
+    def as_dict(self) -> dict:
+        return dict(
+            name=self.name,
+            messages=self.messages,
+            bytes_in=self.bytes_in,
+            bytes_out=self.bytes_out,
+            ratio=self.ratio,
+            compression_time=self.compression_time,
+            time_per_megabyte=self.time_per_megabyte,
+        )
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name}: {self.messages} messages, "
+            f"{self.bytes_in} -> {self.bytes_out} bytes, "
+            f"ratio={self.ratio:.2f}, "
+            f"time={self.compression_time:.3f}s "
+            f"({self.time_per_megabyte * 1e3:.2f}ms/MB)"
+        )
+
+
+class DeflateCompressionEstimator:
+    """Estimate the ratio and cost of websocket permessage-deflate.
+
+    permessage-deflate is applied by the websocket library, so its results are
+    not directly observable. Instead, one in every `sample_interval` messages
+    is compressed with `zlib`, using the same settings, to estimate them.
+
+    Parameters
+    ----------
+    sample_interval : `int`, optional
+        Sample one in every ``sample_interval`` messages.
+    """
+
+    def __init__(self, sample_interval: int = 100) -> None:
+        self.sample_interval = sample_interval
+        self.stats = CompressionStats("deflate (estimated)")
+        self._count = 0
+
+    def sample(self, message: Union[str, bytes]) -> None:
+        """Sample a message sent to the manager.
+
+        Parameters
+        ----------
+        message : `str` or `bytes`
+            Message.
+        """
+        self._count += 1
+        if self._count % self.sample_interval != 0:
+            return
+
+        data = message.encode() if isinstance(message, str) else message
+        start = time.perf_counter()
+        compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        compressed = compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        self.stats.record(len(data), len(compressed), time.perf_counter() - start)
+
+
+class ZstdMessageCompressor:
+    """Compress messages to the manager with zstd, optionally with a
+    dictionary trained from the producers message templates.
+
+    Each message is compressed independently, so it can be decompressed on
+    its own by the manager, given the dictionary.
+
+    Parameters
+    ----------
+    samples : `list` of `bytes`
+        Sample messages used to train the dictionary. These are usually
+        produced from the topics XML templates. If training fails (e.g. not
+        enough samples), messages are compressed without a dictionary.
+    level : `int`, optional
+        Compression level.
+    dictionary_size : `int`, optional
+        Maximum size of the dictionary (bytes).
+    log : `logging.Logger`, optional
+        Logger facility.
+    """
+
+    name = "zstd"
+
+    def __init__(
+        self,
+        samples: List[bytes],
+        level: int = 3,
+        dictionary_size: int = 32768,
+        log: Optional[logging.Logger] = None,
+    ) -> None:
+        self.log = (
+            logging.getLogger(type(self).__name__)
+            if log is None
+            else log.getChild(type(self).__name__)
+        )
+
+        self.dictionary: Optional["zstandard.ZstdCompressionDict"] = None
+
+        if len(samples) > 0:
+            try:
+                self.dictionary = zstandard.train_dictionary(dictionary_size, samples)
+            except zstandard.ZstdError as e:
+                self.log.warning(
+                    f"Could not train zstd dictionary from {len(samples)} samples: {e}. "
+                    "Compressing without dictionary."
+                )
+
+        self._compressor = zstandard.ZstdCompressor(
+            level=level, dict_data=self.dictionary
+        )
+        self.stats = CompressionStats(self.name)
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return zstandard is not None
+
+    def get_dictionary_message(self) -> str:
+        """Return the message that shares the dictionary with the manager.
+
+        Returns
+        -------
+        `str`
+            Json message with the dictionary id and base64 encoded data.
+            Both are empty if no dictionary is used.
+        """
+        return json.dumps(
+            dict(
+                category="compression",
+                algorithm=self.name,
+                dictionary_id=(
+                    self.dictionary.dict_id() if self.dictionary is not None else 0
+                ),
+                dictionary=(
+                    base64.b64encode(self.dictionary.as_bytes()).decode()
+                    if self.dictionary is not None
+                    else ""
+                ),
+            )
+        )
+
+    def compress(self, message: Union[str, bytes]) -> bytes:
+        """Compress a message.
+
+        Parameters
+        ----------
+        message : `str` or `bytes`
+            Message.
+
+        Returns
+        -------
+        `bytes`
+            Compressed message.
+        """
+        data = message.encode() if isinstance(message, str) else message
+        start = time.perf_counter()
+        compressed = self._compressor.compress(data)
+        self.stats.record(len(data), len(compressed), time.perf_counter() - start)
+        return compressed
@@ -0,0 +1,534 @@
+# This file is part of LOVE-producer.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by Inria Chile and
+# the LSST Project (https://www.lsst.org).
+#
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership and dependencies.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+__all__ = [
+    "NumpyEncoder",
+    "EncodedPayload",
+    "EncodedBinaryPayload",
+    "MessageEncoder",
+    "JsonMessageEncoder",
+    "OrjsonMessageEncoder",
+    "MsgpackMessageEncoder",
+    "available_message_encoders",
+    "binary_message_encoders",
+    "get_message_encoder",
+    "decode_payload",
+]
+
+import json
+import logging
+import os
+from typing import Any, List, Optional, Tuple, Union
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+NDARRAY_EXT_CODE = 1
+
+
+class NumpyEncoder(json.JSONEncoder):
+    def default(self, obj: Any) -> json.JSONEncoder:
+        if isinstance(obj, (np.bool, np.bool_)):
+            return bool(obj)
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        if isinstance(obj, np.integer):
+            return int(obj)
+        if isinstance(obj, np.floating):
+            return float(obj)
+        return json.JSONEncoder.default(self, obj)
+
+
+class EncodedPayload(str):
+    """Json string of an already encoded message payload.
+
+    Payloads of this type are spliced as-is into category messages by
+    `LoveManagerMessage.get_message_category_as_json`, instead of being
+    encoded again.
+    """
+
+
+class EncodedBinaryPayload(bytes):
+    """Binary (MessagePack) equivalent of `EncodedPayload`."""
+
+
+class MessageEncoder:
+    """Base class for the encoders used to serialize messages sent to the
+    LOVE manager.
+
+    Subclasses must implement `dumps`, which converts a message data structure
+    into the string transmitted through the websocket, and `loads`.
+
+    The default envelope methods (`get_envelope`, `join_message` and
+    `join_batch`) produce json. Binary encoders must override them.
+    """
+
+    name: str = ""
+    binary: bool = False
+    payload_type: type = EncodedPayload
+
+    @classmethod
+    def is_available(cls) -> bool:
+        """Is the encoder backend available in the current environment?"""
+        return True
+
+    def dumps(self, data: Any) -> str:
+        """Serialize data into a json string.
+
+        Parameters
+        ----------
+        data : `object`
+            Data to serialize.
+
+        Returns
+        -------
+        `str`
+            Json string.
+        """
+        raise NotImplementedError()
+
+    def loads(self, message: Union[str, bytes]) -> Any:
+        """Deserialize a message.
+
+        Parameters
+        ----------
+        message : `str` or `bytes`
+            Serialized message.
+
+        Returns
+        -------
+        `object`
+            Message data.
+        """
+        return json.loads(message)
+
+    def encode_payload(self, data: Any) -> Union[EncodedPayload, EncodedBinaryPayload]:
+        """Encode a message payload so it can be spliced into an envelope.
+
+        Parameters
+        ----------
+        data : `object`
+            Payload data. Payloads already encoded with another encoder are
+            decoded and encoded again.
+
+        Returns
+        -------
+        `EncodedPayload` or `EncodedBinaryPayload`
+            Encoded payload, of the type produced by this encoder.
+        """
+        if isinstance(data, self.payload_type):
+            return data
+        if isinstance(data, (EncodedPayload, EncodedBinaryPayload)):
+            data = decode_payload(data)
+        return self.payload_type(self.dumps(data))
+
+    def add_payload_field(
+        self,
+        payload: Union[dict, EncodedPayload, EncodedBinaryPayload],
+        key: str,
+        value: Any,
+    ) -> Union[dict, EncodedPayload, EncodedBinaryPayload]:
+        """Add a top level field to a message payload.
+
+        Encoded payloads are extended without being decoded, and dictionary
+        payloads are copied, so stored samples are not modified.
+
+        Parameters
+        ----------
+        payload : `dict`, `EncodedPayload` or `EncodedBinaryPayload`
+            Payload.
+        key : `str`
+            Name of the field.
+        value : `object`
+            Value of the field.
+
+        Returns
+        -------
+        `dict`, `EncodedPayload` or `EncodedBinaryPayload`
+            Payload with the additional field.
+        """
+        if not isinstance(payload, (EncodedPayload, EncodedBinaryPayload)):
+            return {**payload, key: value}
+        payload = self.encode_payload(payload)
+        head = payload[:-1]
+        separator = "" if head.rstrip() == "{" else ","
+        return self.payload_type(
+            f"{head}{separator}{self.dumps(key)}:{self.dumps(value)}}}"
+        )
+
+    def get_envelope(self, category: str, metadata: dict) -> Tuple[Any, Any]:
+        """Encode the static parts of a category message.
+
+        Parameters
+        ----------
+        category : `str`
+            Message category.
+        metadata : `dict`
+            Message metadata.
+
+        Returns
+        -------
+        prefix
+            Encoded message up to the start of the payload.
+        suffix
+            Encoded message after the timestamp (the metadata).
+        """
+        prefix = f'{{"category":{self.dumps(category)},"data":['
+        suffix = f",{self.dumps(metadata)[1:-1]}}}" if len(metadata) > 0 else "}"
+        return prefix, suffix
+
+    def join_message(
+        self, prefix: Any, payload: Any, timestamp: float, suffix: Any
+    ) -> Union[str, bytes]:
+        """Join an envelope with an encoded payload and timestamp.
+
+        Parameters
+        ----------
+        prefix
+            Envelope prefix, from `get_envelope`.
+        payload
+            Encoded payload.
+        timestamp : `float`
+            Timestamp of the message (``producer_snd``).
+        suffix
+            Envelope suffix, from `get_envelope`.
+
+        Returns
+        -------
+        `str` or `bytes`
+            Encoded message.
+        """
+        return f'{prefix}{payload}],"producer_snd":{self.dumps(timestamp)}{suffix}'
+
+    def join_batch(
+        self, prefix: Any, payloads: List[Any], timestamp: float, suffix: Any
+    ) -> Union[str, bytes]:
+        """Join an envelope with several encoded payloads and a timestamp,
+        into a single message with one ``data`` entry per payload.
+
+        Parameters
+        ----------
+        prefix
+            Envelope prefix, from `get_envelope`.
+        payloads : `list`
+            Encoded payloads.
+        timestamp : `float`
+            Timestamp of the message (``producer_snd``).
+        suffix
+            Envelope suffix, from `get_envelope`.
+
+        Returns
+        -------
+        `str` or `bytes`
+            Encoded message.
+        """
+        return self.join_message(prefix, ",".join(payloads), timestamp, suffix)
+
+
+class JsonMessageEncoder(MessageEncoder):
+    """Message encoder based on the standard library `json` module.
+
+    NumPy scalars and arrays are handled by `NumpyEncoder`.
+    """
+
+    name = "json"
+
+    def __init__(self) -> None:
+        self._encoder = NumpyEncoder(separators=(",", ":"))
+
+    def dumps(self, data: Any) -> str:
+        return self._encoder.encode(data)
+
+
+class OrjsonMessageEncoder(MessageEncoder):
+    """Message encoder based on `orjson`.
+
+    NumPy scalars and arrays are serialized natively by `orjson`. Arrays that
+    `orjson` cannot handle directly (e.g. non-contiguous or of object dtype)
+    are converted with `numpy.ndarray.tolist`.
+
+    `orjson` writes non-finite floats (``NaN``, ``Infinity`` and
+    ``-Infinity``) as ``null``. Messages with ``null`` in them are encoded
+    again with `NumpyEncoder`, as done by `JsonMessageEncoder`, so non-finite
+    values are not turned into missing ones.
+
+    Notes
+    -----
+    This encoder is only used when selected explicitly. Its output is the
+    same as `JsonMessageEncoder` except for the following (only the last one
+    applies to messages encoded again because of ``null``):
+
+    - ``float16`` and ``float32`` NumPy scalars and arrays, which `orjson`
+      writes with their shortest representation (e.g. ``0.1``) instead of the
+      ``float64`` one (``0.10000000149011612``). Both decode to the same
+      ``float32`` values.
+    - The exponent of floats written in exponent notation, which has no sign
+      or leading zeros (``1e20`` and ``1e-7`` instead of ``1e+20`` and
+      ``1e-07``).
+    - Non-ASCII characters in strings, which `orjson` writes as UTF-8 instead
+      of ``\\u`` escapes.
+    """
+
+    name = "orjson"
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return orjson is not None
+
+    def __init__(self) -> None:
+        self._options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        self._non_finite_encoder = NumpyEncoder(
+            separators=(",", ":"), ensure_ascii=False
+        )
+
+    def dumps(self, data: Any) -> str:
+        message = orjson.dumps(data, default=self._default, option=self._options)
+        if b"null" in message:
+            return self._non_finite_encoder.encode(data)
+        return message.decode()
+
+    @staticmethod
+    def _default(obj: Any) -> Any:
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        if isinstance(obj, np.generic):
+            return obj.item()
+        raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class MsgpackMessageEncoder(MessageEncoder):
+    """Binary message encoder based on MessagePack.
+
+    NumPy arrays are carried as raw little-endian buffers, in a MessagePack
+    extension type (code `NDARRAY_EXT_CODE`) holding the array dtype, shape
+    and data. Since MessagePack objects can be concatenated, envelopes are
+    pre-encoded and spliced with payloads just like json messages.
+
+    This encoder must only be used when the manager accepted the binary
+    format for the connection. See `LoveManagerClient`.
+    """
+
+    name = "msgpack"
+    binary = True
+    payload_type = EncodedBinaryPayload
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return msgpack is not None
+
+    def __init__(self) -> None:
+        self._packer = msgpack.Packer(default=self._default)
+        self._producer_snd_key = self._packer.pack("producer_snd")
+        self._single_entry_header = self._packer.pack_array_header(1)
+
+    def dumps(self, data: Any) -> bytes:
+        return self._packer.pack(data)
+
+    def loads(self, message: Union[str, bytes]) -> Any:
+        return msgpack.unpackb(message, ext_hook=self._ext_hook)
+
+    def add_payload_field(
+        self,
+        payload: Union[dict, EncodedPayload, EncodedBinaryPayload],
+        key: str,
+        value: Any,
+    ) -> Union[dict, EncodedPayload, EncodedBinaryPayload]:
+        if not isinstance(payload, (EncodedPayload, EncodedBinaryPayload)):
+            return {**payload, key: value}
+        payload = self.encode_payload(payload)
+        # Maps with up to 15 entries (fixmap) have the number of entries in
+        # the first byte, bigger maps are decoded and encoded again.
+        if 0x80 <= payload[0] < 0x8F:
+            return self.payload_type(
+                b"".join(
+                    [
+                        bytes([payload[0] + 1]),
+                        payload[1:],
+                        self._packer.pack(key),
+                        self._packer.pack(value),
+                    ]
+                )
+            )
+        return self.payload_type(self.dumps({**self.loads(payload), key: value}))
+
+    def get_envelope(self, category: str, metadata: dict) -> Tuple[bytes, bytes]:
+        prefix = b"".join(
+            [
+                self._packer.pack_map_header(3 + len(metadata)),
+                self._packer.pack("category"),
+                self._packer.pack(category),
+                self._packer.pack("data"),
+            ]
+        )
+        suffix = b"".join(
+            [
+                self._packer.pack(key) + self._packer.pack(metadata[key])
+                for key in metadata
+            ]
+        )
+        return prefix, suffix
+
+    def join_message(
+        self, prefix: bytes, payload: bytes, timestamp: float, suffix: bytes
+    ) -> bytes:
+        return b"".join(
+            [
+                prefix,
+                self._single_entry_header,
+                payload,
+                self._producer_snd_key,
+                self._packer.pack(timestamp),
+                suffix,
+            ]
+        )
+
+    def join_batch(
+        self, prefix: bytes, payloads: List[bytes], timestamp: float, suffix: bytes
+    ) -> bytes:
+        return b"".join(
+            [
+                prefix,
+                self._packer.pack_array_header(len(payloads)),
+                *payloads,
+                self._producer_snd_key,
+                self._packer.pack(timestamp),
+                suffix,
+            ]
+        )
+
+    @staticmethod
+    def _default(obj: Any) -> Any:
+        if isinstance(obj, np.ndarray):
+            little_endian = obj.astype(obj.dtype.newbyteorder("<"), copy=False)
+            return msgpack.ExtType(
+                NDARRAY_EXT_CODE,
+                msgpack.packb(
+                    [
+                        little_endian.dtype.str,
+                        list(obj.shape),
+                        np.ascontiguousarray(little_endian).tobytes(),
+                    ]
+                ),
+            )
+        if isinstance(obj, np.generic):
+            return obj.item()
+        raise TypeError(f"Type is not MessagePack serializable: {type(obj).__name__}")
+
+    @staticmethod
+    def _ext_hook(code: int, data: bytes) -> Any:
+        if code == NDARRAY_EXT_CODE:
+            dtype, shape, buffer = msgpack.unpackb(data)
+            return np.frombuffer(buffer, dtype=dtype).reshape(shape)
+        return msgpack.ExtType(code, data)
+
+
+available_message_encoders = dict(
+    json=JsonMessageEncoder,
+    orjson=OrjsonMessageEncoder,
+)
+
+binary_message_encoders = dict(
+    msgpack=MsgpackMessageEncoder,
+)
+
+
+def get_message_encoder(name: Optional[str] = None) -> MessageEncoder:
+    """Return a message encoder.
+
+    Parameters
+    ----------
+    name : `str`, optional
+        Name of the encoder, one of `available_message_encoders` or
+        `binary_message_encoders`. If not given use the value of the
+        ``LOVE_PRODUCER_MESSAGE_ENCODER`` environment variable, defaulting to
+        "json". The environment variable can only select a text encoder,
+        binary encoders must be negotiated with the manager for each
+        connection (see `LoveManagerClient.handle_wire_format`).
+
+    Returns
+    -------
+    `MessageEncoder`
+        Message encoder. If the requested backend is not installed, falls back
+        to `JsonMessageEncoder`.
+
+    Raises
+    ------
+    RuntimeError
+        If `name` is not a valid encoder name, or if the environment variable
+        selects a binary encoder.
+    """
+    if name is None:
+        name = os.environ.get("LOVE_PRODUCER_MESSAGE_ENCODER", "json")
+        message_encoders = available_message_encoders
+    else:
+        message_encoders = dict(**available_message_encoders, **binary_message_encoders)
+
+    if name not in message_encoders and name in binary_message_encoders:
+        raise RuntimeError(
+            f"Binary message encoder {name} can not be selected with "
+            "LOVE_PRODUCER_MESSAGE_ENCODER. Use LOVE_PRODUCER_WIRE_FORMAT to "
+            "negotiate it with the manager."
+        )
+
+    if name not in message_encoders:
+        raise RuntimeError(
+            f"Unrecognized message encoder {name}. "
+            f"Must be one of {message_encoders.keys()}"
+        )
+
+    encoder_type = message_encoders[name]
+
+    if not encoder_type.is_available():
+        logging.getLogger(__name__).warning(
+            f"Message encoder {name} not available. "
+            f"Falling back to {JsonMessageEncoder.name}."
+        )
+        encoder_type = JsonMessageEncoder
+
+    return encoder_type()
+
+
+def decode_payload(payload: Union[EncodedPayload, EncodedBinaryPayload]) -> Any:
+    """Decode an encoded payload.
+
+    Parameters
+    ----------
+    payload : `EncodedPayload` or `EncodedBinaryPayload`
+        Encoded payload.
+
+    Returns
+    -------
+    `object`
+        Payload data.
+    """
+    if isinstance(payload, EncodedBinaryPayload):
+        return msgpack.unpackb(payload, ext_hook=MsgpackMessageEncoder._ext_hook)
+    return json.loads(payload)
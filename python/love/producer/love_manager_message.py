@@ -20,36 +20,49 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-__all__ = ["NumpyEncoder", "LoveManagerMessage"]
+__all__ = ["LoveManagerMessage"]
 
 import datetime
-import json
-from typing import Any
+from typing import Any, Hashable, Optional, Tuple, Union
 
-import numpy as np
+from .love_manager_encoder import (
+    EncodedBinaryPayload,
+    EncodedPayload,
+    MessageEncoder,
+    get_message_encoder,
+)
+from .love_manager_send_queue import MessageParts, MessagePriority, tag_message
 
-
-class NumpyEncoder(json.JSONEncoder):
-    def default(self, obj: Any) -> json.JSONEncoder:
-        if isinstance(obj, (np.bool, np.bool_)):
-            return bool(obj)
-        if isinstance(obj, np.ndarray):
-            return obj.tolist()
-        if isinstance(
-            obj,
-            (np.uint8, np.int16, np.int32, np.int64, np.uint8, np.uint16, np.uint32),
-        ):
-            return int(obj)
-        return json.JSONEncoder.default(self, obj)
+CATEGORY_PRIORITY = dict(
+    telemetry=MessagePriority.TELEMETRY,
+    event=MessagePriority.EVENT,
+)
 
 
 class LoveManagerMessage:
-    def __init__(self, component_name: str) -> None:
+    def __init__(
+        self, component_name: str, encoder: Optional[MessageEncoder] = None
+    ) -> None:
         self.component_name: str = component_name
         self.metadata: dict = dict()
+        self.encoder: MessageEncoder = (
+            get_message_encoder() if encoder is None else encoder
+        )
+        self._envelopes: dict = dict()
+
+    def set_encoder(self, encoder: MessageEncoder) -> None:
+        """Set the message encoder.
+
+        Parameters
+        ----------
+        encoder : `MessageEncoder`
+            New message encoder.
+        """
+        self.encoder = encoder
+        self._envelopes = dict()
 
-    def get_message_as_json(self, data: dict) -> str:
-        return json.dumps(data, cls=NumpyEncoder)
+    def get_message_as_json(self, data: Any) -> Union[str, bytes]:
+        return self.encoder.dumps(data)
 
     def get_message_initial_state(self) -> dict:
         return self.get_message_initial_state_for_csc(self.component_name)
@@ -86,11 +99,87 @@ class LoveManagerMessage:
             **self.metadata
         )
 
-    def get_message_category_as_json(self, category: str, data: dict) -> str:
-        return self.get_message_as_json(
-            self.get_message_category(category=category, data=data)
+    def get_message_category_as_json(
+        self,
+        category: str,
+        data: Union[dict, EncodedPayload, EncodedBinaryPayload],
+        priority: Optional[MessagePriority] = None,
+        stream: Optional[Hashable] = None,
+        must_deliver: bool = False,
+    ) -> Union[str, bytes]:
+        """Return the encoded category message.
+
+        The static parts of the message (category and metadata) are encoded
+        only once per category and cached. For every new message only the
+        payload and timestamp are encoded and spliced into the cached
+        envelope. The result is identical to encoding the output of
+        `get_message_category`.
+
+        Parameters
+        ----------
+        category : `str`
+            Message category, e.g. "event" or "telemetry".
+        data : `dict`, `EncodedPayload` or `EncodedBinaryPayload`
+            Message payload.
+        priority : `MessagePriority`, optional
+            Send priority of the message. By default telemetry messages have
+            `MessagePriority.TELEMETRY` and event messages
+            `MessagePriority.EVENT`. Other categories have
+            `MessagePriority.HIGH`.
+        stream : hashable, optional
+            Key of the data stream of the message, used to replace pending
+            messages of the same stream before they are sent.
+        must_deliver : `bool`, optional
+            Must the message be delivered, even if a newer message of the same
+            stream is sent?
+
+        Returns
+        -------
+        `str` or `bytes`
+            Message as a json string, or `bytes` if the encoder is binary,
+            tagged with its send priority and stream.
+        """
+        prefix, suffix = self.get_message_category_envelope(category)
+        payload = self.encoder.encode_payload(data)
+        timestamp = datetime.datetime.now().timestamp()
+
+        return tag_message(
+            self.encoder.join_message(prefix, payload, timestamp, suffix),
+            (
+                CATEGORY_PRIORITY.get(category, MessagePriority.HIGH)
+                if priority is None
+                else priority
+            ),
+            stream=stream,
+            must_deliver=must_deliver,
+            parts=MessageParts(
+                category, self.encoder, prefix, payload, suffix, timestamp
+            ),
         )
 
+    def get_message_category_envelope(self, category: str) -> Tuple[Any, Any]:
+        """Return the pre-encoded envelope for messages of a given category.
+
+        Parameters
+        ----------
+        category : `str`
+            Message category.
+
+        Returns
+        -------
+        prefix : `str` or `bytes`
+            Encoded message up to the start of the payload.
+        suffix : `str` or `bytes`
+            Encoded message after the timestamp (the metadata).
+        """
+        if category not in self._envelopes:
+            self._envelopes[category] = self.encoder.get_envelope(
+                category, self.metadata
+            )
+
+        return self._envelopes[category]
+
     def add_metadata(self, **kwargs) -> None:
         for key in kwargs:
             self.metadata[key] = kwargs[key]
+        self._envelopes = dict()
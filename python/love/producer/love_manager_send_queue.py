@@ -0,0 +1,893 @@
+# This file is part of LOVE-producer.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by Inria Chile and
+# the LSST Project (https://www.lsst.org).
+#
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership and dependencies.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+__all__ = [
+    "MessagePriority",
+    "DropPolicy",
+    "MessageParts",
+    "OutboundMessage",
+    "OutboundBinaryMessage",
+    "QueueMarker",
+    "SendQueue",
+    "MessageBatcher",
+    "BackpressureMonitor",
+    "InitialDataScheduler",
+    "tag_message",
+    "get_message_priority",
+]
+
+import asyncio
+import collections
+import enum
+import time
+import typing
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, Union
+
+from .love_manager_encoder import MessageEncoder
+
+
+class MessagePriority(enum.IntEnum):
+    """Priority classes of the messages sent to the manager, lower values
+    are sent first.
+    """
+
+    HIGH = 0
+    """Heartbeats, alarms and control messages (e.g. initial_state)."""
+    EVENT = 1
+    TELEMETRY = 2
+
+
+class DropPolicy(str, enum.Enum):
+    """What to do when a message is added to a full priority class."""
+
+    DROP_OLDEST = "drop_oldest"
+    """Drop the oldest pending message of the class."""
+    DROP_NEWEST = "drop_newest"
+    """Drop the new message."""
+
+
+class MessageParts(typing.NamedTuple):
+    """Parts of an encoded category message, used to batch messages with the
+    same envelope into a single message.
+    """
+
+    category: str
+    encoder: MessageEncoder
+    prefix: Any
+    payload: Any
+    suffix: Any
+    timestamp: float
+    """Timestamp of the message (``producer_snd``)."""
+
+    @property
+    def envelope_key(self) -> tuple:
+        """Key of the message envelope; messages with the same key can be
+        batched.
+        """
+        return (self.category, id(self.encoder), self.prefix, self.suffix)
+
+
+class OutboundMessage(str):
+    """Encoded message tagged with its send priority and data stream.
+
+    Attributes
+    ----------
+    priority : `MessagePriority`
+        Send priority.
+    stream : hashable or `None`
+        Key of the data stream of the message.
+    must_deliver : `bool`
+        Must the message be delivered, even if a newer message of the same
+        stream is sent?
+    parts : `MessageParts` or `None`
+        Parts of the message, if it is a category message.
+    """
+
+    priority: MessagePriority = MessagePriority.HIGH
+    stream: Optional[Hashable] = None
+    must_deliver: bool = False
+    parts: Optional[MessageParts] = None
+
+
+class OutboundBinaryMessage(bytes):
+    """Binary equivalent of `OutboundMessage`."""
+
+    priority: MessagePriority = MessagePriority.HIGH
+    stream: Optional[Hashable] = None
+    must_deliver: bool = False
+    parts: Optional[MessageParts] = None
+
+
+class QueueMarker(OutboundMessage):
+    """Empty message queued to find out when the messages queued before it
+    in the same priority class are sent.
+
+    Markers are never batched, spooled or written to the manager: the
+    writer consumes them (see `LoveManagerClient._send_queue_writer`).
+
+    Parameters
+    ----------
+    priority : `MessagePriority`
+        Priority class of the messages to wait for.
+    """
+
+    def __new__(cls, priority: MessagePriority) -> "QueueMarker":
+        marker = super().__new__(cls, "")
+        marker.priority = priority
+        return marker
+
+
+def tag_message(
+    message: Union[str, bytes],
+    priority: MessagePriority,
+    stream: Optional[Hashable] = None,
+    must_deliver: bool = False,
+    parts: Optional[MessageParts] = None,
+) -> Union[OutboundMessage, OutboundBinaryMessage]:
+    """Tag an encoded message with its send priority and data stream.
+
+    Parameters
+    ----------
+    message : `str` or `bytes`
+        Encoded message.
+    priority : `MessagePriority`
+        Send priority.
+    stream : hashable, optional
+        Key of the data stream of the message, e.g. (csc, salindex, topic).
+    must_deliver : `bool`, optional
+        Must the message be delivered, even if a newer message of the same
+        stream is sent?
+    parts : `MessageParts`, optional
+        Parts of the message, to allow batching it with other messages.
+
+    Returns
+    -------
+    `OutboundMessage` or `OutboundBinaryMessage`
+        Tagged message.
+    """
+    tagged_message = (
+        OutboundBinaryMessage(message)
+        if isinstance(message, bytes)
+        else OutboundMessage(message)
+    )
+    tagged_message.priority = priority
+    tagged_message.stream = stream
+    tagged_message.must_deliver = must_deliver
+    tagged_message.parts = parts
+    return tagged_message
+
+
+def get_message_priority(message: Union[str, bytes]) -> MessagePriority:
+    """Return the send priority of a message.
+
+    Untagged messages (e.g. heartbeats and initial_state subscriptions, built
+    with `LoveManagerMessage.get_message_as_json`) have the highest priority.
+    """
+    return getattr(message, "priority", MessagePriority.HIGH)
+
+
+class SendQueue:
+    """Bounded queue of messages waiting to be sent to the manager, with
+    priority classes.
+
+    Messages are returned highest priority first and in insertion order
+    within each class. Adding messages never blocks: when a class is full,
+    a message is dropped according to the class `DropPolicy`. Messages
+    flagged as ``must_deliver`` are never dropped: the oldest pending message
+    that is not flagged is dropped instead, and if there is none the new
+    message is rejected, so the caller can spool it (see
+    `LoveManagerClient.send_message`).
+
+    When conflating, a message of a data stream (see `tag_message`) replaces
+    the pending message of the same stream, keeping its position in the
+    queue, so only the latest sample of each stream is sent. Messages flagged
+    as ``must_deliver`` are never replaced.
+
+    Parameters
+    ----------
+    capacities : `dict`, optional
+        Maximum number of pending messages by `MessagePriority`.
+    drop_policies : `dict`, optional
+        `DropPolicy` by `MessagePriority`.
+    conflate : `bool`, optional
+        Replace pending messages of the same data stream?
+    """
+
+    default_capacities = {
+        MessagePriority.HIGH: 1000,
+        MessagePriority.EVENT: 5000,
+        MessagePriority.TELEMETRY: 1000,
+    }
+
+    default_drop_policies = {
+        MessagePriority.HIGH: DropPolicy.DROP_OLDEST,
+        MessagePriority.EVENT: DropPolicy.DROP_OLDEST,
+        MessagePriority.TELEMETRY: DropPolicy.DROP_OLDEST,
+    }
+
+    def __init__(
+        self,
+        capacities: Optional[Dict[MessagePriority, int]] = None,
+        drop_policies: Optional[Dict[MessagePriority, DropPolicy]] = None,
+        conflate: bool = True,
+    ) -> None:
+        self.capacities = {
+            **self.default_capacities,
+            **(capacities if capacities is not None else dict()),
+        }
+        self.drop_policies = {
+            **self.default_drop_policies,
+            **(drop_policies if drop_policies is not None else dict()),
+        }
+
+        self.conflate = conflate
+
+        self._queues: Dict[MessagePriority, collections.deque] = {
+            priority: collections.deque() for priority in MessagePriority
+        }
+        self._pending_streams: Dict[Hashable, list] = dict()
+        self._not_empty = asyncio.Event()
+        self._nbytes = 0
+
+        self.enqueued = {priority: 0 for priority in MessagePriority}
+        self.dropped = {priority: 0 for priority in MessagePriority}
+        self.rejected = {priority: 0 for priority in MessagePriority}
+        self.conflated = {priority: 0 for priority in MessagePriority}
+        self.dequeued = {priority: 0 for priority in MessagePriority}
+        self.total_wait_time = {priority: 0.0 for priority in MessagePriority}
+        self.max_wait_time = {priority: 0.0 for priority in MessagePriority}
+
+    def put_nowait(self, message: Union[str, bytes]) -> bool:
+        """Add a message to the queue.
+
+        Parameters
+        ----------
+        message : `str` or `bytes`
+            Encoded message, see `get_message_priority`.
+
+        Returns
+        -------
+        `bool`
+            `True` if the message was added (or replaced a pending message of
+            the same stream), `False` if it was dropped or rejected.
+        """
+        priority = get_message_priority(message)
+        queue = self._queues[priority]
+
+        stream = (
+            getattr(message, "stream", None)
+            if self.conflate and not getattr(message, "must_deliver", False)
+            else None
+        )
+
+        if stream is not None and stream in self._pending_streams:
+            entry = self._pending_streams[stream]
+            self._nbytes += len(message) - len(entry[0])
+            entry[0] = message
+            self.conflated[priority] += 1
+            return True
+
+        if len(queue) >= self.capacities[priority]:
+            must_deliver = getattr(message, "must_deliver", False)
+            if (
+                self.drop_policies[priority] == DropPolicy.DROP_NEWEST
+                and not must_deliver
+            ) or not self._drop_oldest(queue):
+                if must_deliver:
+                    self.rejected[priority] += 1
+                else:
+                    self.dropped[priority] += 1
+                return False
+            self.dropped[priority] += 1
+
+        entry = [message, time.monotonic(), stream]
+        queue.append(entry)
+        self._nbytes += len(message)
+        if stream is not None:
+            self._pending_streams[stream] = entry
+        self.enqueued[priority] += 1
+        self._not_empty.set()
+
+        return True
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Union[str, bytes]]:
+        """Remove and return the next message to send, waiting until one is
+        available.
+
+        Parameters
+        ----------
+        timeout : `float`, optional
+            Maximum time to wait (seconds). Wait forever if `None`.
+
+        Returns
+        -------
+        `str`, `bytes` or `None`
+            Highest priority message, `None` if no message was available
+            before the timeout.
+        """
+        while True:
+            message = self.get_nowait()
+            if message is not None:
+                return message
+            self._not_empty.clear()
+            if timeout is None:
+                await self._not_empty.wait()
+            else:
+                try:
+                    await asyncio.wait_for(self._not_empty.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                return self.get_nowait()
+
+    def get_nowait(self) -> Optional[Union[str, bytes]]:
+        """Remove and return the next message to send, if any.
+
+        Returns
+        -------
+        `str`, `bytes` or `None`
+            Highest priority message, `None` if the queue is empty.
+        """
+        for priority, queue in self._queues.items():
+            if len(queue) > 0:
+                message, enqueue_time = self._pop_entry(queue)
+                self._record_wait(priority, time.monotonic() - enqueue_time)
+                return message
+        return None
+
+    def clear(self, keep_must_deliver: bool = False) -> None:
+        """Drop pending messages.
+
+        Parameters
+        ----------
+        keep_must_deliver : `bool`, optional
+            Keep the messages flagged as ``must_deliver``, in order?
+        """
+        for priority, queue in self._queues.items():
+            kept = [
+                entry
+                for entry in queue
+                if keep_must_deliver and getattr(entry[0], "must_deliver", False)
+            ]
+            self.dropped[priority] += len(queue) - len(kept)
+            queue.clear()
+            queue.extend(kept)
+        # Messages flagged as must_deliver are never pending by stream.
+        self._pending_streams.clear()
+        self._nbytes = sum(
+            len(message) for queue in self._queues.values() for message, _, _ in queue
+        )
+
+    def is_full(self, priority: MessagePriority) -> bool:
+        """Is a priority class full?
+
+        Parameters
+        ----------
+        priority : `MessagePriority`
+            Priority class.
+
+        Returns
+        -------
+        `bool`
+            `True` if the class has as many pending messages as its capacity.
+        """
+        return len(self._queues[priority]) >= self.capacities[priority]
+
+    def _drop_oldest(self, queue: collections.deque) -> bool:
+        for index, (message, _, stream) in enumerate(queue):
+            if not getattr(message, "must_deliver", False):
+                del queue[index]
+                self._nbytes -= len(message)
+                if stream is not None:
+                    del self._pending_streams[stream]
+                return True
+        return False
+
+    def _pop_entry(self, queue: collections.deque) -> Tuple[Union[str, bytes], float]:
+        message, enqueue_time, stream = queue.popleft()
+        self._nbytes -= len(message)
+        if stream is not None:
+            del self._pending_streams[stream]
+        return message, enqueue_time
+
+    def _record_wait(self, priority: MessagePriority, wait_time: float) -> None:
+        self.dequeued[priority] += 1
+        self.total_wait_time[priority] += wait_time
+        self.max_wait_time[priority] = max(self.max_wait_time[priority], wait_time)
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    @property
+    def depth(self) -> Dict[MessagePriority, int]:
+        """Number of pending messages by priority class."""
+        return {priority: len(queue) for priority, queue in self._queues.items()}
+
+    @property
+    def nbytes(self) -> int:
+        """Total size of the pending messages (characters for text messages,
+        bytes for binary messages).
+        """
+        return self._nbytes
+
+    def get_stats(self) -> dict:
+        """Return the queue statistics.
+
+        Returns
+        -------
+        `dict`
+            Size of the pending messages (``nbytes``) and, by priority class
+            name, depth, number of enqueued, conflated (replaced while
+            pending), dropped, rejected (``must_deliver`` messages added to a
+            class full of them) and dequeued messages, and mean and max wait
+            time (seconds).
+        """
+        return {
+            "nbytes": self._nbytes,
+            **{
+                priority.name.lower(): dict(
+                    depth=len(self._queues[priority]),
+                    enqueued=self.enqueued[priority],
+                    conflated=self.conflated[priority],
+                    dropped=self.dropped[priority],
+                    rejected=self.rejected[priority],
+                    dequeued=self.dequeued[priority],
+                    mean_wait_time=(
+                        self.total_wait_time[priority] / self.dequeued[priority]
+                        if self.dequeued[priority] > 0
+                        else 0.0
+                    ),
+                    max_wait_time=self.max_wait_time[priority],
+                )
+                for priority in MessagePriority
+            },
+        }
+
+
+class MessageBatcher:
+    """Combine category messages with the same envelope (category and
+    metadata) into single messages with several ``data`` entries.
+
+    A batch is sent when the batching window of its category, started by its
+    first message, expires, or when adding a message would exceed the byte
+    budget of the category. Messages of categories without a window,
+    messages that are not category messages and messages flagged as
+    ``must_deliver`` (which are spooled if they cannot be written) are not
+    batched.
+
+    A batch keeps the ``producer_snd`` of its first message, so the latency
+    measured by the manager includes the time spent waiting for the batch,
+    and the highest send priority of its messages.
+
+    Parameters
+    ----------
+    windows : `dict`
+        Batching window (seconds) by category.
+    byte_budgets : `dict`, optional
+        Maximum size of a batch (bytes) by category. Defaults to
+        `default_byte_budget`.
+    """
+
+    default_byte_budget = 65536
+
+    def __init__(
+        self, windows: Dict[str, float], byte_budgets: Optional[Dict[str, int]] = None
+    ) -> None:
+        self.windows = windows
+        self.byte_budgets = dict() if byte_budgets is None else byte_budgets
+
+        self._batches: Dict[tuple, list] = dict()
+
+        self.batches_sent = 0
+        self.messages_batched = 0
+
+    @classmethod
+    def from_config(cls, config: str) -> "MessageBatcher":
+        """Create a batcher from a configuration string.
+
+        Parameters
+        ----------
+        config : `str`
+            Comma separated list of ``category:window_ms[:byte_budget]``,
+            e.g. "telemetry:10:65536,event:5".
+
+        Returns
+        -------
+        `MessageBatcher`
+            Message batcher.
+        """
+        windows = dict()
+        byte_budgets = dict()
+
+        for category_config in config.split(","):
+            if not category_config.strip():
+                continue
+            category, window, *byte_budget = category_config.strip().split(":")
+            windows[category] = float(window) / 1e3
+            if byte_budget:
+                byte_budgets[category] = int(byte_budget[0])
+
+        return cls(windows=windows, byte_budgets=byte_budgets)
+
+    def is_batchable(self, message: Union[str, bytes]) -> bool:
+        parts = getattr(message, "parts", None)
+        return (
+            parts is not None
+            and self.windows.get(parts.category, 0.0) > 0.0
+            and not getattr(message, "must_deliver", False)
+        )
+
+    def add(self, message: Union[str, bytes], now: float) -> List[Union[str, bytes]]:
+        """Add a message to its batch.
+
+        Parameters
+        ----------
+        message : `str` or `bytes`
+            Message.
+        now : `float`
+            Current time (seconds, monotonic).
+
+        Returns
+        -------
+        `list`
+            Messages ready to be sent: the message itself if it cannot be
+            batched, or its batch if it reached the byte budget.
+        """
+        if not self.is_batchable(message):
+            return [message]
+
+        parts = message.parts
+        key = parts.envelope_key
+        byte_budget = self.byte_budgets.get(parts.category, self.default_byte_budget)
+
+        ready = []
+
+        batch = self._batches.get(key, None)
+        if batch is not None and batch[1] + len(parts.payload) > byte_budget:
+            ready.append(self._pop_batch(key))
+            batch = None
+
+        if batch is None:
+            batch = [[], 0, now + self.windows[parts.category]]
+            self._batches[key] = batch
+
+        batch[0].append(message)
+        batch[1] += len(parts.payload)
+
+        if batch[1] >= byte_budget:
+            ready.append(self._pop_batch(key))
+
+        return ready
+
+    def pop_expired(self, now: float) -> List[Union[str, bytes]]:
+        """Return the batches whose window expired.
+
+        Parameters
+        ----------
+        now : `float`
+            Current time (seconds, monotonic).
+
+        Returns
+        -------
+        `list`
+            Messages ready to be sent.
+        """
+        return [
+            self._pop_batch(key)
+            for key, (_, _, deadline) in list(self._batches.items())
+            if deadline <= now
+        ]
+
+    def pop_all(self) -> List[Union[str, bytes]]:
+        """Return all pending batches."""
+        return [self._pop_batch(key) for key in list(self._batches)]
+
+    def clear(self) -> None:
+        """Drop all pending batches."""
+        self._batches.clear()
+
+    @property
+    def next_deadline(self) -> Optional[float]:
+        """Time when the next batch window expires, `None` if no batch is
+        pending.
+        """
+        return min(
+            (deadline for _, _, deadline in self._batches.values()), default=None
+        )
+
+    def _pop_batch(self, key: tuple) -> Union[str, bytes]:
+        messages, _, _ = self._batches.pop(key)
+
+        if len(messages) == 1:
+            return messages[0]
+
+        self.batches_sent += 1
+        self.messages_batched += len(messages)
+
+        parts = messages[0].parts
+        return tag_message(
+            parts.encoder.join_batch(
+                parts.prefix,
+                [message.parts.payload for message in messages],
+                parts.timestamp,
+                parts.suffix,
+            ),
+            min(get_message_priority(message) for message in messages),
+        )
+
+
+class BackpressureMonitor:
+    """Track the amount of data waiting to be sent to the manager and signal
+    backpressure when it crosses a high watermark.
+
+    Backpressure is activated when the pending bytes reach
+    ``high_watermark`` and released when they fall to ``low_watermark``, so
+    the signal does not flap around a single threshold. The pending bytes
+    are usually the size of the send queue plus the websocket transport
+    write buffer.
+
+    Producers share the monitor and check `active` to reduce their data
+    rate, e.g. polling periodic data every ``period_factor`` periods.
+
+    Parameters
+    ----------
+    high_watermark : `int`, optional
+        Pending bytes that activate backpressure.
+    low_watermark : `int`, optional
+        Pending bytes that release backpressure.
+    period_factor : `float`, optional
+        Factor applied to the period of periodic data under backpressure.
+    """
+
+    default_high_watermark = 1048576
+    default_low_watermark = 262144
+
+    def __init__(
+        self,
+        high_watermark: int = default_high_watermark,
+        low_watermark: int = default_low_watermark,
+        period_factor: float = 4.0,
+    ) -> None:
+        if low_watermark > high_watermark:
+            raise ValueError(
+                f"low_watermark={low_watermark} must not be larger than "
+                f"high_watermark={high_watermark}."
+            )
+
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+        self.period_factor = period_factor
+
+        self.active = False
+        self.pending_bytes = 0
+        self.max_pending_bytes = 0
+        self.activations = 0
+
+        self._callbacks: List[Callable[[bool], None]] = []
+
+    @classmethod
+    def from_config(cls, config: str) -> "BackpressureMonitor":
+        """Create a monitor from a configuration string.
+
+        Parameters
+        ----------
+        config : `str`
+            ``high_watermark:low_watermark`` in bytes, e.g. "1048576:262144".
+            Empty to use the default watermarks.
+
+        Returns
+        -------
+        `BackpressureMonitor`
+            Backpressure monitor.
+        """
+        if not config.strip():
+            return cls()
+
+        high_watermark, low_watermark = config.strip().split(":")
+        return cls(high_watermark=int(high_watermark), low_watermark=int(low_watermark))
+
+    def add_callback(self, callback: Callable[[bool], None]) -> None:
+        """Add a function called with the new state when backpressure is
+        activated or released.
+        """
+        self._callbacks.append(callback)
+
+    def update(self, pending_bytes: int) -> bool:
+        """Update the number of pending bytes.
+
+        Parameters
+        ----------
+        pending_bytes : `int`
+            Bytes waiting to be sent to the manager.
+
+        Returns
+        -------
+        `bool`
+            `True` if backpressure was activated or released.
+        """
+        self.pending_bytes = pending_bytes
+        self.max_pending_bytes = max(self.max_pending_bytes, pending_bytes)
+
+        if not self.active and pending_bytes >= self.high_watermark:
+            self.activations += 1
+            self._set_active(True)
+            return True
+        if self.active and pending_bytes <= self.low_watermark:
+            self._set_active(False)
+            return True
+        return False
+
+    def get_period(self, period: float) -> float:
+        """Return the period to use for periodic data.
+
+        Parameters
+        ----------
+        period : `float`
+            Nominal period (seconds).
+
+        Returns
+        -------
+        `float`
+            ``period`` scaled by `period_factor` under backpressure.
+        """
+        return period * self.period_factor if self.active else period
+
+    def get_stats(self) -> dict:
+        return dict(
+            active=self.active,
+            pending_bytes=self.pending_bytes,
+            max_pending_bytes=self.max_pending_bytes,
+            activations=self.activations,
+        )
+
+    def _set_active(self, active: bool) -> None:
+        self.active = active
+        for callback in self._callbacks:
+            callback(active)
+
+
+class InitialDataScheduler:
+    """Send initial data messages ordered by importance and paced to a
+    bytes per second budget.
+
+    Messages of the most important data streams (e.g. summaryState) are sent
+    first and bulky ones (e.g. configurations) last. Messages are handed to
+    the send queue one at a time, at most ``bytes_per_second`` on average,
+    so they are interleaved with live data instead of being queued in a
+    single burst.
+
+    Parameters
+    ----------
+    bytes_per_second : `float`, optional
+        Maximum rate of initial data. 0 to send all messages at once.
+    first : `list` of `str`, optional
+        Names of the data streams sent first, most important first.
+    last : `list` of `str`, optional
+        Names of the bulky data streams sent last.
+    backpressure : `BackpressureMonitor`, optional
+        Pause sending while backpressure is active.
+    """
+
+    default_first = ("summaryState", "heartbeat", "errorCode", "alarm")
+    default_last = (
+        "configurationsAvailable",
+        "configurationApplied",
+        "settingVersions",
+        "softwareVersions",
+        "largeFileObjectAvailable",
+        "availableScriptsStream",
+    )
+
+    def __init__(
+        self,
+        bytes_per_second: float = 0.0,
+        first: Optional[List[str]] = None,
+        last: Optional[List[str]] = None,
+        backpressure: Optional[BackpressureMonitor] = None,
+    ) -> None:
+        self.bytes_per_second = bytes_per_second
+        self.backpressure = backpressure
+
+        first = self.default_first if first is None else first
+        last = self.default_last if last is None else last
+
+        self._default_rank = len(first)
+        self._ranks = {
+            **{name: len(first) + 1 + rank for rank, name in enumerate(last)},
+            **{name: rank for rank, name in enumerate(first)},
+        }
+
+        self.bytes_sent = 0
+        self.messages_sent = 0
+
+    def get_rank(self, name: str) -> int:
+        """Return the rank of a data stream, lower ranks are sent first.
+
+        Parameters
+        ----------
+        name : `str`
+            Name of the data stream, with or without topic prefix (e.g.
+            "evt_summaryState").
+
+        Returns
+        -------
+        `int`
+            Rank.
+        """
+        if name.startswith(("evt_", "tel_")):
+            name = name.split("_", maxsplit=1)[1]
+        return self._ranks.get(name.lstrip("_"), self._default_rank)
+
+    def order(
+        self, messages: List[Tuple[str, Union[str, bytes]]]
+    ) -> List[Union[str, bytes]]:
+        """Order messages by the rank of their data stream.
+
+        Parameters
+        ----------
+        messages : `list` of `tuple`
+            Data stream name and message. Messages of the same rank keep
+            their order.
+
+        Returns
+        -------
+        `list` of `str` or `bytes`
+            Messages.
+        """
+        return [
+            message
+            for _, message in sorted(messages, key=lambda item: self.get_rank(item[0]))
+        ]
+
+    async def send(
+        self,
+        messages: List[Union[str, bytes]],
+        send_message: Callable[[Union[str, bytes]], Any],
+    ) -> None:
+        """Send messages, in order, within the bytes per second budget.
+
+        Parameters
+        ----------
+        messages : `list` of `str` or `bytes`
+            Messages, see `order`.
+        send_message : coroutine
+            Coroutine function used to send each message.
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        sent_bytes = 0
+
+        for message in messages:
+            while self.backpressure is not None and self.backpressure.active:
+                # Do not make up for the time paused.
+                pause_start = loop.time()
+                await asyncio.sleep(0.1)
+                start += loop.time() - pause_start
+
+            await send_message(message)
+            sent_bytes += len(message)
+            self.bytes_sent += len(message)
+            self.messages_sent += 1
+
+            if self.bytes_per_second > 0.0:
+                delay = start + sent_bytes / self.bytes_per_second - loop.time()
+                if delay > 0.0:
+                    await asyncio.sleep(delay)
@@ -0,0 +1,216 @@
+# This file is part of LOVE-producer.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by Inria Chile and
+# the LSST Project (https://www.lsst.org).
+#
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership and dependencies.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+__all__ = ["MessageSpool"]
+
+import logging
+import mmap
+import os
+import struct
+from typing import Optional, Union
+
+
+class MessageSpool:
+    """Bounded ring buffer of messages, stored in a memory-mapped file.
+
+    Messages that must be delivered to the manager are spooled while the
+    connection is down and replayed, oldest first, once it is back. Messages
+    are stored already encoded, so they keep their original ``producer_snd``.
+    When the spool is full the oldest messages are dropped.
+
+    The read and write positions are stored in the file header, so spooled
+    messages survive a restart of the producer.
+
+    Parameters
+    ----------
+    path : `str`
+        Path of the spool file. It is created if it does not exist, and
+        recreated (empty) if it has a different size or is not a spool file.
+    size : `int`, optional
+        Size of the spool file (bytes), including the header.
+    log : `logging.Logger`, optional
+        Logger facility.
+    """
+
+    magic = b"LOVESPL1"
+
+    # magic, read position, write position, used bytes, number of messages.
+    _header = struct.Struct("<8sQQQQ")
+    # message size, message kind.
+    _record_header = struct.Struct("<IB")
+
+    _text = 0
+    _binary = 1
+
+    def __init__(
+        self, path: str, size: int = 16777216, log: Optional[logging.Logger] = None
+    ) -> None:
+        self.log = (
+            logging.getLogger(type(self).__name__)
+            if log is None
+            else log.getChild(type(self).__name__)
+        )
+
+        if size <= self._header.size + self._record_header.size:
+            raise ValueError(f"Spool size {size} is too small.")
+
+        self.path = path
+        self.capacity = size - self._header.size
+
+        self.dropped = 0
+
+        create = not os.path.exists(path) or os.path.getsize(path) != size
+
+        with open(path, "a+b") as spool_file:
+            if create:
+                spool_file.truncate(size)
+            self._mmap = mmap.mmap(spool_file.fileno(), size)
+
+        magic, self._head, self._tail, self._used, self._count = (
+            self._header.unpack_from(self._mmap, 0)
+        )
+
+        if create or magic != self.magic:
+            self._head = self._tail = self._used = self._count = 0
+            self._write_header()
+        elif self._count > 0:
+            self.log.info(f"Found {self._count} spooled messages in {path}.")
+
+    def append(self, message: Union[str, bytes]) -> bool:
+        """Add a message to the spool, dropping the oldest messages if there
+        is not enough space.
+
+        Parameters
+        ----------
+        message : `str` or `bytes`
+            Encoded message.
+
+        Returns
+        -------
+        `bool`
+            `True` if the message was spooled, `False` if it is larger than
+            the spool.
+        """
+        if isinstance(message, str):
+            data, kind = message.encode(), self._text
+        else:
+            data, kind = bytes(message), self._binary
+
+        record_size = self._record_header.size + len(data)
+
+        if record_size > self.capacity:
+            self.log.warning(
+                f"Message of {len(data)} bytes does not fit in the spool. Dropping."
+            )
+            self.dropped += 1
+            return False
+
+        while self._used + record_size > self.capacity:
+            self._pop_record()
+            self.dropped += 1
+
+        self._write(self._tail, self._record_header.pack(len(data), kind) + data)
+        self._tail = (self._tail + record_size) % self.capacity
+        self._used += record_size
+        self._count += 1
+        self._write_header()
+
+        return True
+
+    def pop(self) -> Optional[Union[str, bytes]]:
+        """Remove and return the oldest message.
+
+        Returns
+        -------
+        `str`, `bytes` or `None`
+            Oldest message, `None` if the spool is empty.
+        """
+        if self._count == 0:
+            return None
+
+        message = self._pop_record()
+        self._write_header()
+
+        return message
+
+    def flush(self) -> None:
+        """Flush the spool to disk."""
+        self._mmap.flush()
+
+    def close(self) -> None:
+        """Flush and close the spool file."""
+        if not self._mmap.closed:
+            self._mmap.flush()
+            self._mmap.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the spooled messages."""
+        return self._used
+
+    def _pop_record(self) -> Union[str, bytes]:
+        size, kind = self._record_header.unpack(
+            self._read(self._head, self._record_header.size)
+        )
+        data = self._read((self._head + self._record_header.size) % self.capacity, size)
+
+        record_size = self._record_header.size + size
+        self._head = (self._head + record_size) % self.capacity
+        self._used -= record_size
+        self._count -= 1
+
+        return data.decode() if kind == self._text else data
+
+    def _read(self, position: int, size: int) -> bytes:
+        start = self._header.size + position
+        first = min(size, self.capacity - position)
+        end = start + first
+        data = self._mmap[start:end]
+        if first < size:
+            base = self._header.size
+            end = base + size - first
+            data += self._mmap[base:end]
+        return data
+
+    def _write(self, position: int, data: bytes) -> None:
+        start = self._header.size + position
+        first = min(len(data), self.capacity - position)
+        end = start + first
+        self._mmap[start:end] = data[:first]
+        if first < len(data):
+            base = self._header.size
+            end = base + len(data) - first
+            self._mmap[base:end] = data[first:]
+
+    def _write_header(self) -> None:
+        self._header.pack_into(
+            self._mmap,
+            0,
+            self.magic,
+            self._head,
+            self._tail,
+            self._used,
+            self._count,
+        )
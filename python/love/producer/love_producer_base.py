@@ -25,9 +25,30 @@ __all__ = ["LoveProducerBase"]
 import asyncio
 import hashlib
 import logging
-from typing import Any, AsyncIterator, Callable, Coroutine, List, Optional, Tuple
-
+import os
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Coroutine,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from love.producer.love_manager_encoder import (
+    EncodedBinaryPayload,
+    EncodedPayload,
+    MessageEncoder,
+)
 from love.producer.love_manager_message import LoveManagerMessage
+from love.producer.love_manager_send_queue import (
+    BackpressureMonitor,
+    MessagePriority,
+)
 
 
 class LoveProducerBase:
@@ -76,14 +97,37 @@ class LoveProducerBase:
 
         self._send_message: Optional[Callable[[str], None]] = None
 
+        self.backpressure: Optional[BackpressureMonitor] = None
+
         self._period_monitor: float = 2.0
 
         self._data_to_monitor_periodically_functions: list = []
         self._data_to_monitor_periodically_coroutines: list = []
 
         self._asynchronous_data_last_samples: dict = dict()
+        # Encoded payloads of the last samples, created when first sent
+        # again and removed when the sample is updated.
+        self._encoded_last_samples: dict = dict()
         self._asynchronous_data_category: dict = dict()
 
+        self.must_deliver_data: set = set()
+
+        # Data streams stored as received and only converted when sent, at
+        # most once per lazy_data_period, or requested.
+        self.lazy_data: set = set()
+        self.lazy_data_period: float = 0.1
+        self._lazy_raw_samples: set = set()
+        self._lazy_send_tasks: dict = dict()
+
+        self.stream_sequences: bool = os.environ.get(
+            "LOVE_PRODUCER_RESUME", "False"
+        ).lower() in ("true", "1")
+        self._stream_sequences: dict = dict()
+
+        # Number of data stream messages produced, used to estimate the load
+        # of the producer.
+        self.messages_produced: int = 0
+
         self._additional_data_callbacks: dict = dict()
 
         self.done_task: asyncio.Future = asyncio.Future()
@@ -104,6 +148,34 @@ class LoveProducerBase:
         yield self.get_message_initial_state_all_as_json()
         yield self.get_message_initial_state_as_json()
 
+    def get_schema_messages_as_json(self) -> List[str]:
+        """Return the schema messages of the data streams of this producer.
+
+        Producers that send compact, values only, payloads publish the data
+        types and units of their streams in these messages. By default
+        producers send self-describing payloads and have no schema messages.
+
+        Returns
+        -------
+        `list` of `str`
+            Schema messages as json.
+        """
+        return []
+
+    def get_compression_samples(self) -> List[Union[str, bytes]]:
+        """Return sample messages representative of the data streams of this
+        producer.
+
+        The samples are used to train the dictionary used to compress messages
+        sent to the manager. By default producers provide no samples.
+
+        Returns
+        -------
+        `list` of `str` or `bytes`
+            Sample messages, encoded in the current message format.
+        """
+        return []
+
     def get_message_initial_state_as_json(self) -> str:
         """Return the initial subscription message for this producer.
 
@@ -181,11 +253,26 @@ class LoveProducerBase:
         is_data_stream_stored = self.is_data_stream_stored(
             message_data["data"][0]["stream"]
         )
-        self.log.debug(
-            f"has_matched_metadata={has_matched_metadata}, is_data_stream_stored={is_data_stream_stored}"
-        )
+        if self.log.isEnabledFor(logging.DEBUG):
+            self.log.debug(
+                f"has_matched_metadata={has_matched_metadata}, is_data_stream_stored={is_data_stream_stored}"
+            )
         return has_matched_metadata and is_data_stream_stored
 
+    def get_reply_routes(self) -> List[Tuple[str, Optional[int], Optional[str]]]:
+        """Return the requests from the manager this producer may reply to.
+
+        Used by `LoveManagerClient` to dispatch each request only to the
+        producers that may reply to it.
+
+        Returns
+        -------
+        `list` of `tuple`
+            CSC name, index and stream name of the requests. `None` matches
+            any index or stream.
+        """
+        return [(self.component_name, self.get_metadata().get("salindex", None), None)]
+
     def has_matched_metadata(self, message_data: dict) -> bool:
         """Does the message data has the correct metadata?
 
@@ -200,13 +287,14 @@ class LoveProducerBase:
         `bool`
             Does message_data and metadata has matched information?
         """
-        metadata = self.get_metadata()
+        metadata = dict(self.get_metadata())
         metadata[self._component_name_in_manager_message] = self.component_name
 
         data = message_data["data"][0]
 
-        self.log.debug(f"metadata: {metadata}")
-        self.log.debug(f"data: {data}")
+        if self.log.isEnabledFor(logging.DEBUG):
+            self.log.debug(f"metadata: {metadata}")
+            self.log.debug(f"data: {data}")
 
         return (
             all(
@@ -243,21 +331,82 @@ class LoveProducerBase:
         """Send reply to message data."""
         sample_name = self.get_sample_name(message_data)
 
-        await self.send_message(
-            self.get_message_category_as_json(
-                category="event", data_as_dict=self.retrieve_one_sample(sample_name)
-            )
+        await self.send_message(self.get_stored_sample_message(sample_name))
+
+    def get_initial_data_messages(self) -> Dict[str, Union[str, bytes]]:
+        """Return the initial data messages, with the last sample of each
+        stored data stream.
+
+        Returns
+        -------
+        `dict` of `str` or `bytes`
+            Encoded messages, by data stream name.
+        """
+        return {
+            sample_name: self.get_stored_sample_message(sample_name)
+            for sample_name in self._asynchronous_data_last_samples
+        }
+
+    def get_stored_sample_message(self, sample_name: str) -> Union[str, bytes]:
+        """Return the event message with the last stored sample of a data
+        stream, to send it again.
+
+        Parameters
+        ----------
+        sample_name : `str`
+            Name of the data stream.
+
+        Returns
+        -------
+        `str` or `bytes`
+            Encoded message.
+        """
+        return self.get_data_stream_message_as_json(
+            category="event",
+            name=sample_name,
+            data_as_dict=self.retrieve_one_encoded_sample(sample_name),
+            resend=True,
         )
 
     async def send_initial_data(self):
         """Send initial data."""
 
+        for message in self.get_initial_data_messages().values():
+            await self.send_message(message)
+
+    async def send_missed_data(self, last_sequences: Dict[tuple, int]) -> int:
+        """Send the stored samples the manager missed while disconnected.
+
+        Used instead of `send_initial_data` when resuming a connection, see
+        `LoveManagerClient`. A sample is sent unless the manager reported
+        having received its sequence number.
+
+        Parameters
+        ----------
+        last_sequences : `dict`
+            Last sequence number received by the manager, by stream id (see
+            `get_stream_id`).
+
+        Returns
+        -------
+        `int`
+            Number of samples sent.
+        """
+        sent = 0
+
         for sample_name in self._asynchronous_data_last_samples:
-            await self.send_message(
-                self.get_message_category_as_json(
-                    category="event", data_as_dict=self.retrieve_one_sample(sample_name)
-                )
-            )
+            last_sequence = last_sequences.get(self.get_stream_id(sample_name), None)
+            if (
+                last_sequence is not None
+                and sample_name in self._stream_sequences
+                and last_sequence >= self._stream_sequences[sample_name]
+            ):
+                continue
+
+            await self.send_message(self.get_stored_sample_message(sample_name))
+            sent += 1
+
+        return sent
 
     def get_sample_name(self, data_stream: dict) -> str:
         return next(iter(data_stream["data"][0]["stream"].values()))
@@ -265,6 +414,17 @@ class LoveProducerBase:
     def add_metadata(self, **kwargs) -> None:
         self._love_manager_message.add_metadata(**kwargs)
 
+    def set_message_encoder(self, encoder: MessageEncoder) -> None:
+        """Set the encoder used for messages produced from now on.
+
+        Parameters
+        ----------
+        encoder : `MessageEncoder`
+            Message encoder.
+        """
+        self._love_manager_message.set_encoder(encoder)
+        self._encoded_last_samples = dict()
+
     def get_metadata(self) -> dict:
         return self._love_manager_message.metadata
 
@@ -331,28 +491,30 @@ class LoveProducerBase:
                     for _, category in self._data_to_monitor_periodically_coroutines
                 ]
 
-                for data, category in data_category_to_send_from_functions:
-                    if data is not None:
+                for data, category in data_category_to_send_from_functions + list(
+                    zip(data_to_send_from_coroutines, category_to_send_from_coroutines)
+                ):
+                    if data is None:
+                        continue
+
+                    name, data_as_json = self._convert_periodic_data_to_json(data)
+
+                    if data_as_json is not None:
                         await self.send_message(
-                            self.get_message_category_as_json(
+                            self.get_data_stream_message_as_json(
                                 category=category,
-                                data_as_dict=self._convert_data_to_dict(data)[1],
+                                name=name,
+                                data_as_dict=data_as_json,
                             )
                         )
-
-                for data, category in zip(
-                    data_to_send_from_coroutines, category_to_send_from_coroutines
-                ):
-                    await self.send_message(
-                        self.get_message_category_as_json(
-                            category=category,
-                            data_as_dict=self._convert_data_to_dict(data)[1],
-                        )
-                    )
             except Exception:
                 self.log.exception("Error handling periodic data.")
             finally:
-                await asyncio.sleep(self.period_default_in_seconds)
+                await asyncio.sleep(
+                    self.backpressure.get_period(self.period_default_in_seconds)
+                    if self.backpressure is not None
+                    else self.period_default_in_seconds
+                )
 
     async def handle_asynchronous_data_callback(self, data: Any) -> None:
         """Callback function to handle asynchronous data.
@@ -364,22 +526,81 @@ class LoveProducerBase:
         """
 
         try:
-            data_key, data_as_dict = self._convert_data_to_dict(data)
+            data_key = self.get_data_name(data) if self.lazy_data else None
 
-            self.store_samples(**{data_key: data_as_dict})
+            if data_key in self.lazy_data:
+                self.store_raw_sample(data_key, data)
+            else:
+                data_key, data_as_json = self._convert_data_to_json(data)
 
-            await self.send_message(
-                self.get_message_category_as_json(
-                    category=self.get_asynchronous_data_category(data_key),
-                    data_as_dict=data_as_dict,
+                self.store_samples(**{data_key: data_as_json})
+
+                await self.send_message(
+                    self.get_data_stream_message_as_json(
+                        category=self.get_asynchronous_data_category(data_key),
+                        name=data_key,
+                        data_as_dict=data_as_json,
+                    )
                 )
-            )
 
             if data_key in self._additional_data_callbacks:
                 await self._additional_data_callbacks[data_key](data)
         except Exception:
             self.log.exception("Error handling asynchronous data callback.")
 
+    def store_raw_sample(self, name: str, data: Any) -> None:
+        """Store a sample of a data stream in `lazy_data` as received and
+        schedule sending it.
+
+        The sample is only converted when it is sent, after
+        `lazy_data_period` seconds (longer under backpressure), or when it is
+        requested. Samples replaced by a newer one before that are never
+        converted.
+
+        Parameters
+        ----------
+        name : `str`
+            Name of the data stream.
+        data:
+            Input data, in the format accepted by `_convert_data_to_json`.
+        """
+        self._asynchronous_data_last_samples[name] = data
+        self._encoded_last_samples.pop(name, None)
+        self._lazy_raw_samples.add(name)
+
+        if name not in self._lazy_send_tasks:
+            self._lazy_send_tasks[name] = asyncio.create_task(
+                self._send_lazy_data(name)
+            )
+
+    async def _send_lazy_data(self, name: str) -> None:
+        """Send the last sample of a data stream in `lazy_data`.
+
+        Parameters
+        ----------
+        name : `str`
+            Name of the data stream.
+        """
+        try:
+            await asyncio.sleep(
+                self.backpressure.get_period(self.lazy_data_period)
+                if self.backpressure is not None
+                else self.lazy_data_period
+            )
+        finally:
+            del self._lazy_send_tasks[name]
+
+        try:
+            await self.send_message(
+                self.get_data_stream_message_as_json(
+                    category=self.get_asynchronous_data_category(name),
+                    name=name,
+                    data_as_dict=self.retrieve_one_encoded_sample(name),
+                )
+            )
+        except Exception:
+            self.log.exception(f"Error sending {name} data.")
+
     def register_asynchronous_data_category(self, name: str, category: str) -> None:
         self._asynchronous_data_category[name] = category
 
@@ -396,6 +617,8 @@ class LoveProducerBase:
         """
         for key in kwargs:
             self._asynchronous_data_last_samples[key] = kwargs[key]
+            self._encoded_last_samples.pop(key, None)
+            self._lazy_raw_samples.discard(key)
 
     def retrieve_samples(self, *args: List[str]) -> List[dict]:
         """Return samples from internal asynchronous table.
@@ -411,7 +634,7 @@ class LoveProducerBase:
             List of dictionary with the requested samples.
         """
 
-        return [self._asynchronous_data_last_samples[key] for key in args]
+        return [self.retrieve_one_sample(key) for key in args]
 
     def retrieve_one_sample(self, sample_name: str) -> dict:
         """Retrieve one sample from internal_asynchronous table.
@@ -423,17 +646,205 @@ class LoveProducerBase:
 
         Returns
         -------
-        `dict`
-            Sample.
+        `dict` or `EncodedPayload`
+            Sample. Samples stored by `handle_asynchronous_data_callback` are
+            kept already encoded.
         """
+        if sample_name in self._lazy_raw_samples:
+            _, self._asynchronous_data_last_samples[sample_name] = (
+                self._convert_data_to_json(
+                    self._asynchronous_data_last_samples[sample_name]
+                )
+            )
+            self._lazy_raw_samples.discard(sample_name)
+
         return self._asynchronous_data_last_samples[sample_name]
 
-    def get_message_category_as_json(self, category: str, data_as_dict: dict) -> str:
+    def retrieve_one_encoded_sample(
+        self, sample_name: str
+    ) -> Union[EncodedPayload, EncodedBinaryPayload]:
+        """Retrieve one sample from internal asynchronous table, encoded with
+        the current message encoder.
+
+        The encoded sample is cached until the sample is updated, so sending
+        the same sample several times (e.g. replies to the manager and initial
+        data) only refreshes the message timestamp.
+
+        Parameters
+        ----------
+        sample_name: `str`
+            Name of the sample in internal data structure.
+
+        Returns
+        -------
+        `EncodedPayload` or `EncodedBinaryPayload`
+            Encoded sample.
+        """
+        if sample_name not in self._encoded_last_samples:
+            self._encoded_last_samples[sample_name] = (
+                self._love_manager_message.encoder.encode_payload(
+                    self.retrieve_one_sample(sample_name)
+                )
+            )
+
+        return self._encoded_last_samples[sample_name]
+
+    def get_message_category_as_json(
+        self,
+        category: str,
+        data_as_dict: Union[dict, EncodedPayload, EncodedBinaryPayload],
+        priority: Optional[MessagePriority] = None,
+        stream: Optional[Hashable] = None,
+        must_deliver: bool = False,
+    ) -> Union[str, bytes]:
         """"""
         return self._love_manager_message.get_message_category_as_json(
-            category=category, data=data_as_dict
+            category=category,
+            data=data_as_dict,
+            priority=priority,
+            stream=stream,
+            must_deliver=must_deliver,
+        )
+
+    def get_data_stream_message_as_json(
+        self,
+        category: str,
+        name: str,
+        data_as_dict: Union[dict, EncodedPayload, EncodedBinaryPayload],
+        resend: bool = False,
+    ) -> Union[str, bytes]:
+        """Return the encoded message of a sample of a data stream.
+
+        The message is tagged with the stream key (see `get_stream_key`), so
+        pending messages of the same stream can be replaced by newer ones
+        before being sent, unless the stream is in `must_deliver_data`.
+
+        If `stream_sequences` is set, the payload includes the stream
+        sequence number, see `add_stream_sequence`.
+
+        Parameters
+        ----------
+        category : `str`
+            Message category.
+        name : `str`
+            Name of the data stream.
+        data_as_dict : `dict`, `EncodedPayload` or `EncodedBinaryPayload`
+            Message payload.
+        resend : `bool`, optional
+            Is the payload a stored sample being sent again?
+
+        Returns
+        -------
+        `str` or `bytes`
+            Encoded message.
+        """
+        self.messages_produced += 1
+
+        if self.stream_sequences:
+            data_as_dict = self.add_stream_sequence(name, data_as_dict, resend)
+
+        return self.get_message_category_as_json(
+            category=category,
+            data_as_dict=data_as_dict,
+            stream=self.get_stream_key(name),
+            must_deliver=name in self.must_deliver_data,
         )
 
+    def add_stream_sequence(
+        self,
+        name: str,
+        payload: Union[dict, EncodedPayload, EncodedBinaryPayload],
+        resend: bool = False,
+    ) -> Union[dict, EncodedPayload, EncodedBinaryPayload]:
+        """Add the stream sequence number to a payload.
+
+        Each data stream has its own sequence number, incremented for every
+        new sample, which lets the manager detect missing samples and report
+        the last one it received when resuming a connection.
+
+        Parameters
+        ----------
+        name : `str`
+            Name of the data stream.
+        payload : `dict`, `EncodedPayload` or `EncodedBinaryPayload`
+            Message payload.
+        resend : `bool`, optional
+            Is the payload a stored sample being sent again? If so, it keeps
+            the current sequence number.
+
+        Returns
+        -------
+        `dict`, `EncodedPayload` or `EncodedBinaryPayload`
+            Payload with the ``sequence`` field.
+        """
+        if not resend:
+            self._stream_sequences[name] = self._stream_sequences.get(name, 0) + 1
+
+        return self._love_manager_message.encoder.add_payload_field(
+            payload, "sequence", self._stream_sequences.get(name, 0)
+        )
+
+    def get_stream_id(self, name: str) -> Tuple[str, int, str]:
+        """Return the identifier of a data stream as seen by the manager.
+
+        Parameters
+        ----------
+        name : `str`
+            Name of the data stream.
+
+        Returns
+        -------
+        `tuple`
+            CSC name, index and stream name of the payloads of the stream.
+        """
+        sample = self._asynchronous_data_last_samples.get(name, None)
+
+        if isinstance(sample, dict) and len(sample.get("data", dict())) > 0:
+            return (
+                sample.get("csc", self.component_name),
+                sample.get("salindex", 0),
+                next(iter(sample["data"])),
+            )
+
+        return (self.component_name, self.get_metadata().get("salindex", 0), name)
+
+    def get_stream_key(self, name: str) -> Optional[Hashable]:
+        """Return the key identifying a data stream of this producer in the
+        send queue.
+
+        Parameters
+        ----------
+        name : `str`
+            Name of the data stream.
+
+        Returns
+        -------
+        `tuple` or `None`
+            Stream key, `None` if samples of the stream must not replace each
+            other.
+        """
+        return (self.component_name, name)
+
+    def get_data_name(self, data: Any) -> str:
+        """Return the name of the data stream of the input data.
+
+        By default the data is converted with `_convert_data_to_dict`.
+        Subclasses that store data streams in `lazy_data` should override
+        this method with a cheaper lookup.
+
+        Parameters
+        ----------
+        data:
+            Input data.
+
+        Returns
+        -------
+        `str`
+            Name of the data stream.
+        """
+        name, _ = self._convert_data_to_dict(data)
+        return name
+
     def _convert_data_to_dict(self, data: Any) -> Tuple[str, dict]:
         """Convert data to dictionary.
 
@@ -483,6 +894,54 @@ class LoveProducerBase:
 
         return name, data_as_dict
 
+    def _convert_data_to_json(
+        self, data: Any
+    ) -> Tuple[str, Union[EncodedPayload, EncodedBinaryPayload]]:
+        """Convert data to the encoded payload of a message.
+
+        By default the data is converted with `_convert_data_to_dict` and the
+        resulting dictionary is encoded. Subclasses that can serialize their
+        data directly should override this method.
+
+        Parameters
+        ----------
+        data:
+            Data to convert.
+
+        Returns
+        -------
+        name: `str`
+            Assigned name of the kind of data stream.
+        data_as_json: `EncodedPayload` or `EncodedBinaryPayload`
+            Encoded data payload.
+        """
+        name, data_as_dict = self._convert_data_to_dict(data)
+
+        return name, self._love_manager_message.encoder.encode_payload(data_as_dict)
+
+    def _convert_periodic_data_to_json(
+        self, data: Any
+    ) -> Tuple[str, Optional[Union[EncodedPayload, EncodedBinaryPayload]]]:
+        """Convert periodic data to the encoded payload of a message.
+
+        By default the data is converted with `_convert_data_to_json`.
+        Subclasses may override this method to reduce the data sent
+        periodically.
+
+        Parameters
+        ----------
+        data:
+            Data to convert.
+
+        Returns
+        -------
+        name: `str`
+            Assigned name of the kind of data stream.
+        data_as_json: `EncodedPayload`, `EncodedBinaryPayload` or `None`
+            Encoded data payload, `None` if nothing needs to be sent.
+        """
+        return self._convert_data_to_json(data)
+
     def generate_data_name(self, data_repr: str) -> str:
         """Generate data name.
 
@@ -535,6 +994,15 @@ class LoveProducerBase:
     def period_default_in_seconds(self) -> float:
         return self._period_monitor
 
+    @property
+    def under_backpressure(self) -> bool:
+        """Is the manager connection under backpressure?
+
+        See `BackpressureMonitor`. When set by `LoveManagerClient`, periodic
+        data is polled less often under backpressure.
+        """
+        return self.backpressure is not None and self.backpressure.active
+
     @property
     def send_message(self) -> Callable[[str], None]:
         """Send message function.
@@ -567,10 +1035,17 @@ class LoveProducerBase:
         self._component_name = component_name
         self._love_manager_message = LoveManagerMessage(component_name=component_name)
 
+    def cancel_lazy_data_tasks(self) -> None:
+        """Cancel the pending sends of `lazy_data` samples."""
+        for task in list(self._lazy_send_tasks.values()):
+            task.cancel()
+
     async def close(self):
         if not self.done_task.done():
             self.done_task.set_result(True)
 
+        self.cancel_lazy_data_tasks()
+
         try:
             await asyncio.wait_for(
                 self._monitor_periodic_data_task, timeout=self._period_monitor * 2
@@ -23,13 +23,22 @@
 __all__ = ["LoveProducerCSC"]
 
 import asyncio
-import copy
 import datetime
+import json
 import logging
-from typing import Any, Awaitable, Optional, Tuple
+import os
+import time
+from typing import Any, Awaitable, Dict, Hashable, List, Optional, Tuple, Union
 
+from love.producer.love_manager_encoder import EncodedBinaryPayload, EncodedPayload
 from love.producer.love_producer_base import LoveProducerBase
-from love.producer.producer_utils import get_data_type
+from love.producer.love_topic_delta import TopicDeltaEncoder, get_deadbands
+from love.producer.love_topic_serializer import TopicConverter, TopicSerializer
+from love.producer.producer_utils import (
+    get_data_type,
+    get_topic_attribute_names,
+    get_topic_shard,
+)
 from lsst.ts.salobj import Domain, Remote
 
 
@@ -37,19 +46,31 @@ class LoveProducerCSC(LoveProducerBase):
     """Specialized LOVE producer to deal with generic CSC behavior."""
 
     def __init__(
-        self, domain: Domain, csc: str, log: Optional[logging.Logger] = None, **kwargs
+        self,
+        domain: Domain,
+        csc: str,
+        log: Optional[logging.Logger] = None,
+        topic_shard: Optional[Tuple[int, int]] = None,
+        **kwargs,
     ) -> None:
         super().__init__(component_name=csc, log=log)
 
         self.add_metadata(**kwargs)
 
+        self.topic_shard = topic_shard
+
+        data_kwargs = (
+            kwargs if topic_shard is None else self.get_topic_shard_data(**kwargs)
+        )
+
         include = (
             None
-            if "periodic_data" not in kwargs and "asynchronous_data" not in kwargs
+            if "periodic_data" not in data_kwargs
+            and "asynchronous_data" not in data_kwargs
             else [
                 topic.split("_", maxsplit=1)[1]
-                for topic in kwargs.get("periodic_data", [])
-                + kwargs.get("asynchronous_data", [])
+                for topic in data_kwargs.get("periodic_data", [])
+                + data_kwargs.get("asynchronous_data", [])
             ]
         )
 
@@ -66,12 +87,27 @@ class LoveProducerCSC(LoveProducerBase):
         self._non_topic_data_stream = {}
 
         self._revcode_topic_attribute_name_map: dict = dict()
-        self._template_manager_message: dict = dict()
+        self._topic_prefixes: Optional[dict] = None
+        self._topic_converters: dict = dict()
+        self._topic_serializers: dict = dict()
+        self._topic_delta_encoders: dict = dict()
+        self._periodic_last_sent: dict = dict()
+
+        self.schema_once: bool = self.send_schema_once
+        self.must_deliver_data.update(self.get_must_deliver_topics())
+        self.lazy_data.update(self.get_lazy_topics() - self.must_deliver_data)
+        self.lazy_data_period = float(
+            os.environ.get("LOVE_PRODUCER_LAZY_TOPICS_PERIOD", "0.1")
+        )
+        self.telemetry_delta: bool = self.send_telemetry_delta
+        self.delta_keyframe_interval: int = self.telemetry_delta_keyframe_interval
+        self.periodic_keepalive: float = self.periodic_data_keepalive
+        self.deadband_config: dict = self.get_deadband_config()
 
         self._need_reply_category = {"initial_state"}
 
-        self.periodic_data: list = self.get_periodic_data(**kwargs)
-        self.asynchronous_data: list = self.get_asynchronous_data(**kwargs)
+        self.periodic_data: list = self.get_periodic_data(**data_kwargs)
+        self.asynchronous_data: list = self.get_asynchronous_data(**data_kwargs)
 
         self.store_last_sample_timeout: float = 0.5
         self.heartbeat_timeout = 2.0
@@ -107,14 +143,15 @@ class LoveProducerCSC(LoveProducerBase):
         salindex = data.get("salindex", 0)
 
         try:
-            self.log.debug(
-                "Should reply to message_data: "
-                f"{category in self._need_reply_category}, "
-                f"{csc in self.reply_names}, "
-                f"{salindex == self.remote.salinfo.index}, "
-                f"{self.is_data_stream_stored(dict(stream=self.get_sample_name(message_data)))}. "
-                f"stream={self.get_sample_name(message_data)}"
-            )
+            if self.log.isEnabledFor(logging.DEBUG):
+                self.log.debug(
+                    "Should reply to message_data: "
+                    f"{category in self._need_reply_category}, "
+                    f"{csc in self.reply_names}, "
+                    f"{salindex == self.remote.salinfo.index}, "
+                    f"{self.is_data_stream_stored(dict(stream=self.get_sample_name(message_data)))}. "
+                    f"stream={self.get_sample_name(message_data)}"
+                )
 
             return (
                 (category in self._need_reply_category)
@@ -134,6 +171,51 @@ class LoveProducerCSC(LoveProducerBase):
         topic_prefix = self._get_topic_prefix(topic_name=topic_name)
         return f"{topic_prefix}_{topic_name}"
 
+    def get_topic_shard_data(self, **kwargs) -> dict:
+        """Return the periodic and asynchronous data of the topic shard of
+        the producer.
+
+        A CSC can be split in several topic shards, each handled by a
+        different producer, usually in different processes, see
+        `get_topic_shard`. Only the first shard monitors the heartbeat.
+
+        Parameters
+        ----------
+        **kwargs
+            Producer arguments, with the optional ``periodic_data`` and
+            ``asynchronous_data`` lists of topics to split. By default all
+            telemetry and event topics are split.
+
+        Returns
+        -------
+        `dict`
+            ``periodic_data`` and ``asynchronous_data`` topics of the shard.
+        """
+        topic_names = (
+            kwargs.get("periodic_data", []) + kwargs.get("asynchronous_data", [])
+            if "periodic_data" in kwargs or "asynchronous_data" in kwargs
+            else get_topic_attribute_names(self.component_name)
+        )
+        shard_topic_names = set(get_topic_shard(topic_names, *self.topic_shard))
+
+        self.log.info(
+            f"Topic shard {self.topic_shard[0]} of {self.topic_shard[1]}: "
+            f"{sorted(shard_topic_names)}."
+        )
+
+        return dict(
+            periodic_data=[
+                topic_name
+                for topic_name in kwargs.get("periodic_data", topic_names)
+                if topic_name in shard_topic_names and topic_name.startswith("tel_")
+            ],
+            asynchronous_data=[
+                topic_name
+                for topic_name in kwargs.get("asynchronous_data", topic_names)
+                if topic_name in shard_topic_names and topic_name.startswith("evt_")
+            ],
+        )
+
     def get_periodic_data(self, **kwargs) -> dict:
         return dict(
             set(
@@ -189,20 +271,57 @@ class LoveProducerCSC(LoveProducerBase):
         if topic_name in self._non_topic_data_stream:
             return ""
 
-        topic_names_valid = (
-            self.remote.salinfo.event_names + self.remote.salinfo.telemetry_names
-        )
+        if self._topic_prefixes is None:
+            self._topic_prefixes = {
+                **{name: "tel" for name in self.remote.salinfo.telemetry_names},
+                **{name: "evt" for name in self.remote.salinfo.event_names},
+            }
+
+        prefix = self._topic_prefixes.get(topic_name, None)
 
-        if topic_name not in topic_names_valid:
+        if prefix is None:
             raise RuntimeError(
                 f"Invalid topic name for {self.component_name}: {topic_name}. "
-                f"Must be a valid event or telemetry name: {topic_names_valid}"
+                "Must be a valid event or telemetry name: "
+                f"{list(self._topic_prefixes)}"
             )
 
-        prefix = "evt" if topic_name in self.remote.salinfo.event_names else "tel"
-
         return prefix
 
+    def get_reply_routes(self) -> List[Tuple[str, Optional[int], Optional[str]]]:
+        """Return the requests from the manager this producer may reply to.
+
+        Override base class default behavior to route requests by CSC name,
+        index and topic (or non-topic data stream) name. Producers of a topic
+        shard only route requests for the topics of their shard.
+
+        Returns
+        -------
+        `list` of `tuple`
+            CSC name, index and stream name of the requests.
+        """
+        streams = (
+            [
+                *self.remote.salinfo.event_names,
+                *self.remote.salinfo.telemetry_names,
+                *self._non_topic_data_stream,
+            ]
+            if self.topic_shard is None
+            else [
+                *[
+                    topic_name.split("_", maxsplit=1)[1]
+                    for topic_name in {**self.periodic_data, **self.asynchronous_data}
+                ],
+                *self._non_topic_data_stream,
+            ]
+        )
+
+        return [
+            (csc, self.remote.salinfo.index, stream)
+            for csc in self.reply_names
+            for stream in streams
+        ]
+
     def generate_valid_topic_attribute_names(self, periodic_data: list) -> list:
         """For each entry in `periodic_data` check that is it part of the
         producer list of topics and return a valid list.
@@ -373,14 +492,98 @@ class LoveProducerCSC(LoveProducerBase):
         topic_data = topic.DataType()
         field_info = topic.topic_info.fields
 
-        self._template_manager_message[topic_name] = {
-            topic_attribute: {
-                "value": getattr(topic_data, topic_attribute),
-                "dataType": get_data_type(getattr(topic_data, topic_attribute)),
-                "units": f"{field_info[topic_attribute].units}",
-            }
+        fields = [
+            (
+                topic_attribute,
+                getattr(topic_data, topic_attribute),
+                get_data_type(getattr(topic_data, topic_attribute)),
+                f"{field_info[topic_attribute].units}",
+            )
             for topic_attribute in field_info
-        }
+        ]
+
+        topic_kwargs = dict(
+            csc=self.remote.salinfo.name,
+            salindex=self.remote.salinfo.index,
+            topic_name=topic_name.split("_", maxsplit=1)[1],
+            fields=fields,
+            as_list=topic_name not in self.periodic_data,
+        )
+
+        self._topic_converters[topic_name] = TopicConverter(**topic_kwargs)
+        self._topic_serializers[topic_name] = TopicSerializer(
+            values_only=self.schema_once, **topic_kwargs
+        )
+
+        if topic_name not in self.periodic_data:
+            return
+
+        deadbands = get_deadbands(
+            self.deadband_config,
+            csc=self.remote.salinfo.name,
+            salindex=self.remote.salinfo.index,
+            topic_name=topic_name,
+            fields=fields,
+        )
+
+        if self.telemetry_delta or len(deadbands) > 0:
+            self._topic_delta_encoders[topic_name] = TopicDeltaEncoder(
+                converter=self._topic_converters[topic_name],
+                keyframe_interval=self.delta_keyframe_interval,
+                values_only=self.schema_once,
+                deadbands=deadbands,
+                deltas=self.telemetry_delta,
+            )
+
+    def get_schema_messages_as_json(self) -> List[str]:
+        """Return the schema messages of the topics of this producer.
+
+        Override base class default behavior. Schema messages are only
+        produced when `schema_once` is set, in which case samples are sent
+        with values only.
+
+        Returns
+        -------
+        `list` of `str`
+            Schema messages as json, one per topic.
+        """
+        if not self.schema_once:
+            return []
+
+        return [
+            self._love_manager_message.get_message_category_as_json(
+                category="schema",
+                data=self._topic_converters[topic_name].get_schema(),
+            )
+            for topic_name in list(self.periodic_data) + list(self.asynchronous_data)
+            if topic_name in self._topic_converters
+        ]
+
+    def get_compression_samples(self) -> List[Union[str, bytes]]:
+        """Return sample messages of the topics of this producer.
+
+        Override base class default behavior. Samples are built from the topics
+        XML templates, with the default value of each field, in the same
+        format as the messages sent for the topics.
+
+        Returns
+        -------
+        `list` of `str` or `bytes`
+            One sample message per topic.
+        """
+        return [
+            self._love_manager_message.get_message_category_as_json(
+                category=category,
+                data=self._topic_converters[topic_name].get_template(
+                    values_only=self.schema_once
+                ),
+            )
+            for topic_name, category in {
+                **self.periodic_data,
+                **self.asynchronous_data,
+            }.items()
+            if topic_name in self._topic_converters
+        ]
 
     async def set_monitor_asynchronous_data(self) -> None:
         await asyncio.gather(
@@ -412,7 +615,9 @@ class LoveProducerCSC(LoveProducerBase):
         )
 
     async def set_monitor_heartbeat(self):
-        if hasattr(self.remote, "evt_heartbeat"):
+        if self.topic_shard is not None and self.topic_shard[0] != 0:
+            self.log.debug("Heartbeat monitored by the first topic shard.")
+        elif hasattr(self.remote, "evt_heartbeat"):
             self.log.debug(
                 f"Adding heartbeat monitor for {self.remote.salinfo.name}:{self.remote.salinfo.index}"
             )
@@ -532,6 +737,23 @@ class LoveProducerCSC(LoveProducerBase):
 
         return heartbeat_lost, last_heartbeat_timestamp
 
+    def get_data_name(self, data: Any) -> str:
+        """Return the topic attribute name of SalObj topic data.
+
+        Override base class default behavior to avoid converting the data.
+
+        Parameters
+        ----------
+        data:
+            SalObj topic data.
+
+        Returns
+        -------
+        `str`
+            Name of the topic attribute.
+        """
+        return self.get_topic_attribute_name(data.private_revCode)
+
     def _convert_data_to_dict(self, data: Any) -> Tuple[str, dict]:
         """Convert SalObj topic data to dictionary.
 
@@ -549,38 +771,303 @@ class LoveProducerCSC(LoveProducerBase):
 
         """
         topic_attribute_name = self.get_topic_attribute_name(data.private_revCode)
-        _, topic_name = topic_attribute_name.split("_", maxsplit=1)
 
-        data_stream = copy.deepcopy(
-            self._template_manager_message[topic_attribute_name]
-        )
-        for topic_attribute in data_stream:
-            data_stream[topic_attribute]["value"] = getattr(data, topic_attribute)
+        return topic_attribute_name, self._topic_converters[
+            topic_attribute_name
+        ].convert(data)
 
-        payload = (
-            data_stream
-            if topic_attribute_name in self.periodic_data
-            else [
-                data_stream,
-            ]
+    def _convert_data_to_json(
+        self, data: Any
+    ) -> Tuple[str, Union[EncodedPayload, EncodedBinaryPayload]]:
+        """Serialize SalObj topic data to the encoded payload of a message.
+
+        For json encoders, uses the serializer compiled for the topic in
+        `_set_template_manager_message`, avoiding the intermediate dictionary
+        created by `_convert_data_to_dict`. Binary encoders encode the output
+        of the topic converter.
+
+        Parameters
+        ----------
+        data:
+            SalObj topic data to serialize.
+
+        Returns
+        -------
+        name: `str`
+            Assigned name of the kind of data stream.
+        data_as_json: `EncodedPayload` or `EncodedBinaryPayload`
+            Encoded data payload.
+        """
+        topic_attribute_name = self.get_topic_attribute_name(data.private_revCode)
+        encoder = self._love_manager_message.encoder
+
+        if encoder.binary:
+            converter = self._topic_converters[topic_attribute_name]
+            return topic_attribute_name, encoder.encode_payload(
+                converter.convert_values(data)
+                if self.schema_once
+                else converter.convert(data)
+            )
+
+        return topic_attribute_name, EncodedPayload(
+            self._topic_serializers[topic_attribute_name].serialize(data, encoder)
         )
 
-        data_as_dict = dict(
-            csc=self.remote.salinfo.name,
-            salindex=self.remote.salinfo.index,
-            data=dict(
-                [
-                    (topic_name, payload),
-                ],
-            ),
+    def _convert_periodic_data_to_json(
+        self, data: Any
+    ) -> Tuple[str, Optional[Union[EncodedPayload, EncodedBinaryPayload]]]:
+        """Convert periodic SalObj topic data to the encoded payload of a
+        message.
+
+        Override base class default behavior. When `periodic_keepalive` is
+        set, samples already sent (same ``private_seqNum`` and
+        ``private_sndStamp``) are only sent again once `periodic_keepalive`
+        seconds have passed since they were last sent. When `telemetry_delta`
+        is set, only the fields that changed since the last message are sent,
+        with full keyframes in between (keepalive resends are keyframes).
+        Changes within the configured deadbands are ignored, see
+        `get_deadband_config`. See `TopicDeltaEncoder`.
+
+        Parameters
+        ----------
+        data:
+            SalObj topic data to convert.
+
+        Returns
+        -------
+        name: `str`
+            Assigned name of the kind of data stream.
+        data_as_json: `EncodedPayload`, `EncodedBinaryPayload` or `None`
+            Encoded data payload, `None` if the sample does not need to be
+            sent.
+        """
+        topic_attribute_name = self.get_topic_attribute_name(data.private_revCode)
+        delta_encoder = self._topic_delta_encoders.get(topic_attribute_name, None)
+
+        if self.periodic_keepalive > 0.0:
+            sample_id = (data.private_seqNum, data.private_sndStamp)
+            last_sample_id, last_sent = self._periodic_last_sent.get(
+                topic_attribute_name, (None, 0.0)
+            )
+            now = time.monotonic()
+
+            if sample_id == last_sample_id:
+                if now - last_sent < self.periodic_keepalive:
+                    return topic_attribute_name, None
+                if delta_encoder is not None:
+                    delta_encoder.reset()
+
+            self._periodic_last_sent[topic_attribute_name] = (sample_id, now)
+
+        if delta_encoder is None:
+            return super()._convert_periodic_data_to_json(data)
+
+        payload = delta_encoder.encode(data)
+
+        return topic_attribute_name, (
+            self._love_manager_message.encoder.encode_payload(payload)
+            if payload is not None
+            else None
         )
-        return topic_attribute_name, data_as_dict
+
+    def get_stream_key(self, name: str) -> Optional[Hashable]:
+        """Return the key identifying a data stream of this producer in the
+        send queue.
+
+        Override base class default behavior to identify streams by CSC name,
+        index and topic. Telemetry deltas must not replace each other, so
+        topics sent as deltas have no stream key.
+
+        Parameters
+        ----------
+        name : `str`
+            Name of the topic attribute.
+
+        Returns
+        -------
+        `tuple` or `None`
+            Stream key.
+        """
+        delta_encoder = self._topic_delta_encoders.get(name, None)
+
+        if delta_encoder is not None and delta_encoder.deltas:
+            return None
+
+        return (self.remote.salinfo.name, self.remote.salinfo.index, name)
+
+    def add_stream_sequence(
+        self,
+        name: str,
+        payload: Union[dict, EncodedPayload, EncodedBinaryPayload],
+        resend: bool = False,
+    ) -> Union[dict, EncodedPayload, EncodedBinaryPayload]:
+        """Add the stream sequence number to a payload.
+
+        Override base class default behavior to leave telemetry deltas
+        unchanged, since they carry their own ``sequence``.
+
+        Parameters
+        ----------
+        name : `str`
+            Name of the topic attribute.
+        payload : `dict`, `EncodedPayload` or `EncodedBinaryPayload`
+            Message payload.
+        resend : `bool`, optional
+            Is the payload a stored sample being sent again?
+
+        Returns
+        -------
+        `dict`, `EncodedPayload` or `EncodedBinaryPayload`
+            Payload with the ``sequence`` field.
+        """
+        delta_encoder = self._topic_delta_encoders.get(name, None)
+
+        if delta_encoder is not None and delta_encoder.deltas:
+            return payload
+
+        return super().add_stream_sequence(name, payload, resend)
+
+    def get_stream_id(self, name: str) -> Tuple[str, int, str]:
+        """Return the identifier of a data stream as seen by the manager.
+
+        Override base class default behavior to identify topics by CSC
+        name, index and topic name (without prefix).
+
+        Parameters
+        ----------
+        name : `str`
+            Name of the topic attribute, e.g. "evt_summaryState".
+
+        Returns
+        -------
+        `tuple`
+            CSC name, index and topic name.
+        """
+        if name.startswith(("evt_", "tel_")):
+            return (
+                self.remote.salinfo.name,
+                self.remote.salinfo.index,
+                name.split("_", maxsplit=1)[1],
+            )
+
+        return super().get_stream_id(name)
+
+    def get_must_deliver_topics(self) -> set:
+        """Return the topics whose samples must all be delivered to the
+        manager.
+
+        Samples of these topics are never replaced by newer samples while
+        waiting to be sent, and are spooled while disconnected from the
+        manager (see `MessageSpool`). By default these are
+        ``evt_summaryState``, ``evt_logMessage`` and ``evt_errorCode``. More
+        topics can be added with a comma separated list in the
+        ``LOVE_PRODUCER_MUST_DELIVER`` environment variable.
+
+        Returns
+        -------
+        `set` of `str`
+            Names of the topic attributes.
+        """
+        return {"evt_summaryState", "evt_logMessage", "evt_errorCode"} | {
+            topic.strip()
+            for topic in os.environ.get("LOVE_PRODUCER_MUST_DELIVER", "").split(",")
+            if topic.strip()
+        }
+
+    def get_lazy_topics(self) -> set:
+        """Return the topics whose samples are only converted when sent or
+        requested.
+
+        Samples of these topics are stored as received and sent at most once
+        every ``LOVE_PRODUCER_LAZY_TOPICS_PERIOD`` seconds (default 0.1),
+        so samples replaced by a newer one in the meantime are never
+        converted. Topics are given as a comma separated list in the
+        ``LOVE_PRODUCER_LAZY_TOPICS`` environment variable. Must deliver
+        topics (see `get_must_deliver_topics`) are never lazy.
+
+        Returns
+        -------
+        `set` of `str`
+            Names of the topic attributes.
+        """
+        return {
+            topic.strip()
+            for topic in os.environ.get("LOVE_PRODUCER_LAZY_TOPICS", "").split(",")
+            if topic.strip()
+        }
+
+    def get_deadband_config(self) -> dict:
+        """Read the deadband configuration of the telemetry fields.
+
+        The configuration is read from the json file given by the
+        ``LOVE_PRODUCER_DEADBAND_CONFIG`` environment variable. See
+        `get_deadbands` for the file format.
+
+        Returns
+        -------
+        `dict`
+            Deadband configuration, empty if no file is given.
+        """
+        config_path = os.environ.get("LOVE_PRODUCER_DEADBAND_CONFIG", None)
+
+        if not config_path:
+            return dict()
+
+        with open(config_path) as config_file:
+            return json.load(config_file)
+
+    def get_initial_data_messages(self) -> Dict[str, Union[str, bytes]]:
+        """Return the initial data messages, with the last sample of each
+        stored data stream.
+
+        Override base class default behavior to also send the next periodic
+        samples, as keyframes in delta mode, after (re)connecting.
+
+        Returns
+        -------
+        `dict` of `str` or `bytes`
+            Encoded messages, by data stream name.
+        """
+        self.reset_periodic_data()
+
+        return super().get_initial_data_messages()
+
+    async def send_missed_data(self, last_sequences: Dict[tuple, int]) -> int:
+        """Send the stored samples the manager missed while disconnected.
+
+        Override base class default behavior to send the next periodic
+        samples, as keyframes in delta mode, after resuming.
+
+        Parameters
+        ----------
+        last_sequences : `dict`
+            Last sequence number received by the manager, by stream id.
+
+        Returns
+        -------
+        `int`
+            Number of samples sent.
+        """
+        self.reset_periodic_data()
+
+        return await super().send_missed_data(last_sequences)
+
+    def reset_periodic_data(self) -> None:
+        """Send the next sample of every periodic topic, as a keyframe in
+        delta mode.
+        """
+        self._periodic_last_sent.clear()
+
+        for delta_encoder in self._topic_delta_encoders.values():
+            delta_encoder.reset()
 
     async def close(self):
         self.done_task.set_result(0)
+        self.cancel_lazy_data_tasks()
 
         try:
-            await self._heartbeat_monitor_task
+            if self._heartbeat_monitor_task is not None:
+                await self._heartbeat_monitor_task
         except asyncio.CancelledError:
             self.log.exception("Heartbeat monitor task cancelled.")
         except Exception as e:
@@ -592,3 +1079,51 @@ class LoveProducerCSC(LoveProducerBase):
     @property
     def reply_names(self) -> str:
         return {self.remote.salinfo.name}
+
+    @property
+    def send_schema_once(self) -> bool:
+        """Send data types and units once, in schema messages, and only values
+        in data messages?
+
+        Controlled by the ``LOVE_PRODUCER_SCHEMA_ONCE`` environment variable.
+        Defaults to `False`, which keeps the self-describing format expected by
+        older managers.
+        """
+        return os.environ.get("LOVE_PRODUCER_SCHEMA_ONCE", "False").lower() in (
+            "true",
+            "1",
+        )
+
+    @property
+    def send_telemetry_delta(self) -> bool:
+        """Send only the telemetry fields that changed since the last
+        message?
+
+        Controlled by the ``LOVE_PRODUCER_TELEMETRY_DELTA`` environment
+        variable. Defaults to `False`.
+        """
+        return os.environ.get("LOVE_PRODUCER_TELEMETRY_DELTA", "False").lower() in (
+            "true",
+            "1",
+        )
+
+    @property
+    def telemetry_delta_keyframe_interval(self) -> int:
+        """Number of periodic samples between full telemetry keyframes, in
+        delta mode.
+
+        Controlled by the ``LOVE_PRODUCER_DELTA_KEYFRAME_INTERVAL`` environment
+        variable. Defaults to 10.
+        """
+        return int(os.environ.get("LOVE_PRODUCER_DELTA_KEYFRAME_INTERVAL", "10"))
+
+    @property
+    def periodic_data_keepalive(self) -> float:
+        """Minimum time between resends of an unchanged periodic sample
+        (seconds).
+
+        Controlled by the ``LOVE_PRODUCER_PERIODIC_KEEPALIVE`` environment
+        variable. Defaults to 0, which sends the last sample every period,
+        even if no new sample arrived.
+        """
+        return float(os.environ.get("LOVE_PRODUCER_PERIODIC_KEEPALIVE", "0"))
@@ -26,7 +26,7 @@ from love.producer.love_producer_base import LoveProducerBase
 from love.producer.love_producer_csc import LoveProducerCSC
 from love.producer.love_producer_script_queue import LoveProducerScriptQueue
 from love.producer.love_producer_watcher import LoveProducerWatcher
-from love.producer.producer_utils import get_available_components
+from love.producer.producer_utils import get_available_components, parse_topic_shard
 from lsst.ts import salobj
 
 
@@ -61,6 +61,8 @@ class LoveProducerFactory:
     ) -> LoveProducerBase:
         csc_names = get_available_components()
 
+        component_name, topic_shard = parse_topic_shard(component_name)
+
         name, index = salobj.name_to_name_index(component_name)
 
         love_producer_from_type_kwargs = kwargs.copy()
@@ -69,10 +71,19 @@ class LoveProducerFactory:
             if key in love_producer_from_type_kwargs:
                 love_producer_from_type_kwargs.pop(key)
 
+        love_producer_type = cls.named_love_producer_type.get(
+            name, "csc" if name in csc_names else "base"
+        )
+
+        if topic_shard is not None:
+            if love_producer_type != "csc":
+                raise RuntimeError(
+                    f"Topic shards are only supported for CSC producers, not {name}."
+                )
+            love_producer_from_type_kwargs["topic_shard"] = topic_shard
+
         love_producer = cls.get_love_producer_from_type(
-            love_producer_type=cls.named_love_producer_type.get(
-                name, "csc" if name in csc_names else "base"
-            ),
+            love_producer_type=love_producer_type,
             csc=name,
             salindex=index,
             **love_producer_from_type_kwargs,
@@ -27,8 +27,9 @@ import logging
 import os
 from collections import deque
 from datetime import datetime
-from typing import Any, AsyncIterator, Dict, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
+from love.producer.love_manager_send_queue import MessagePriority, tag_message
 from love.producer.love_producer_csc import LoveProducerCSC
 from lsst.ts.salobj import AckError, Domain, Remote
 from lsst.ts.salobj.base_script import HEARTBEAT_INTERVAL as SCRIPT_HEARTBEAT_INTERVAL
@@ -667,6 +668,7 @@ class LoveProducerScriptQueue(LoveProducerCSC):
         return self._love_manager_message.get_message_category_as_json(
             category="event",
             data=self.scriptqueue_state_message_data,
+            stream=self.get_state_stream_key("stateStream"),
         )
 
     def get_scripts_state_message_as_json(self) -> str:
@@ -681,6 +683,7 @@ class LoveProducerScriptQueue(LoveProducerCSC):
         return self._love_manager_message.get_message_category_as_json(
             category="event",
             data=self.scripts_state_message_data,
+            stream=self.get_state_stream_key("scriptsStream"),
         )
 
     def get_available_scripts_state_message_as_json(self) -> str:
@@ -695,6 +698,30 @@ class LoveProducerScriptQueue(LoveProducerCSC):
         return self._love_manager_message.get_message_category_as_json(
             category="event",
             data=self.available_scripts_state_message_data,
+            stream=self.get_state_stream_key("availableScriptsStream"),
+        )
+
+    def get_state_stream_key(self, name: str) -> Optional[tuple]:
+        """Return the stream key of a ScriptQueue state message.
+
+        State messages carry the full state, so pending messages can be
+        replaced by newer ones. They are only conflated under backpressure,
+        otherwise every state transition is sent.
+
+        Parameters
+        ----------
+        name : `str`
+            Name of the state stream, e.g. "scriptsStream".
+
+        Returns
+        -------
+        `tuple` or `None`
+            Stream key, `None` if not under backpressure.
+        """
+        return (
+            ("ScriptQueueState", self.remote.salinfo.index, name)
+            if self.under_backpressure
+            else None
         )
 
     async def send_scriptqueue_state(self):
@@ -726,6 +753,9 @@ class LoveProducerScriptQueue(LoveProducerCSC):
     async def send_script_log_message(self, message_data: dict) -> None:
         """Send log messages from the current script.
 
+        Messages are sent with event priority, so a long log does not delay
+        heartbeats and control messages.
+
         Parameters
         ----------
         message_data : `dict`
@@ -744,7 +774,10 @@ class LoveProducerScriptQueue(LoveProducerCSC):
         try:
             for message in log_messages:
                 await self.send_message(
-                    self._love_manager_message.get_message_as_json(message)
+                    tag_message(
+                        self._love_manager_message.get_message_as_json(message),
+                        MessagePriority.EVENT,
+                    )
                 )
         except Exception:
             self.log.exception("Error sending script log message.")
@@ -856,9 +889,27 @@ class LoveProducerScriptQueue(LoveProducerCSC):
                 or data.salIndex in self.state["waitingIndices"]
             ):
                 await self.send_message(
-                    self._love_manager_message.get_message_as_json(message_as_dict)
+                    tag_message(
+                        self._love_manager_message.get_message_as_json(message_as_dict),
+                        MessagePriority.EVENT,
+                        must_deliver=True,
+                    )
                 )
 
+    def get_reply_routes(self) -> List[Tuple[str, Optional[int], Optional[str]]]:
+        """Return the requests from the manager this producer may reply to.
+
+        Override base class default behavior to also route requests for
+        scripts, which have their own index.
+
+        Returns
+        -------
+        `list` of `tuple`
+            CSC name, index and stream name of the requests. `None` matches
+            any index or stream.
+        """
+        return super().get_reply_routes() + [("Script", None, None)]
+
     @property
     def reply_names(self) -> str:
         return {
@@ -20,15 +20,28 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-__all__ = ["LoveProducerSet", "run_love_producer"]
+__all__ = ["LoveProducerSet", "run_love_producer", "run_love_producer_worker"]
 
 import argparse
 import asyncio
 import logging
+import logging.handlers
+import multiprocessing
 import os
 import signal
+import time
 
 from love.producer.love_manager_client import LoveManagerClient
+from love.producer.love_manager_encoder import (
+    available_message_encoders,
+    binary_message_encoders,
+)
+from love.producer.love_producer_supervisor import LoveProducerSupervisor
+from love.producer.producer_utils import (
+    get_topic_shard_components,
+    parse_topic_shard_counts,
+    set_worker_spool_path,
+)
 from lsst.ts import salobj
 
 logging.basicConfig(level=logging.DEBUG)
@@ -44,6 +57,8 @@ class LoveProducerSet:
             self.log.addHandler(logging.StreamHandler())
         self.log.setLevel(log_level)
 
+        self.components = list(components)
+
         self.love_manager_client = LoveManagerClient(
             log=self.log,
         )
@@ -94,6 +109,27 @@ class LoveProducerSet:
         await self.love_manager_client.close()
         await self.domain.close()
 
+    def get_stats(self) -> dict:
+        """Return the load of the producers and the send queue stats.
+
+        Returns
+        -------
+        `dict`
+            Process id, process cpu time, number of data messages produced
+            by component and send queue stats.
+        """
+        return dict(
+            pid=os.getpid(),
+            cpu_time=time.process_time(),
+            messages_produced={
+                component: producer.messages_produced
+                for component, producer in zip(
+                    self.components, self.love_manager_client.producers
+                )
+            },
+            send_queue=self.love_manager_client.send_queue.get_stats(),
+        )
+
     def signal_handler(self):
         self.log.warning(f"ComponentProducerSet.signal_handler for pid={os.getpid()}")
         self._wait_forever_task.set_result(None)
@@ -114,14 +150,74 @@ class LoveProducerSet:
                 "See `--help` for more information."
             )
 
+        if args.message_encoder is not None:
+            os.environ["LOVE_PRODUCER_MESSAGE_ENCODER"] = args.message_encoder
+        if args.schema_once:
+            os.environ["LOVE_PRODUCER_SCHEMA_ONCE"] = "True"
+        if args.wire_format is not None:
+            os.environ["LOVE_PRODUCER_WIRE_FORMAT"] = args.wire_format
+        if args.compression is not None:
+            os.environ["LOVE_PRODUCER_COMPRESSION"] = args.compression
+        if args.periodic_keepalive is not None:
+            os.environ["LOVE_PRODUCER_PERIODIC_KEEPALIVE"] = str(
+                args.periodic_keepalive
+            )
+        if args.deadband_config is not None:
+            os.environ["LOVE_PRODUCER_DEADBAND_CONFIG"] = args.deadband_config
+        if args.telemetry_delta:
+            os.environ["LOVE_PRODUCER_TELEMETRY_DELTA"] = "True"
+        if args.delta_keyframe_interval is not None:
+            os.environ["LOVE_PRODUCER_DELTA_KEYFRAME_INTERVAL"] = str(
+                args.delta_keyframe_interval
+            )
+
         kwargs = dict()
         if args.periodic_data is not None:
             kwargs["periodic_data"] = args.periodic_data
         if args.asynchronous_data is not None:
             kwargs["asynchronous_data"] = args.asynchronous_data
 
+        try:
+            topic_shards = parse_topic_shard_counts(
+                args.topic_shards
+                if args.topic_shards is not None
+                else os.environ.get("LOVE_PRODUCER_TOPIC_SHARDS", "").split(",")
+            )
+        except ValueError as e:
+            parser.error(str(e))
+
+        components = [
+            sharded_component
+            for component in args.components
+            for sharded_component in get_topic_shard_components(
+                component, topic_shards.get(component, 1)
+            )
+        ]
+
+        workers = (
+            args.workers
+            if args.workers is not None
+            else int(os.environ.get("LOVE_PRODUCER_WORKERS", "1"))
+        )
+
+        if workers > 1:
+            supervisor = LoveProducerSupervisor(
+                components=components,
+                workers=workers,
+                worker=run_love_producer_worker,
+                log_level=args.log_level,
+                rebalance_interval=(
+                    args.rebalance_interval
+                    if args.rebalance_interval is not None
+                    else float(os.environ.get("LOVE_PRODUCER_REBALANCE_INTERVAL", "0"))
+                ),
+                **kwargs,
+            )
+            await supervisor.run()
+            return
+
         love_producer_set = cls(
-            components=args.components,
+            components=components,
             log_level=args.log_level,
             **kwargs,
         )
@@ -155,6 +251,112 @@ class LoveProducerSet:
             help="Optional list of topic names to treat as asynchonous data (e.g. events).",
         )
 
+        parser.add_argument(
+            "--message-encoder",
+            choices=list(available_message_encoders),
+            default=None,
+            help="Backend used to encode messages to the manager. "
+            "Overrides the LOVE_PRODUCER_MESSAGE_ENCODER environment variable "
+            "(default: json).",
+        )
+
+        parser.add_argument(
+            "--wire-format",
+            choices=["json"] + list(binary_message_encoders),
+            default=None,
+            help="Wire format requested to the manager. Binary formats are only "
+            "used if the manager accepts them when connecting. Overrides the "
+            "LOVE_PRODUCER_WIRE_FORMAT environment variable (default: json).",
+        )
+
+        parser.add_argument(
+            "--compression",
+            choices=["none", "deflate", "zstd"],
+            default=None,
+            help="Compression of the messages sent to the manager. deflate "
+            "uses websocket permessage-deflate, zstd uses a dictionary trained "
+            "from the topics templates. Both are only used if the manager "
+            "accepts them when connecting. Overrides the "
+            "LOVE_PRODUCER_COMPRESSION environment variable (default: none).",
+        )
+
+        parser.add_argument(
+            "--schema-once",
+            action="store_true",
+            default=False,
+            help="Send topic data types and units once, in schema messages, "
+            "and only values in data messages. Requires a manager that "
+            "supports schema messages. Same as setting the "
+            "LOVE_PRODUCER_SCHEMA_ONCE environment variable.",
+        )
+
+        parser.add_argument(
+            "--periodic-keepalive",
+            type=float,
+            default=None,
+            help="Do not resend periodic samples that did not change (same SAL "
+            "sequence number and send timestamp) until this many seconds have "
+            "passed. 0 resends them every period. Overrides the "
+            "LOVE_PRODUCER_PERIODIC_KEEPALIVE environment variable (default: 0).",
+        )
+
+        parser.add_argument(
+            "--telemetry-delta",
+            action="store_true",
+            default=False,
+            help="Send only the telemetry fields that changed since the last "
+            "message, with periodic keyframes and sequence numbers. Requires a "
+            "manager that supports delta messages. Same as setting the "
+            "LOVE_PRODUCER_TELEMETRY_DELTA environment variable.",
+        )
+
+        parser.add_argument(
+            "--delta-keyframe-interval",
+            type=int,
+            default=None,
+            help="Number of telemetry samples between keyframes in delta mode. "
+            "Overrides the LOVE_PRODUCER_DELTA_KEYFRAME_INTERVAL environment "
+            "variable (default: 10).",
+        )
+
+        parser.add_argument(
+            "--deadband-config",
+            default=None,
+            help="Json file with the absolute/relative deadbands of telemetry "
+            "fields, per CSC, topic and field. Overrides the "
+            "LOVE_PRODUCER_DEADBAND_CONFIG environment variable.",
+        )
+
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Number of worker processes. Components are split between "
+            "the workers, each with its own connection to the manager, and "
+            "crashed workers are restarted. Overrides the LOVE_PRODUCER_WORKERS "
+            "environment variable (default: 1).",
+        )
+
+        parser.add_argument(
+            "--topic-shards",
+            nargs="*",
+            help="Split the topics of CSCs between several producers, "
+            "usually in different workers (see --workers), given as "
+            "component=number of shards, e.g. MTM1M3=3. The first shard handles "
+            "the heartbeat and CSC state events. Overrides the "
+            "LOVE_PRODUCER_TOPIC_SHARDS environment variable (comma separated).",
+        )
+
+        parser.add_argument(
+            "--rebalance-interval",
+            type=float,
+            default=None,
+            help="Interval, in seconds, to rebalance the components between "
+            "workers from their measured load. Workers whose components change "
+            "are restarted. 0 never rebalances. Overrides the "
+            "LOVE_PRODUCER_REBALANCE_INTERVAL environment variable (default: 0).",
+        )
+
         parser.add_argument(
             "--log-level",
             type=int,
@@ -166,6 +368,61 @@ class LoveProducerSet:
         return parser
 
 
+def run_love_producer_worker(
+    index: int,
+    components: list,
+    log_level: int,
+    log_queue: multiprocessing.Queue,
+    stats_queue: multiprocessing.Queue,
+    stats_interval: float,
+    kwargs: dict,
+) -> None:
+    """Run a `LoveProducerSet` in a worker process of a
+    `LoveProducerSupervisor`.
+
+    Parameters
+    ----------
+    index : `int`
+        Index of the worker.
+    components : `list` of `str`
+        Names of the components of the worker.
+    log_level : `int`
+        Logging level.
+    log_queue : `multiprocessing.Queue`
+        Queue to forward log records to the supervisor.
+    stats_queue : `multiprocessing.Queue`
+        Queue to report stats to the supervisor.
+    stats_interval : `float`
+        Interval between stats reports (seconds).
+    kwargs : `dict`
+        Additional arguments for the producers.
+    """
+    log = logging.getLogger()
+    log.handlers = [logging.handlers.QueueHandler(log_queue)]
+    log.setLevel(log_level)
+
+    set_worker_spool_path(index)
+
+    async def report_stats(love_producer_set: LoveProducerSet) -> None:
+        while True:
+            await asyncio.sleep(stats_interval)
+            stats_queue.put(
+                dict(worker=index, time=time.time(), **love_producer_set.get_stats())
+            )
+
+    async def run_worker() -> None:
+        love_producer_set = LoveProducerSet(
+            components=components, log_level=log_level, **kwargs
+        )
+        report_stats_task = asyncio.create_task(report_stats(love_producer_set))
+        try:
+            await love_producer_set.run_producer()
+        finally:
+            report_stats_task.cancel()
+
+    asyncio.run(run_worker())
+
+
 def run_love_producer():
     """Run love producer."""
     asyncio.run(LoveProducerSet.amain())
@@ -0,0 +1,451 @@
+# This file is part of LOVE-producer.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by Inria Chile and
+# the LSST Project (https://www.lsst.org).
+#
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership and dependencies.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+__all__ = ["LoveProducerSupervisor"]
+
+import asyncio
+import logging
+import logging.handlers
+import multiprocessing
+import queue
+import signal
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class LoveProducerSupervisor:
+    """Run the components of a LOVE producer set in several worker
+    processes.
+
+    The components are split in shards, one per worker process. Each worker
+    runs its shard with its own `salobj.Domain` and connection to the
+    manager. Workers that exit are restarted after `restart_wait_time`
+    seconds.
+
+    Workers report their cpu usage and the number of data messages produced
+    by each component every `stats_interval` seconds. The supervisor uses
+    these to estimate the load of each component and logs the aggregated
+    stats. If `rebalance_interval` is set, the shards are recomputed from the
+    measured loads at that interval. If the busiest worker is more than
+    `rebalance_threshold` times as loaded as it would be with the new shards,
+    the workers whose shard changed are restarted with them.
+
+    Logs of the workers are forwarded to the supervisor and written by its
+    handlers, prefixed with the worker name.
+
+    Parameters
+    ----------
+    components : `list` of `str`
+        Names of the components, e.g. ATDome, MTHexapod:1.
+    workers : `int`
+        Number of worker processes. Limited to the number of components.
+    worker : `callable`
+        Function run in each worker process, see `run_love_producer_worker`.
+    log_level : `int`, optional
+        Logging level.
+    rebalance_interval : `float`, optional
+        Interval between shard rebalances (seconds), 0 to never rebalance.
+    **kwargs
+        Additional arguments for the producers.
+    """
+
+    def __init__(
+        self,
+        components: List[str],
+        workers: int,
+        worker: Callable[..., None],
+        log_level: int = logging.INFO,
+        rebalance_interval: float = 0.0,
+        **kwargs: Any,
+    ) -> None:
+        self.log = logging.getLogger(type(self).__name__)
+
+        if len(components) == 0:
+            raise RuntimeError("At least one component must be provided.")
+
+        self.components = list(components)
+        self.workers = max(1, min(workers, len(self.components)))
+        self.worker = worker
+        self.log_level = log_level
+        self.kwargs = kwargs
+
+        self.restart_wait_time: float = 3.0
+        self.monitor_interval: float = 1.0
+        self.stats_interval: float = 10.0
+        self.rebalance_interval = rebalance_interval
+        self.rebalance_threshold: float = 1.25
+        # Weight of the last measurement in the load estimates.
+        self.load_smoothing: float = 0.5
+
+        self.measured_loads: Dict[str, float] = dict()
+        self.shards: List[List[str]] = self.get_shards(self.get_component_loads())
+
+        self.processes: List[Optional[multiprocessing.process.BaseProcess]] = [
+            None
+        ] * self.workers
+        self.restarts: List[int] = [0] * self.workers
+        self.worker_stats: Dict[int, dict] = dict()
+        self.worker_loads: Dict[int, float] = dict()
+        self._restart_at: Dict[int, float] = dict()
+
+        self._context = multiprocessing.get_context("spawn")
+        self.log_queue = self._context.Queue()
+        self.stats_queue = self._context.Queue()
+        self._log_listener: Optional[logging.handlers.QueueListener] = None
+
+        self._done_task: Optional[asyncio.Future] = None
+
+    def get_component_loads(self) -> Dict[str, float]:
+        """Return the estimated load of each component.
+
+        Components without measurements are assumed to have the average load
+        of the measured components.
+
+        Returns
+        -------
+        `dict` of `float`
+            Load (fraction of a cpu), by component.
+        """
+        default_load = (
+            sum(self.measured_loads.values()) / len(self.measured_loads)
+            if len(self.measured_loads) > 0
+            else 1.0
+        )
+        return {
+            component: self.measured_loads.get(component, default_load)
+            for component in self.components
+        }
+
+    def get_shards(self, loads: Dict[str, float]) -> List[List[str]]:
+        """Split the components in one shard per worker, balancing the load
+        of the shards.
+
+        Components are assigned, from the highest to the lowest load, to the
+        shard with the lowest load.
+
+        Parameters
+        ----------
+        loads : `dict` of `float`
+            Load of each component.
+
+        Returns
+        -------
+        `list` of `list` of `str`
+            Components of each shard.
+        """
+        shards: List[List[str]] = [[] for _ in range(self.workers)]
+        shard_loads = [0.0] * self.workers
+
+        for component in sorted(
+            self.components, key=lambda component: -loads.get(component, 0.0)
+        ):
+            index = shard_loads.index(min(shard_loads))
+            shards[index].append(component)
+            shard_loads[index] += loads.get(component, 0.0)
+
+        return shards
+
+    def get_shard_loads(
+        self, shards: List[List[str]], loads: Dict[str, float]
+    ) -> List[float]:
+        """Return the load of each shard.
+
+        Parameters
+        ----------
+        shards : `list` of `list` of `str`
+            Components of each shard.
+        loads : `dict` of `float`
+            Load of each component.
+
+        Returns
+        -------
+        `list` of `float`
+            Load of each shard.
+        """
+        return [
+            sum(loads.get(component, 0.0) for component in shard) for shard in shards
+        ]
+
+    def rebalance(self) -> List[int]:
+        """Recompute the shards from the measured loads.
+
+        New shards are assigned to the workers that already run most of their
+        components, so as few workers as possible have to be restarted.
+
+        Returns
+        -------
+        `list` of `int`
+            Workers whose shard changed and must be restarted.
+        """
+        loads = self.get_component_loads()
+        new_shards = self.get_shards(loads)
+
+        if max(self.get_shard_loads(new_shards, loads)) * self.rebalance_threshold >= (
+            max(self.get_shard_loads(self.shards, loads))
+        ):
+            return []
+
+        shards: List[List[str]] = [[] for _ in range(self.workers)]
+        free_workers = list(range(self.workers))
+
+        for shard in sorted(new_shards, key=len, reverse=True):
+            index = max(
+                free_workers,
+                key=lambda index: len(set(shard) & set(self.shards[index])),
+            )
+            free_workers.remove(index)
+            shards[index] = shard
+
+        changed = [
+            index
+            for index in range(self.workers)
+            if set(shards[index]) != set(self.shards[index])
+        ]
+        self.shards = shards
+
+        return changed
+
+    def handle_stats(self, stats: dict) -> None:
+        """Update the load estimates with the stats reported by a worker.
+
+        The cpu usage of the worker since its previous report is split
+        between its components in proportion to the data messages they
+        produced.
+
+        Parameters
+        ----------
+        stats : `dict`
+            Stats reported by the worker, see `LoveProducerSet.get_stats`.
+        """
+        index = stats["worker"]
+        previous = self.worker_stats.get(index, None)
+        self.worker_stats[index] = stats
+
+        if previous is None or previous["pid"] != stats["pid"]:
+            return
+
+        elapsed = stats["time"] - previous["time"]
+        if elapsed <= 0.0:
+            return
+
+        cpu = (stats["cpu_time"] - previous["cpu_time"]) / elapsed
+        self.worker_loads[index] = cpu
+
+        produced = {
+            component: messages_produced
+            - previous["messages_produced"].get(component, 0)
+            for component, messages_produced in stats["messages_produced"].items()
+        }
+        total_produced = sum(produced.values())
+
+        for component, messages_produced in produced.items():
+            load = cpu * (
+                messages_produced / total_produced
+                if total_produced > 0
+                else 1.0 / len(produced)
+            )
+            self.measured_loads[component] = self.load_smoothing * load + (
+                1.0 - self.load_smoothing
+            ) * self.measured_loads.get(component, load)
+
+    def read_stats(self) -> None:
+        """Read the stats reported by the workers."""
+        while True:
+            try:
+                stats = self.stats_queue.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                self.handle_stats(stats)
+            except Exception:
+                self.log.exception("Error handling worker stats.")
+
+    def report_stats(self) -> None:
+        """Log the load, send queue depth and restarts of the workers."""
+        for index in range(self.workers):
+            stats = self.worker_stats.get(index, dict())
+            send_queue = stats.get("send_queue", dict())
+            depth = sum(
+                priority_stats["depth"]
+                for priority_stats in send_queue.values()
+                if isinstance(priority_stats, dict)
+            )
+            self.log.info(
+                f"Worker {index}: pid={stats.get('pid', None)}, "
+                f"components={self.shards[index]}, "
+                f"cpu={self.worker_loads.get(index, 0.0):.2f}, "
+                f"send queue={depth} messages ({send_queue.get('nbytes', 0)} bytes), "
+                f"restarts={self.restarts[index]}."
+            )
+
+        self.log.info(
+            f"Total cpu: {sum(self.worker_loads.values()):.2f}; "
+            f"restarts: {sum(self.restarts)}."
+        )
+
+    def start_worker(self, index: int) -> None:
+        """Start a worker process.
+
+        Parameters
+        ----------
+        index : `int`
+            Index of the worker.
+        """
+        process = self._context.Process(
+            target=self.worker,
+            args=(
+                index,
+                self.shards[index],
+                self.log_level,
+                self.log_queue,
+                self.stats_queue,
+                self.stats_interval,
+                self.kwargs,
+            ),
+            name=f"LoveProducerWorker-{index}",
+            daemon=True,
+        )
+        process.start()
+        self.processes[index] = process
+
+        self.log.info(
+            f"Started worker {index} (pid={process.pid}) for {self.shards[index]}."
+        )
+
+    async def stop_worker(self, index: int, timeout: float = 10.0) -> None:
+        """Stop a worker process, killing it if it does not exit in time.
+
+        Parameters
+        ----------
+        index : `int`
+            Index of the worker.
+        timeout : `float`, optional
+            Time to wait for the worker to exit (seconds).
+        """
+        process = self.processes[index]
+
+        if process is None:
+            return
+
+        if process.is_alive():
+            process.terminate()
+            await asyncio.get_running_loop().run_in_executor(
+                None, process.join, timeout
+            )
+            if process.is_alive():
+                self.log.warning(f"Worker {index} did not terminate. Killing it.")
+                process.kill()
+                await asyncio.get_running_loop().run_in_executor(None, process.join)
+
+        self.processes[index] = None
+
+    def check_workers(self) -> None:
+        """Restart the workers that exited."""
+        now = time.monotonic()
+
+        for index, process in enumerate(self.processes):
+            if process is not None and not process.is_alive():
+                self.log.warning(
+                    f"Worker {index} (pid={process.pid}) exited with code "
+                    f"{process.exitcode}. Restarting in {self.restart_wait_time}s."
+                )
+                self.processes[index] = None
+                self._restart_at[index] = now + self.restart_wait_time
+
+        for index, restart_at in list(self._restart_at.items()):
+            if now >= restart_at:
+                del self._restart_at[index]
+                self.restarts[index] += 1
+                self.start_worker(index)
+
+    async def run(self) -> None:
+        """Start the workers and supervise them until a termination signal
+        is received.
+        """
+        handler = logging.StreamHandler()
+        handler.setFormatter(
+            logging.Formatter("%(processName)s:%(levelname)s:%(name)s:%(message)s")
+        )
+        self._log_listener = logging.handlers.QueueListener(self.log_queue, handler)
+        self._log_listener.start()
+
+        self._done_task = asyncio.Future()
+
+        loop = asyncio.get_running_loop()
+        for signal_value in (
+            signal.SIGTERM,
+            signal.SIGINT,
+            signal.SIGHUP,
+        ):
+            loop.add_signal_handler(signal_value, self.signal_handler)
+
+        try:
+            for index in range(self.workers):
+                self.start_worker(index)
+
+            last_report = last_rebalance = time.monotonic()
+
+            while not self._done_task.done():
+                await asyncio.wait([self._done_task], timeout=self.monitor_interval)
+
+                if self._done_task.done():
+                    break
+
+                self.read_stats()
+                self.check_workers()
+
+                now = time.monotonic()
+
+                if now - last_report >= self.stats_interval:
+                    last_report = now
+                    self.report_stats()
+
+                if (
+                    self.rebalance_interval > 0.0
+                    and now - last_rebalance >= self.rebalance_interval
+                ):
+                    last_rebalance = now
+                    for index in self.rebalance():
+                        self.log.info(
+                            f"Rebalancing worker {index} to {self.shards[index]}."
+                        )
+                        await self.stop_worker(index)
+                        self._restart_at.pop(index, None)
+                        self.start_worker(index)
+        finally:
+            self.log.warning("Terminating workers...")
+            await self.close()
+
+    def signal_handler(self) -> None:
+        self.log.warning("LoveProducerSupervisor.signal_handler")
+        if self._done_task is not None and not self._done_task.done():
+            self._done_task.set_result(None)
+
+    async def close(self) -> None:
+        """Stop the workers and the log forwarding."""
+        await asyncio.gather(
+            *[self.stop_worker(index) for index in range(self.workers)]
+        )
+
+        if self._log_listener is not None:
+            self._log_listener.stop()
+            self._log_listener = None
@@ -25,6 +25,7 @@ __all__ = ["LoveProducerWatcher"]
 import logging
 from typing import Any, Optional
 
+from love.producer.love_manager_send_queue import MessagePriority
 from love.producer.love_producer_csc import LoveProducerCSC
 from lsst.ts.salobj import Domain
 
@@ -51,6 +52,8 @@ class LoveProducerWatcher(LoveProducerCSC):
 
         self._non_topic_data_stream = {"stream"}
 
+        self.must_deliver_data.add("evt_alarm")
+
         self.register_additional_action("evt_alarm", self.handle_event_watcher_alarm)
 
         self.register_asynchronous_data_category("stream", "_stream")
@@ -88,6 +91,8 @@ class LoveProducerWatcher(LoveProducerCSC):
         return self._love_manager_message.get_message_category_as_json(
             category="event",
             data=self.alarms_state_message_data,
+            priority=MessagePriority.HIGH,
+            must_deliver=True,
         )
 
     @property
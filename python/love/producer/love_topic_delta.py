@@ -0,0 +1,267 @@
+# This file is part of LOVE-producer.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by Inria Chile and
+# the LSST Project (https://www.lsst.org).
+#
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership and dependencies.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+__all__ = ["TopicDeltaEncoder", "get_deadbands"]
+
+import functools
+import math
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .love_topic_serializer import TopicConverter
+
+DEADBAND_DATA_TYPES = {"Float", "Array<Float>"}
+
+
+class TopicDeltaEncoder:
+    """Encode samples of a periodic SAL topic as deltas of the last sent
+    sample.
+
+    A full sample (keyframe) is produced for the first sample, after `reset`
+    and every `keyframe_interval` samples. Other samples only include the
+    fields that changed since they were last sent, and are skipped altogether
+    when no field changed.
+
+    Changes of fields with a deadband are ignored while they stay within the
+    deadband of the last sent value, so slow drifts are still sent once they
+    exceed it.
+
+    Each payload carries a ``sequence`` number, incremented for every payload
+    produced, and a ``keyframe`` flag, so consumers can detect missing
+    deltas and wait for the next keyframe.
+
+    Parameters
+    ----------
+    converter : `TopicConverter`
+        Converter of the topic.
+    keyframe_interval : `int`
+        Number of samples between keyframes.
+    values_only : `bool`, optional
+        Only include the field values, see `TopicConverter.convert_values`.
+    deadbands : `dict`, optional
+        (absolute, relative) deadband of the fields that have one, by field
+        name. See `get_deadbands`.
+    deltas : `bool`, optional
+        Produce deltas? If `False`, samples with changes are produced in full
+        (without ``sequence`` and ``keyframe``) and the encoder only
+        suppresses samples without changes.
+    """
+
+    def __init__(
+        self,
+        converter: TopicConverter,
+        keyframe_interval: int,
+        values_only: bool = False,
+        deadbands: Optional[Dict[str, Tuple[float, float]]] = None,
+        deltas: bool = True,
+    ) -> None:
+        self.converter = converter
+        self.keyframe_interval = keyframe_interval
+        self.values_only = values_only
+        self.deadbands = dict() if deadbands is None else deadbands
+        self.deltas = deltas
+
+        self._field_unchanged: List[Callable[[Any, Any], bool]] = [
+            (
+                functools.partial(_within_deadband, *self.deadbands[name])
+                if name in self.deadbands
+                else _values_equal
+            )
+            for name, _, _, _ in converter.fields
+        ]
+
+        self.sequence = 0
+        self._last_values: Optional[list] = None
+        self._samples_since_keyframe = 0
+
+    def reset(self) -> None:
+        """Make the next payload a keyframe.
+
+        Must be called when deltas may have been lost, e.g. when reconnecting
+        to the manager.
+        """
+        self._last_values = None
+
+    def encode(self, data: Any) -> Optional[dict]:
+        """Encode a topic sample.
+
+        Parameters
+        ----------
+        data : `object`
+            Topic sample.
+
+        Returns
+        -------
+        `dict` or `None`
+            Payload with the csc, salindex, topic data, ``sequence`` and
+            ``keyframe``. `None` if the sample did not change (beyond the
+            deadbands) since the last one sent and no keyframe is due.
+        """
+        values = self.converter.get_values(data)
+        self._samples_since_keyframe += 1
+
+        keyframe = (
+            self._last_values is None
+            or self._samples_since_keyframe >= self.keyframe_interval
+        )
+
+        if keyframe:
+            indices = range(len(values))
+            self._samples_since_keyframe = 0
+            self._last_values = [_copy_value(value) for value in values]
+        else:
+            indices = [
+                i
+                for i, (field_unchanged, value, last_value) in enumerate(
+                    zip(self._field_unchanged, values, self._last_values)
+                )
+                if not field_unchanged(value, last_value)
+            ]
+            if len(indices) == 0:
+                return None
+            if not self.deltas:
+                indices = range(len(values))
+            for i in indices:
+                self._last_values[i] = _copy_value(values[i])
+
+        if not self.deltas:
+            return self.converter.convert_fields(values, indices, self.values_only)
+
+        self.sequence += 1
+
+        payload = self.converter.convert_fields(values, indices, self.values_only)
+        payload["sequence"] = self.sequence
+        payload["keyframe"] = keyframe
+
+        return payload
+
+
+def get_deadbands(
+    config: dict, csc: str, salindex: int, topic_name: str, fields: list
+) -> Dict[str, Tuple[float, float]]:
+    """Resolve the deadbands of the fields of a topic from the deadband
+    configuration.
+
+    The configuration maps CSC names (``"name"`` or ``"name:index"``, the
+    latter taking precedence) to their configuration, e.g.::
+
+        {
+            "ATDome": {
+                "default": {"absolute": 0.001},
+                "tel_position": {
+                    "default": {"relative": 1e-4},
+                    "azimuthPosition": {"absolute": 0.01, "relative": 0.0}
+                }
+            }
+        }
+
+    Field deadbands take precedence over the topic ``default``, which takes
+    precedence over the CSC-wide ``default``. Only ``Float`` fields (and
+    arrays of floats) have deadbands.
+
+    Parameters
+    ----------
+    config : `dict`
+        Deadband configuration.
+    csc : `str`
+        Name of the CSC.
+    salindex : `int`
+        SAL index of the CSC.
+    topic_name : `str`
+        Name of the topic attribute, e.g. "tel_position".
+    fields : `list` of `tuple`
+        List of (name, default value, data type, units) for each field.
+
+    Returns
+    -------
+    `dict`
+        (absolute, relative) deadband by field name, for the fields that have
+        one.
+    """
+    csc_config = config.get(f"{csc}:{salindex}", config.get(csc, dict()))
+    topic_config = csc_config.get(topic_name, dict())
+    topic_default = topic_config.get("default", csc_config.get("default", None))
+
+    deadbands = dict()
+
+    for name, _, data_type, _ in fields:
+        field_config = topic_config.get(name, topic_default)
+        if field_config is not None and data_type in DEADBAND_DATA_TYPES:
+            deadbands[name] = (
+                float(field_config.get("absolute", 0.0)),
+                float(field_config.get("relative", 0.0)),
+            )
+
+    return deadbands
+
+
+def _within_deadband(absolute: float, relative: float, value: Any, other: Any) -> bool:
+    """Is value within the deadband of (the last sent) other value?"""
+    if isinstance(value, float) and isinstance(other, float):
+        if math.isnan(value) or math.isnan(other):
+            return math.isnan(value) and math.isnan(other)
+        return abs(value - other) <= max(absolute, relative * abs(other))
+    try:
+        value_array = np.asarray(value, dtype=float)
+        other_array = np.asarray(other, dtype=float)
+        if value_array.shape != other_array.shape:
+            return False
+        tolerance = np.maximum(absolute, relative * np.abs(other_array))
+        within = np.abs(value_array - other_array) <= tolerance
+        both_nan = np.isnan(value_array) & np.isnan(other_array)
+        return bool(np.all(within | both_nan))
+    except (TypeError, ValueError):
+        return _values_equal(value, other)
+
+
+def _values_equal(value: Any, other: Any) -> bool:
+    """Compare two field values, treating NaN as equal to NaN."""
+    if isinstance(value, np.ndarray) or isinstance(other, np.ndarray):
+        try:
+            return bool(np.array_equal(value, other, equal_nan=True))
+        except TypeError:
+            return bool(np.array_equal(value, other))
+    if isinstance(value, (list, tuple)):
+        return (
+            isinstance(other, (list, tuple))
+            and len(value) == len(other)
+            and all(
+                _values_equal(item, other_item)
+                for item, other_item in zip(value, other)
+            )
+        )
+    if isinstance(value, float) and isinstance(other, float):
+        return value == other or (math.isnan(value) and math.isnan(other))
+    return value == other
+
+
+def _copy_value(value: Any) -> Any:
+    """Copy mutable field values (arrays), so they can be compared with later
+    samples.
+    """
+    if isinstance(value, np.ndarray):
+        return value.copy()
+    if isinstance(value, list):
+        return list(value)
+    return value
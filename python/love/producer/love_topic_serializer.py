@@ -0,0 +1,409 @@
+# This file is part of LOVE-producer.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by Inria Chile and
+# the LSST Project (https://www.lsst.org).
+#
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership and dependencies.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+__all__ = ["TopicConverter", "TopicSerializer"]
+
+import math
+from json.encoder import encode_basestring_ascii
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from .love_manager_encoder import JsonMessageEncoder, MessageEncoder
+
+
+class TopicConverter:
+    """Convert samples of a SAL topic into the dictionary payload sent to the
+    LOVE manager.
+
+    The field names, data types and units are resolved once, when the
+    converter is created, and shared by reference between all converted
+    samples. Converting a sample reads all field values with a single
+    `operator.attrgetter` call and only allocates the per-field value
+    containers.
+
+    Parameters
+    ----------
+    csc : `str`
+        Name of the CSC.
+    salindex : `int`
+        SAL index of the CSC.
+    topic_name : `str`
+        Name of the topic (without prefix), e.g. "summaryState".
+    fields : `list` of `tuple`
+        List of (name, default value, data type, units) for each field.
+    as_list : `bool`
+        Wrap the topic payload in a list (as done for events)?
+    """
+
+    def __init__(
+        self,
+        csc: str,
+        salindex: int,
+        topic_name: str,
+        fields: List[Tuple[str, Any, str, str]],
+        as_list: bool,
+    ) -> None:
+        self.csc = csc
+        self.salindex = salindex
+        self.topic_name = topic_name
+        self.as_list = as_list
+        self.fields = fields
+
+        self._field_metadata = tuple(
+            (name, data_type, units) for name, _, data_type, units in fields
+        )
+
+        field_names = [name for name, _, _, _ in fields]
+        self._field_names = tuple(field_names)
+
+        if len(field_names) == 0:
+            self._get_values: Callable[[Any], tuple] = lambda data: ()
+        elif len(field_names) == 1:
+            get_value = attrgetter(field_names[0])
+            self._get_values = lambda data: (get_value(data),)
+        else:
+            self._get_values = attrgetter(*field_names)
+
+    def get_schema(self) -> dict:
+        """Return the schema of the topic.
+
+        Returns
+        -------
+        `dict`
+            Payload with the csc, salindex and the data type and units of each
+            field of the topic.
+        """
+        return dict(
+            csc=self.csc,
+            salindex=self.salindex,
+            data={
+                self.topic_name: {
+                    name: {"dataType": data_type, "units": units}
+                    for name, data_type, units in self._field_metadata
+                }
+            },
+        )
+
+    def get_values(self, data: Any) -> tuple:
+        """Return the values of all fields of a topic sample.
+
+        Parameters
+        ----------
+        data : `object`
+            Topic sample.
+
+        Returns
+        -------
+        `tuple`
+            Field values, in the order of `fields`.
+        """
+        return self._get_values(data)
+
+    def convert_fields(
+        self, values: tuple, indices: Iterable[int], values_only: bool = False
+    ) -> dict:
+        """Convert a subset of the fields of a topic sample.
+
+        Parameters
+        ----------
+        values : `tuple`
+            Field values, as returned by `get_values`.
+        indices : iterable of `int`
+            Indices of the fields to include.
+        values_only : `bool`, optional
+            Only include the field values, as in `convert_values`.
+
+        Returns
+        -------
+        `dict`
+            Payload with the csc, salindex and the selected fields.
+        """
+        if values_only:
+            data_stream = {self._field_names[i]: values[i] for i in indices}
+        else:
+            data_stream = dict()
+            for i in indices:
+                name, data_type, units = self._field_metadata[i]
+                data_stream[name] = {
+                    "value": values[i],
+                    "dataType": data_type,
+                    "units": units,
+                }
+
+        return self._make_payload(data_stream)
+
+    def get_template(self, values_only: bool = False) -> dict:
+        """Return the payload of a sample with the default value of each
+        field.
+
+        Parameters
+        ----------
+        values_only : `bool`, optional
+            Only include the field values, as in `convert_values`.
+
+        Returns
+        -------
+        `dict`
+            Payload with the csc, salindex and topic data.
+        """
+        return self._make_payload(
+            {name: default for name, default, _, _ in self.fields}
+            if values_only
+            else {
+                name: {"value": default, "dataType": data_type, "units": units}
+                for name, default, data_type, units in self.fields
+            }
+        )
+
+    def convert(self, data: Any) -> dict:
+        """Convert a topic sample.
+
+        Parameters
+        ----------
+        data : `object`
+            Topic sample.
+
+        Returns
+        -------
+        `dict`
+            Payload with the csc, salindex and topic data.
+        """
+        data_stream = {
+            name: {"value": value, "dataType": data_type, "units": units}
+            for (name, data_type, units), value in zip(
+                self._field_metadata, self._get_values(data)
+            )
+        }
+
+        return self._make_payload(data_stream)
+
+    def convert_values(self, data: Any) -> dict:
+        """Convert a topic sample, with only the field values.
+
+        Parameters
+        ----------
+        data : `object`
+            Topic sample.
+
+        Returns
+        -------
+        `dict`
+            Payload with the csc, salindex and topic data, where each field
+            maps directly to its value. See `get_schema`.
+        """
+        return self._make_payload(dict(zip(self._field_names, self._get_values(data))))
+
+    def _make_payload(self, data_stream: dict) -> dict:
+        return dict(
+            csc=self.csc,
+            salindex=self.salindex,
+            data={self.topic_name: [data_stream] if self.as_list else data_stream},
+        )
+
+
+class TopicSerializer:
+    """Serialize samples of a SAL topic directly into the json payload sent
+    to the LOVE manager.
+
+    The json fragments that do not change between samples (csc, salindex,
+    topic name, field names, data types and units) are rendered once for each
+    message encoder, see `get_fragments`. Serializing a sample only encodes the field
+    values and joins them with the pre-rendered fragments, without building
+    the intermediate dictionary.
+
+    Parameters
+    ----------
+    csc : `str`
+        Name of the CSC.
+    salindex : `int`
+        SAL index of the CSC.
+    topic_name : `str`
+        Name of the topic (without prefix), e.g. "summaryState".
+    fields : `list` of `tuple`
+        List of (name, default value, data type, units) for each field.
+    as_list : `bool`
+        Wrap the topic payload in a list (as done for events)?
+    values_only : `bool`, optional
+        Only write the field values, e.g. ``{"field": value}``, instead of the
+        value, data type and units of each field. Data types and units are
+        then sent separately, in the topic schema message.
+    """
+
+    def __init__(
+        self,
+        csc: str,
+        salindex: int,
+        topic_name: str,
+        fields: List[Tuple[str, Any, str, str]],
+        as_list: bool,
+        values_only: bool = False,
+    ) -> None:
+        self.csc = csc
+        self.salindex = salindex
+        self.topic_name = topic_name
+        self.values_only = values_only
+        self.field_names = [name for name, _, _, _ in fields]
+        self.fields = fields
+        self.as_list = as_list
+
+        self._fragments: Dict[str, Tuple[str, list, str]] = dict()
+
+    def get_fragments(self, encoder: MessageEncoder) -> Tuple[str, list, str]:
+        """Return the pre-rendered json fragments of the topic payload, for a
+        message encoder.
+
+        Fragments are rendered with the message encoder, the first time they
+        are requested, so strings are written as the encoder writes them
+        (e.g. non-ASCII characters are escaped by `JsonMessageEncoder` but not
+        by `OrjsonMessageEncoder`).
+
+        Parameters
+        ----------
+        encoder : `MessageEncoder`
+            Message encoder.
+
+        Returns
+        -------
+        head : `str`
+            Payload up to the first field.
+        fields : `list` of `tuple`
+            List of (name, prefix, value encoder, suffix) for each field.
+        tail : `str`
+            Payload after the last field.
+        """
+        fragments = self._fragments.get(encoder.name)
+        if fragments is not None:
+            return fragments
+
+        encode_str = self.get_value_encoder("", encoder)
+
+        head = (
+            f'{{"csc":{encode_str(self.csc, encoder)},"salindex":{self.salindex},'
+            f'"data":{{{encode_str(self.topic_name, encoder)}:'
+            f"{'[' if self.as_list else ''}{{"
+        )
+        tail = f"}}{']' if self.as_list else ''}}}}}"
+
+        fields = [
+            (
+                (
+                    name,
+                    f'{"," if i > 0 else ""}{encode_str(name, encoder)}:',
+                    self.get_value_encoder(default_value, encoder),
+                    "",
+                )
+                if self.values_only
+                else (
+                    name,
+                    f'{"," if i > 0 else ""}{encode_str(name, encoder)}:{{"value":',
+                    self.get_value_encoder(default_value, encoder),
+                    f',"dataType":{encode_str(data_type, encoder)},'
+                    f'"units":{encode_str(units, encoder)}}}',
+                )
+            )
+            for i, (name, default_value, data_type, units) in enumerate(self.fields)
+        ]
+
+        fragments = self._fragments[encoder.name] = (head, fields, tail)
+        return fragments
+
+    @staticmethod
+    def get_value_encoder(
+        default_value: Any, encoder: MessageEncoder
+    ) -> Callable[[Any, MessageEncoder], str]:
+        """Return the function used to encode values of a field.
+
+        The function is selected from the type of the field default value,
+        falling back to the message encoder for anything other than basic
+        scalars. Strings and floats are only encoded directly for
+        `JsonMessageEncoder`, other encoders write them differently.
+
+        Parameters
+        ----------
+        default_value : `object`
+            Default value of the field.
+        encoder : `MessageEncoder`
+            Message encoder.
+
+        Returns
+        -------
+        `callable`
+            Function that receives the value and the message encoder and
+            returns the value as a json string.
+        """
+        if isinstance(default_value, bool):
+            return _encode_bool
+        if isinstance(default_value, int):
+            return _encode_int
+        if not isinstance(encoder, JsonMessageEncoder):
+            return _encode_any
+        if isinstance(default_value, float):
+            return _encode_float
+        if isinstance(default_value, str):
+            return _encode_str
+        return _encode_any
+
+    def serialize(self, data: Any, encoder: MessageEncoder) -> str:
+        """Serialize a topic sample.
+
+        Parameters
+        ----------
+        data : `object`
+            Topic sample.
+        encoder : `MessageEncoder`
+            Message encoder, must not be binary.
+
+        Returns
+        -------
+        `str`
+            Json string of the payload, the same as encoding the dictionary
+            created by `LoveProducerCSC._convert_data_to_dict` with `encoder`.
+        """
+        head, fields, tail = self.get_fragments(encoder)
+        parts = [head]
+        for name, prefix, value_encoder, suffix in fields:
+            parts.append(prefix)
+            parts.append(value_encoder(getattr(data, name), encoder))
+            parts.append(suffix)
+        parts.append(tail)
+        return "".join(parts)
+
+
+def _encode_bool(value: Any, encoder: MessageEncoder) -> str:
+    return "true" if value else "false"
+
+
+def _encode_int(value: Any, encoder: MessageEncoder) -> str:
+    return int.__repr__(int(value))
+
+
+def _encode_float(value: Any, encoder: MessageEncoder) -> str:
+    value = float(value)
+    return float.__repr__(value) if math.isfinite(value) else encoder.dumps(value)
+
+
+def _encode_str(value: Any, encoder: MessageEncoder) -> str:
+    return encode_basestring_ascii(value)
+
+
+def _encode_any(value: Any, encoder: MessageEncoder) -> str:
+    return encoder.dumps(value)
@@ -22,9 +22,27 @@
 
 import json
 import os
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 from lsst.ts import xml
+from lsst.ts.xml.component_info import ComponentInfo
+
+# Topics always handled by the first topic shard of a CSC, so the CSC as a
+# whole has a single heartbeat monitor and state.
+TOPIC_SHARD_CORE_TOPICS = frozenset(
+    {
+        "evt_heartbeat",
+        "evt_summaryState",
+        "evt_errorCode",
+        "evt_logMessage",
+        "evt_simulationMode",
+        "evt_softwareVersions",
+        "evt_configurationsAvailable",
+        "evt_configurationApplied",
+        "evt_authList",
+    }
+)
 
 
 def get_available_components():
@@ -38,6 +56,168 @@ def get_available_components():
     return set(xml.subsystems)
 
 
+def get_topic_attribute_names(csc: str) -> List[str]:
+    """Return the event and telemetry topic attribute names of a CSC from
+    the XML interface.
+
+    Parameters
+    ----------
+    csc : `str`
+        Name of the CSC.
+
+    Returns
+    -------
+    `list` of `str`
+        Topic attribute names, e.g. ``evt_summaryState``, ``tel_position``.
+    """
+    component_info = ComponentInfo(
+        name=csc, topic_subname=os.environ.get("LSST_TOPIC_SUBNAME", "")
+    )
+    return sorted(
+        topic_name
+        for topic_name in component_info.topics
+        if topic_name.startswith(("evt_", "tel_"))
+    )
+
+
+def get_topic_shard(topic_names: List[str], index: int, count: int) -> List[str]:
+    """Return the topics of one shard of a CSC split in ``count`` topic
+    shards.
+
+    The first shard has the `TOPIC_SHARD_CORE_TOPICS` (heartbeat,
+    summaryState, ...). The other topics are split round-robin, telemetry
+    first, so every shard gets a similar number of telemetry topics.
+
+    Parameters
+    ----------
+    topic_names : `list` of `str`
+        Topic attribute names of the CSC.
+    index : `int`
+        Index of the shard.
+    count : `int`
+        Number of shards.
+
+    Returns
+    -------
+    `list` of `str`
+        Topic attribute names of the shard.
+    """
+    if not 0 <= index < count:
+        raise ValueError(f"Invalid topic shard {index} of {count}.")
+
+    topics = sorted(
+        set(topic_names) - TOPIC_SHARD_CORE_TOPICS,
+        key=lambda topic_name: (not topic_name.startswith("tel_"), topic_name),
+    )
+    core_topics = (
+        sorted(set(topic_names) & TOPIC_SHARD_CORE_TOPICS) if index == 0 else []
+    )
+
+    return core_topics + topics[index::count]
+
+
+def parse_topic_shard(component: str) -> Tuple[str, Optional[Tuple[int, int]]]:
+    """Parse a component name with an optional topic shard, e.g.
+    ``MTM1M3@1/3`` (second of three topic shards of MTM1M3).
+
+    Parameters
+    ----------
+    component : `str`
+        Component name, with optional index and topic shard.
+
+    Returns
+    -------
+    name : `str`
+        Component name, with optional index.
+    topic_shard : `tuple` of `int` or `None`
+        Index and number of topic shards, `None` if not sharded.
+    """
+    if "@" not in component:
+        return component, None
+
+    name, topic_shard = component.split("@", maxsplit=1)
+    index, count = topic_shard.split("/", maxsplit=1)
+
+    return name, (int(index), int(count))
+
+
+def parse_topic_shard_counts(topic_shards: List[str]) -> Dict[str, int]:
+    """Parse the number of topic shards of components, given as
+    ``component=number of shards``, e.g. ``MTM1M3=3``.
+
+    Parameters
+    ----------
+    topic_shards : `list` of `str`
+        Number of topic shards of each component. Empty entries are ignored.
+
+    Returns
+    -------
+    `dict` of `int`
+        Number of topic shards, by component name.
+
+    Raises
+    ------
+    ValueError
+        If an entry is not a component name and a positive number of shards.
+    """
+    topic_shard_counts = dict()
+
+    for topic_shard in topic_shards:
+        if not topic_shard.strip():
+            continue
+
+        component, _, count = topic_shard.strip().rpartition("=")
+
+        if not component.strip() or not count.strip().isdigit() or int(count) < 1:
+            raise ValueError(
+                f"Invalid topic shards {topic_shard!r}. Must be "
+                "component=number of shards, e.g. MTM1M3=3."
+            )
+
+        topic_shard_counts[component.strip()] = int(count)
+
+    return topic_shard_counts
+
+
+def set_worker_spool_path(index: int) -> None:
+    """Give a worker process its own spool file, adding the worker index to
+    ``LOVE_PRODUCER_SPOOL_PATH``, if set.
+
+    Workers of a `LoveProducerSupervisor` inherit the environment of the
+    supervisor, and a spool file must not be shared between processes.
+
+    Parameters
+    ----------
+    index : `int`
+        Index of the worker.
+    """
+    spool_path = os.environ.get("LOVE_PRODUCER_SPOOL_PATH", "")
+    if spool_path:
+        os.environ["LOVE_PRODUCER_SPOOL_PATH"] = f"{spool_path}.{index}"
+
+
+def get_topic_shard_components(component: str, count: int) -> List[str]:
+    """Return the names of the topic shards of a component, see
+    `parse_topic_shard`.
+
+    Parameters
+    ----------
+    component : `str`
+        Component name, with optional index.
+    count : `int`
+        Number of topic shards.
+
+    Returns
+    -------
+    `list` of `str`
+        Component names with topic shard.
+    """
+    if count <= 1:
+        return [component]
+
+    return [f"{component}@{index}/{count}" for index in range(count)]
+
+
 class Settings:
     _trace = None
     _ws_host = None
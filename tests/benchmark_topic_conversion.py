@@ -0,0 +1,116 @@
+# This file is part of LOVE-producer.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by Inria Chile and
+# the LSST Project (https://www.lsst.org).
+#
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership and dependencies.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Micro-benchmark for the conversion of SAL topic samples.
+
+Compares the original conversion path (deep copy of a template dictionary
+followed by one ``getattr`` per field) with `TopicConverter` and
+`TopicSerializer`, for a synthetic topic with many fields.
+
+Run with::
+
+    python tests/benchmark_topic_conversion.py [--fields N] [--number N]
+"""
+
+import argparse
+import copy
+import timeit
+import types
+
+import numpy as np
+from love.producer import TopicConverter, TopicSerializer, get_message_encoder
+from love.producer.producer_utils import get_data_type
+
+
+def make_topic(number_of_fields):
+    default_values = dict()
+    sample_values = dict()
+    for i in range(number_of_fields):
+        kind = i % 4
+        if kind == 0:
+            default_values[f"double{i}"] = 0.0
+            sample_values[f"double{i}"] = np.random.random()
+        elif kind == 1:
+            default_values[f"int{i}"] = 0
+            sample_values[f"int{i}"] = int(np.random.randint(1000))
+        elif kind == 2:
+            default_values[f"string{i}"] = ""
+            sample_values[f"string{i}"] = f"value {i}"
+        else:
+            default_values[f"array{i}"] = [0.0] * 10
+            sample_values[f"array{i}"] = list(np.random.random(10))
+
+    fields = [
+        (name, value, get_data_type(value), "deg")
+        for name, value in default_values.items()
+    ]
+
+    return fields, types.SimpleNamespace(**sample_values)
+
+
+def convert_with_template(template, data):
+    data_stream = copy.deepcopy(template)
+    for topic_attribute in data_stream:
+        data_stream[topic_attribute]["value"] = getattr(data, topic_attribute)
+    return dict(csc="Test", salindex=1, data=dict(topic=data_stream))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fields", type=int, default=300)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    encoder = get_message_encoder()
+    fields, sample = make_topic(args.fields)
+
+    template = {
+        name: {"value": value, "dataType": data_type, "units": units}
+        for name, value, data_type, units in fields
+    }
+    topic_kwargs = dict(
+        csc="Test", salindex=1, topic_name="topic", fields=fields, as_list=False
+    )
+    converter = TopicConverter(**topic_kwargs)
+    serializer = TopicSerializer(**topic_kwargs)
+
+    cases = dict(
+        deepcopy_template=lambda: convert_with_template(template, sample),
+        topic_converter=lambda: converter.convert(sample),
+        deepcopy_template_and_encode=lambda: encoder.dumps(
+            convert_with_template(template, sample)
+        ),
+        topic_converter_and_encode=lambda: encoder.dumps(converter.convert(sample)),
+        topic_serializer=lambda: serializer.serialize(sample, encoder),
+    )
+
+    print(
+        f"{args.fields} fields, {args.number} samples, "
+        f"encoder={encoder.name}. Time per sample:"
+    )
+    for name, case in cases.items():
+        elapsed = min(timeit.repeat(case, number=args.number, repeat=3))
+        print(f"  {name:30s} {elapsed / args.number * 1e6:10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
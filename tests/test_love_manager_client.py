@@ -25,10 +25,24 @@ import contextlib
 import json
 import logging
 import os
+import tempfile
 import unittest
+import unittest.mock
 
+import aiohttp
 import websockets
-from love.producer import LoveManagerClient, LoveManagerMessage
+from love.producer import (
+    DeflateCompressionEstimator,
+    LoveManagerClient,
+    LoveManagerMessage,
+    MessageBatcher,
+    MessagePriority,
+    MessageSpool,
+    MsgpackMessageEncoder,
+    QueueMarker,
+    ZstdMessageCompressor,
+    tag_message,
+)
 from love.producer.test_utils import cancel_task
 
 
@@ -43,6 +57,7 @@ class TestLoveManagerClient(unittest.IsolatedAsyncioTestCase):
         self.love_manager_client = LoveManagerClient(self.log)
         self.love_manager_message = LoveManagerMessage("UnitTest")
         self.received_data = dict()
+        self.resume_reply = None
 
         self.sample_summary_state = dict(summaryState=4)
 
@@ -65,6 +80,58 @@ class TestLoveManagerClient(unittest.IsolatedAsyncioTestCase):
             if back_up_websocket_host is not None:
                 os.environ["WEBSOCKET_HOST"] = back_up_websocket_host
 
+    def test_websocket_protocols(self):
+        self.assertEqual(self.love_manager_client.websocket_protocols, ())
+
+        self.love_manager_client.wire_format = "msgpack"
+
+        if self.love_manager_client.binary_encoder is not None:
+            self.assertEqual(
+                self.love_manager_client.websocket_protocols, ("love.msgpack",)
+            )
+        else:
+            self.assertEqual(self.love_manager_client.websocket_protocols, ())
+
+    def test_websocket_protocols_zstd(self):
+        self.love_manager_client.compression = "zstd"
+
+        if not ZstdMessageCompressor.is_available():
+            self.assertEqual(self.love_manager_client.websocket_protocols, ())
+            return
+
+        self.assertEqual(
+            self.love_manager_client.websocket_protocols, ("love.json+zstd",)
+        )
+
+        self.love_manager_client.wire_format = "msgpack"
+
+        if self.love_manager_client.binary_encoder is not None:
+            self.assertEqual(
+                self.love_manager_client.websocket_protocols,
+                ("love.msgpack+zstd", "love.msgpack", "love.json+zstd"),
+            )
+
+    async def test_handle_connection_with_manager_deflate(self):
+        self.love_manager_client.compression = "deflate"
+        self.love_manager_client.deflate_estimator = DeflateCompressionEstimator(
+            sample_interval=1
+        )
+
+        async with self.setup_test_environment_to_handle_connection():
+            self.assertEqual(self.love_manager_client.connection_compression, "deflate")
+
+            data = dict(name="test_data", test_value_int=10)
+            await self.love_manager_client.send_message(
+                self.love_manager_message.get_message_category_as_json(
+                    category="telemetry", data=data
+                )
+            )
+
+            await self.wait_for_number_of_samples(1, sample_type="telemetry")
+
+            self.assertEqual(data, self.received_data["telemetry"][0])
+            self.assertGreater(self.love_manager_client.compression_stats.messages, 0)
+
     async def test_create_producers(self):
         components = self.create_producers()
 
@@ -94,6 +161,34 @@ class TestLoveManagerClient(unittest.IsolatedAsyncioTestCase):
         async with self.setup_test_environment_to_handle_connection():
             self.assert_initial_state_subscribe_messages_sent(components)
 
+    async def test_handle_connection_with_manager_sends_schemas(self):
+        self.love_manager_client.register_initial_data_wait_time = self.pool_timeout
+        components = self.create_producers()
+
+        for producer in self.love_manager_client.producers:
+            producer.get_schema_messages_as_json = unittest.mock.Mock(
+                return_value=[
+                    self.love_manager_message.get_message_category_as_json(
+                        category="schema",
+                        data=dict(
+                            csc=producer.component_name,
+                            salindex=0,
+                            data=dict(summaryState=dict(summaryState=dict())),
+                        ),
+                    )
+                ]
+            )
+
+        async with self.setup_test_environment_to_handle_connection():
+            await self.wait_for_number_of_samples(len(components), sample_type="schema")
+            # Registration cycles do not send the schemas again.
+            await asyncio.sleep(self.pool_timeout * 5)
+
+        self.assertEqual(
+            sorted(schema["csc"] for schema in self.received_data["schema"]),
+            sorted(components),
+        )
+
     async def test_send_message(self):
         async with self.setup_test_environment_to_handle_connection():
             data = dict(
@@ -116,6 +211,356 @@ class TestLoveManagerClient(unittest.IsolatedAsyncioTestCase):
             self.assertEqual(len(self.received_data["telemetry"]), 1)
             self.assertEqual(data, self.received_data["telemetry"][0])
 
+    async def test_send_message_batch(self):
+        self.love_manager_client.batcher = MessageBatcher.from_config("telemetry:50")
+
+        async with self.setup_test_environment_to_handle_connection():
+            for value in range(2):
+                await self.love_manager_client.send_message(
+                    self.love_manager_message.get_message_category_as_json(
+                        category="telemetry", data=dict(value=value)
+                    )
+                )
+
+            await self.wait_for_number_of_samples(1, sample_type="telemetry")
+            await asyncio.sleep(self.pool_timeout)
+
+            self.assertEqual(len(self.received_data["telemetry"]), 1)
+            self.assertEqual(self.love_manager_client.batcher.messages_batched, 2)
+
+    async def test_send_message_disconnected(self):
+        send_queue = self.love_manager_client.send_queue
+        # Connection lost: the websocket is set but not ready.
+        self.love_manager_client.websocket = unittest.mock.Mock(spec=[])
+
+        telemetry = self.love_manager_message.get_message_category_as_json(
+            category="telemetry", data=dict(value=0)
+        )
+        summary_state = tag_message(
+            self.love_manager_message.get_message_category_as_json(
+                category="event", data=dict(value=0)
+            ),
+            MessagePriority.EVENT,
+            must_deliver=True,
+        )
+
+        await self.love_manager_client.send_message(telemetry)
+        await self.love_manager_client.send_message(summary_state)
+
+        self.assertEqual(send_queue.dropped[MessagePriority.TELEMETRY], 1)
+        self.assertEqual(len(send_queue), 1)
+
+        self.love_manager_client.websocket = None
+
+    async def test_backpressure(self):
+        self.love_manager_client.conflate = False
+        self.love_manager_client.send_queue.conflate = False
+        self.love_manager_client.backpressure.high_watermark = 100
+        self.love_manager_client.backpressure.low_watermark = 0
+        self.create_producers()
+
+        # The writer is not running: the send queue is not drained, so it
+        # builds up.
+        self.love_manager_client.websocket = unittest.mock.Mock(spec=[])
+        self.love_manager_client._websocket_ready.set()
+
+        for value in range(10):
+            await self.love_manager_client.send_message(
+                self.love_manager_message.get_message_category_as_json(
+                    category="telemetry", data=dict(value=value)
+                )
+            )
+
+        self.assertTrue(self.love_manager_client.backpressure.active)
+        self.assertTrue(self.love_manager_client.send_queue.conflate)
+        for producer in self.love_manager_client.producers:
+            self.assertTrue(producer.under_backpressure)
+
+        self.love_manager_client.send_queue.clear()
+        self.love_manager_client._websocket_ready.clear()
+        self.love_manager_client.websocket = None
+        self.love_manager_client.update_backpressure()
+
+        self.assertFalse(self.love_manager_client.backpressure.active)
+        self.assertFalse(self.love_manager_client.send_queue.conflate)
+
+    async def test_spool(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.love_manager_client.spool = MessageSpool(
+                os.path.join(temp_dir, "love_producer.spool")
+            )
+            self.love_manager_client.spool_replay_rate = 1000.0
+
+            for value in range(3):
+                await self.love_manager_client.send_message(
+                    tag_message(
+                        self.love_manager_message.get_message_category_as_json(
+                            category="event", data=dict(value=value)
+                        ),
+                        MessagePriority.EVENT,
+                        must_deliver=True,
+                    )
+                )
+
+            self.assertEqual(len(self.love_manager_client.spool), 3)
+
+            self.create_producers()
+            self.add_summary_state_samples()
+
+            async with self.setup_test_environment_to_handle_connection():
+                await self.wait_for_number_of_samples(5, sample_type="event")
+                await asyncio.sleep(self.pool_timeout)
+
+            # Spooled events first, then the initial data, only once.
+            self.assertEqual(
+                self.received_data["event"],
+                [dict(value=value) for value in range(3)]
+                + [self.sample_summary_state] * 2,
+            )
+            self.assertEqual(len(self.love_manager_client.spool), 0)
+
+    async def test_spool_rejected_message(self):
+        send_queue = self.love_manager_client.send_queue
+        send_queue.capacities[MessagePriority.EVENT] = 1
+        self.love_manager_client.websocket = unittest.mock.Mock(spec=[])
+        self.love_manager_client._websocket_ready.set()
+
+        messages = [
+            tag_message(
+                self.love_manager_message.get_message_category_as_json(
+                    category="event", data=dict(value=value)
+                ),
+                MessagePriority.EVENT,
+                must_deliver=True,
+            )
+            for value in range(3)
+        ]
+
+        await self.love_manager_client.send_message(messages[0])
+
+        with self.assertLogs(self.log, level=logging.ERROR):
+            await self.love_manager_client.send_message(messages[1])
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.love_manager_client.spool = MessageSpool(
+                os.path.join(temp_dir, "love_producer.spool")
+            )
+
+            await self.love_manager_client.send_message(messages[2])
+
+            self.assertEqual(len(self.love_manager_client.spool), 1)
+            self.assertEqual(send_queue.rejected[MessagePriority.EVENT], 2)
+            # Replayed once the queue has room.
+            self.assertIsNotNone(self.love_manager_client._spool_replay_task)
+
+            self.love_manager_client._websocket_ready.clear()
+            self.love_manager_client.websocket = None
+            await cancel_task(self.love_manager_client._spool_replay_task)
+
+    async def test_spool_rejected_message_order(self):
+        send_queue = self.love_manager_client.send_queue
+        send_queue.capacities[MessagePriority.EVENT] = 1
+        self.love_manager_client.spool_replay_rate = 1000.0
+        self.love_manager_client.websocket = unittest.mock.Mock(spec=[])
+        self.love_manager_client._websocket_ready.set()
+
+        messages = [
+            tag_message(
+                self.love_manager_message.get_message_category_as_json(
+                    category="event", data=dict(value=value)
+                ),
+                MessagePriority.EVENT,
+                must_deliver=True,
+            )
+            for value in range(4)
+        ]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.love_manager_client.spool = MessageSpool(
+                os.path.join(temp_dir, "love_producer.spool")
+            )
+
+            await self.love_manager_client.send_message(messages[0])
+            await self.love_manager_client.send_message(messages[1])
+            send_queue.capacities[MessagePriority.EVENT] = 10
+
+            # Spooled behind the rejected message, although the queue has
+            # room for it.
+            await self.love_manager_client.send_message(messages[2])
+            self.assertEqual(len(self.love_manager_client.spool), 2)
+
+            await asyncio.wait_for(
+                self.love_manager_client._spool_replay_task, timeout=self.pool_timeout
+            )
+
+            # Queued once the spool is drained.
+            await self.love_manager_client.send_message(messages[3])
+
+            self.assertEqual(
+                [send_queue.get_nowait() for _ in range(len(send_queue))], messages
+            )
+
+            self.love_manager_client._websocket_ready.clear()
+            self.love_manager_client.websocket = None
+
+    async def test_resume(self):
+        self.love_manager_client.resume = True
+        self.create_producers()
+        self.add_summary_state_samples()
+
+        for producer in self.love_manager_client.producers:
+            producer.stream_sequences = True
+            producer.add_stream_sequence("summaryState", dict())
+
+        self.resume_reply = dict(
+            category="resume",
+            session=self.love_manager_client.session,
+            streams=[
+                dict(csc="UnitTest1", salindex=0, stream="summaryState", sequence=1)
+            ],
+        )
+
+        async with self.setup_test_environment_to_handle_connection():
+            await self.wait_for_number_of_samples(1)
+            await asyncio.sleep(self.pool_timeout)
+
+        self.assertEqual(len(self.received_data["resume"]), 1)
+        self.assertEqual(
+            self.received_data["event"], [dict(summaryState=4, sequence=1)]
+        )
+
+    async def test_resume_unknown_session(self):
+        self.love_manager_client.resume = True
+        self.create_producers()
+        self.add_summary_state_samples()
+
+        self.resume_reply = dict(category="resume", session="unknown", streams=[])
+
+        async with self.setup_test_environment_to_handle_connection():
+            await self.wait_for_number_of_samples(2)
+
+        self.assertEqual(len(self.received_data["event"]), 2)
+
+    async def test_resume_invalid_reply(self):
+        self.love_manager_client.resume = True
+        self.create_producers()
+        self.add_summary_state_samples()
+
+        self.resume_reply = dict(
+            category="resume",
+            session=self.love_manager_client.session,
+            streams=[dict(csc="UnitTest1", salindex=0, stream="summaryState")],
+        )
+
+        async with self.setup_test_environment_to_handle_connection():
+            await self.wait_for_number_of_samples(2)
+
+        self.assertEqual(len(self.received_data["event"]), 2)
+
+    @unittest.skipIf(
+        not MsgpackMessageEncoder.is_available(), "msgpack is not installed."
+    )
+    async def test_resume_request_wire_format(self):
+        self.love_manager_client.encoder = MsgpackMessageEncoder()
+        self.love_manager_client.resume_timeout = 0.0
+        self.love_manager_client.send_message = unittest.mock.AsyncMock()
+
+        await self.love_manager_client._resume_connection()
+
+        resume_request = self.love_manager_client.send_message.call_args_list[0][0][0]
+
+        self.assertIsInstance(resume_request, bytes)
+        self.assertEqual(
+            self.love_manager_client.encoder.loads(resume_request)["category"],
+            "resume",
+        )
+
+    async def test_initial_data(self):
+        self.create_producers()
+        self.add_summary_state_samples()
+
+        async with self.setup_test_environment_to_handle_connection():
+            await self.wait_for_number_of_samples(2)
+            await asyncio.sleep(self.pool_timeout)
+
+        self.assertEqual(len(self.received_data["event"]), 2)
+        self.assertIsNotNone(self.love_manager_client.time_to_initial_data)
+
+    async def test_initial_data_bulk_snapshot(self):
+        self.love_manager_client.bulk_snapshot = True
+        self.create_producers()
+
+        for producer in self.love_manager_client.producers:
+            producer.store_samples(
+                **{f"event{i}": dict(value=i) for i in range(3)},
+            )
+
+        async with self.setup_test_environment_to_handle_connection():
+            await self.wait_for_number_of_samples(2)
+            await asyncio.sleep(self.pool_timeout)
+
+        # One snapshot message per producer; only the first sample of each
+        # message is recorded.
+        self.assertEqual(self.received_data["event"], [dict(value=0)] * 2)
+        self.assertIsNotNone(self.love_manager_client.time_to_initial_data)
+
+    def test_join_snapshot(self):
+        self.love_manager_client.snapshot_byte_budget = 30
+        messages = [
+            self.love_manager_message.get_message_category_as_json(
+                category="event", data=dict(value=i)
+            )
+            for i in range(5)
+        ]
+
+        snapshots = self.love_manager_client.join_snapshot(
+            [message.parts for message in messages]
+        )
+
+        # Payloads are 11 bytes, so 2 fit in the byte budget.
+        self.assertEqual(
+            [
+                [data["value"] for data in json.loads(snapshot)["data"]]
+                for snapshot in snapshots
+            ],
+            [[0, 1], [2, 3], [4]],
+        )
+        self.assertEqual(
+            [json.loads(snapshot)["producer_snd"] for snapshot in snapshots],
+            [messages[i].parts.timestamp for i in (0, 2, 4)],
+        )
+
+    async def test_send_queue_writer_marker(self):
+        websocket = unittest.mock.Mock(spec=["send_str", "send_bytes"])
+        self.love_manager_client.reset_tasks()
+        self.love_manager_client.websocket = websocket
+        self.love_manager_client._websocket_ready.set()
+
+        # Marker of an earlier connection, followed by the current one.
+        self.love_manager_client._initial_data_marker = QueueMarker(
+            MessagePriority.EVENT
+        )
+        self.love_manager_client.send_queue.put_nowait(
+            QueueMarker(MessagePriority.EVENT)
+        )
+        self.love_manager_client.send_queue.put_nowait(
+            self.love_manager_client._initial_data_marker
+        )
+
+        writer_task = asyncio.create_task(self.love_manager_client._send_queue_writer())
+        try:
+            await asyncio.sleep(self.pool_timeout)
+        finally:
+            self.love_manager_client._websocket_ready.clear()
+            self.love_manager_client.websocket = None
+            await cancel_task(writer_task)
+
+        websocket.send_str.assert_not_called()
+        websocket.send_bytes.assert_not_called()
+        self.assertEqual(len(self.love_manager_client.send_queue), 0)
+        self.assertIsNone(self.love_manager_client._initial_data_marker)
+        self.assertIsNotNone(self.love_manager_client.time_to_initial_data)
+
     async def test_handle_message_reception(self):
         components = self.create_producers()
 
@@ -157,6 +602,161 @@ class TestLoveManagerClient(unittest.IsolatedAsyncioTestCase):
             )
         )
 
+    async def test_get_reply_producers(self):
+        self.create_producers()
+
+        for producer in self.love_manager_client.producers:
+            self.assertEqual(
+                self.love_manager_client.get_reply_producers(
+                    self.get_sample_message_data_from_manager(
+                        producer.component_name, 0
+                    )
+                ),
+                [producer],
+            )
+
+        self.assertEqual(
+            self.love_manager_client.get_reply_producers(
+                self.get_sample_message_data_from_manager("UnitTest3", 0)
+            ),
+            [],
+        )
+        self.assertEqual(
+            self.love_manager_client.get_reply_producers(
+                dict(category="initial_state")
+            ),
+            [],
+        )
+
+    def test_get_reply_producers_without_salindex(self):
+        producers = [
+            unittest.mock.Mock(
+                get_reply_routes=unittest.mock.Mock(return_value=[route])
+            )
+            for route in (
+                ("UnitTest1", 1, None),
+                ("UnitTest1", 2, None),
+                ("UnitTest2", 1, None),
+            )
+        ]
+        for producer in producers:
+            self.love_manager_client.add_reply_routes(producer)
+
+        self.assertEqual(
+            self.love_manager_client.get_reply_producers(
+                dict(category="initial_state", data=[dict(csc="UnitTest1")])
+            ),
+            producers[:2],
+        )
+        self.assertEqual(
+            self.love_manager_client.get_reply_producers(
+                self.get_sample_message_data_from_manager("UnitTest1", 2)
+            ),
+            [producers[1]],
+        )
+
+    def test_coalesce_request(self):
+        message_data = self.get_sample_message_data_from_manager("UnitTest1", 0)
+
+        self.assertFalse(self.love_manager_client.coalesce_request(message_data))
+        self.assertTrue(self.love_manager_client.coalesce_request(message_data))
+        self.assertFalse(
+            self.love_manager_client.coalesce_request(
+                self.get_sample_message_data_from_manager("UnitTest2", 0)
+            )
+        )
+        self.assertEqual(self.love_manager_client.coalesced_requests, 1)
+
+        self.love_manager_client.reply_coalesce_window = 0.0
+
+        self.assertFalse(self.love_manager_client.coalesce_request(message_data))
+
+    async def test_dispatch_message(self):
+        self.create_producers()
+        self.love_manager_client.reply_coalesce_window = 0.0
+
+        replies = []
+        release_slow_reply = asyncio.Event()
+
+        async def slow_reply(message_data):
+            await release_slow_reply.wait()
+            replies.append(("UnitTest1", message_data["data"][0]["salindex"]))
+
+        async def reply(message_data):
+            replies.append(("UnitTest2", message_data["data"][0]["salindex"]))
+
+        slow_producer, producer = self.love_manager_client.producers
+        slow_producer.reply_to_message_data = slow_reply
+        producer.reply_to_message_data = reply
+
+        for salindex in range(2):
+            for csc in ("UnitTest1", "UnitTest2"):
+                await self.love_manager_client.dispatch_message(
+                    self.get_sample_message_data_from_manager(csc, salindex)
+                )
+
+        await asyncio.sleep(self.pool_timeout)
+
+        # The slow reply does not block the other producer.
+        self.assertEqual(replies, [("UnitTest2", 0), ("UnitTest2", 1)])
+
+        release_slow_reply.set()
+        await asyncio.sleep(self.pool_timeout)
+
+        # Replies of the same producer are sent in order.
+        self.assertEqual(
+            replies[2:],
+            [("UnitTest1", 0), ("UnitTest1", 1)],
+        )
+
+    async def test_reply_error(self):
+        self.create_producers()
+        self.love_manager_client.reply_coalesce_window = 0.0
+
+        async def failing_reply(message_data):
+            raise RuntimeError("Reply failed.")
+
+        for producer in self.love_manager_client.producers:
+            producer.reply_to_message_data = failing_reply
+
+        for max_concurrent_replies in (0, 8):
+            with self.subTest(max_concurrent_replies=max_concurrent_replies):
+                self.love_manager_client.max_concurrent_replies = max_concurrent_replies
+                with self.assertLogs(self.log, level=logging.ERROR):
+                    await self.love_manager_client.handle_producers_reply_to_server(
+                        self.get_sample_message_data_from_manager("UnitTest1", 0)
+                    )
+
+    async def test_dispatch_message_error(self):
+        self.love_manager_client.handle_producers_reply_to_server = (
+            unittest.mock.AsyncMock(side_effect=RuntimeError("Request failed."))
+        )
+
+        with self.assertLogs(self.log, level=logging.ERROR):
+            await self.love_manager_client.dispatch_message(dict())
+            await asyncio.sleep(self.pool_timeout)
+
+        self.assertEqual(len(self.love_manager_client._request_tasks), 0)
+
+    def test_is_message_handled(self):
+        for data, handled in (
+            (json.dumps(dict(category="initial_state")), True),
+            (json.dumps(dict(category="resume")), True),
+            (json.dumps(dict(category="event")), False),
+        ):
+            self.assertEqual(
+                self.love_manager_client.is_message_handled(
+                    unittest.mock.Mock(type=aiohttp.WSMsgType.TEXT, data=data)
+                ),
+                handled,
+            )
+
+        self.assertFalse(
+            self.love_manager_client.is_message_handled(
+                unittest.mock.Mock(type=aiohttp.WSMsgType.CLOSE, data=None)
+            )
+        )
+
     def create_producers(self):
         components = ["UnitTest1", "UnitTest2"]
 
@@ -293,6 +893,9 @@ class TestLoveManagerClient(unittest.IsolatedAsyncioTestCase):
                     )
                     self.received_data[data_category] = []
 
+                if data_category == "resume" and self.resume_reply is not None:
+                    await websocket.send(json.dumps(self.resume_reply))
+
                 self.log.debug(f"Appending {data_message} to {data_category}")
                 self.received_data[data_category].append(
                     data_message["data"][0] if "data" in data_message else data_message
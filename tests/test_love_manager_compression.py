@@ -0,0 +1,130 @@
+# This file is part of LOVE-producer.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by Inria Chile and
+# the LSST Project (https://www.lsst.org).
+#
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership and dependencies.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import base64
+import json
+import unittest
+
+from love.producer import (
+    CompressionStats,
+    DeflateCompressionEstimator,
+    LoveManagerMessage,
+    ZstdMessageCompressor,
+)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class TestLoveManagerCompression(unittest.TestCase):
+    def setUp(self):
+        self.love_manager_message = LoveManagerMessage("Test")
+        self.samples = [
+            self.love_manager_message.get_message_category_as_json(
+                category="telemetry",
+                data=dict(
+                    csc="Test",
+                    salindex=index,
+                    data={
+                        f"topic{index}": {
+                            f"field{field}": dict(
+                                value=float(index * field),
+                                dataType="Float",
+                                units="deg",
+                            )
+                            for field in range(10)
+                        }
+                    },
+                ),
+            ).encode()
+            for index in range(200)
+        ]
+
+    def test_compression_stats(self):
+        stats = CompressionStats("test")
+
+        self.assertEqual(stats.ratio, 1.0)
+
+        stats.record(bytes_in=100, bytes_out=25, compression_time=0.5)
+        stats.record(bytes_in=100, bytes_out=25, compression_time=0.5)
+
+        self.assertEqual(stats.messages, 2)
+        self.assertEqual(stats.ratio, 4.0)
+        self.assertAlmostEqual(stats.time_per_megabyte, 5e3)
+        self.assertEqual(stats.as_dict()["bytes_in"], 200)
+
+    def test_deflate_estimator(self):
+        estimator = DeflateCompressionEstimator(sample_interval=10)
+
+        for sample in self.samples[:100]:
+            estimator.sample(sample.decode())
+
+        self.assertEqual(estimator.stats.messages, 10)
+        self.assertGreater(estimator.stats.ratio, 1.0)
+
+    @unittest.skipIf(zstandard is None, "zstandard not installed")
+    def test_zstd_with_dictionary(self):
+        compressor = ZstdMessageCompressor(self.samples)
+
+        self.assertIsNotNone(compressor.dictionary)
+
+        message = self.samples[0].decode()
+        compressed = compressor.compress(message)
+
+        dictionary_message = json.loads(compressor.get_dictionary_message())
+
+        self.assertEqual(dictionary_message["category"], "compression")
+        self.assertEqual(
+            dictionary_message["dictionary_id"], compressor.dictionary.dict_id()
+        )
+
+        decompressor = zstandard.ZstdDecompressor(
+            dict_data=zstandard.ZstdCompressionDict(
+                base64.b64decode(dictionary_message["dictionary"])
+            )
+        )
+
+        self.assertEqual(decompressor.decompress(compressed).decode(), message)
+        self.assertEqual(compressor.stats.messages, 1)
+        self.assertGreater(compressor.stats.ratio, 1.0)
+
+    @unittest.skipIf(zstandard is None, "zstandard not installed")
+    def test_zstd_without_dictionary(self):
+        compressor = ZstdMessageCompressor(self.samples[:2])
+
+        self.assertIsNone(compressor.dictionary)
+        self.assertEqual(
+            json.loads(compressor.get_dictionary_message())["dictionary"], ""
+        )
+        self.assertEqual(
+            zstandard.ZstdDecompressor().decompress(
+                compressor.compress(self.samples[0])
+            ),
+            self.samples[0],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
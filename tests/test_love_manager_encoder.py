@@ -0,0 +1,268 @@
+# This file is part of LOVE-producer.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by Inria Chile and
+# the LSST Project (https://www.lsst.org).
+#
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership and dependencies.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import unittest
+
+import numpy as np
+from love.producer import (
+    EncodedPayload,
+    JsonMessageEncoder,
+    LoveManagerMessage,
+    MsgpackMessageEncoder,
+    OrjsonMessageEncoder,
+    get_message_encoder,
+)
+from lsst.ts import utils
+
+
+class TestLoveManagerEncoder(unittest.TestCase):
+    def setUp(self):
+        self.sample_message = dict(
+            category="telemetry",
+            data=[
+                dict(
+                    csc="Test",
+                    salindex=1,
+                    data=dict(
+                        scalars=dict(
+                            int0=dict(value=np.int32(10), dataType="Int", units=""),
+                            boolean0=dict(
+                                value=np.bool_(True), dataType="Boolean", units=""
+                            ),
+                            double0=dict(value=1.0 / 3.0, dataType="Float", units="s"),
+                            string0=dict(value="test", dataType="String", units=""),
+                            array=dict(
+                                value=np.arange(5, dtype=np.int64),
+                                dataType="Array<Int>",
+                                units="deg",
+                            ),
+                            float0=dict(
+                                value=np.float32(0.1), dataType="Float", units=""
+                            ),
+                            byte0=dict(value=np.int8(-3), dataType="Byte", units=""),
+                            ulong0=dict(
+                                value=np.uint64(2**63), dataType="ULong", units=""
+                            ),
+                            floatArray=dict(
+                                value=np.array([0.1, 0.2, -1.5], dtype=np.float32),
+                                dataType="Array<Float>",
+                                units="",
+                            ),
+                            byteArray=dict(
+                                value=np.array([-1, 2], dtype=np.int8),
+                                dataType="Array<Byte>",
+                                units="",
+                            ),
+                            ulongArray=dict(
+                                value=np.array([0, 2**63], dtype=np.uint64),
+                                dataType="Array<ULong>",
+                                units="",
+                            ),
+                        )
+                    ),
+                ),
+            ],
+            producer_snd=1700000000.123456,
+        )
+
+    def test_json_encoder(self):
+        encoder = get_message_encoder("json")
+
+        self.assertIsInstance(encoder, JsonMessageEncoder)
+
+        message = json.loads(encoder.dumps(self.sample_message))
+
+        self.assertEqual(
+            message["data"][0]["data"]["scalars"]["array"]["value"], [0, 1, 2, 3, 4]
+        )
+        self.assertEqual(message["data"][0]["data"]["scalars"]["int0"]["value"], 10)
+        self.assertEqual(
+            message["data"][0]["data"]["scalars"]["ulong0"]["value"], 2**63
+        )
+        self.assertEqual(
+            message["data"][0]["data"]["scalars"]["float0"]["value"],
+            float(np.float32(0.1)),
+        )
+
+    @unittest.skipIf(
+        not OrjsonMessageEncoder.is_available(), "orjson is not installed."
+    )
+    def test_orjson_encoder_matches_json_encoder(self):
+        json_encoder = get_message_encoder("json")
+        orjson_encoder = get_message_encoder("orjson")
+
+        self.assertIsInstance(orjson_encoder, OrjsonMessageEncoder)
+
+        scalars = self.sample_message["data"][0]["data"]["scalars"]
+        float32_fields = {name: scalars.pop(name) for name in ("float0", "floatArray")}
+
+        self.assertEqual(
+            json_encoder.dumps(self.sample_message),
+            orjson_encoder.dumps(self.sample_message),
+        )
+
+        # float32 values are written with their shortest representation,
+        # which decodes to the same float32 values.
+        for name, field in float32_fields.items():
+            with self.subTest(name=name):
+                np.testing.assert_array_equal(
+                    np.array(
+                        json.loads(orjson_encoder.dumps(field["value"])),
+                        dtype=np.float32,
+                    ),
+                    field["value"],
+                )
+
+    @unittest.skipIf(
+        not OrjsonMessageEncoder.is_available(), "orjson is not installed."
+    )
+    def test_orjson_encoder_non_finite_floats(self):
+        json_encoder = get_message_encoder("json")
+        orjson_encoder = get_message_encoder("orjson")
+
+        for value in (
+            float("nan"),
+            float("inf"),
+            -float("inf"),
+            np.array([1.0, np.nan, np.inf]),
+            [1.5, None, -float("inf")],
+        ):
+            with self.subTest(value=value):
+                self.sample_message["data"][0]["data"]["scalars"]["double0"][
+                    "value"
+                ] = value
+
+                self.assertEqual(
+                    json_encoder.dumps(self.sample_message),
+                    orjson_encoder.dumps(self.sample_message),
+                )
+
+    @unittest.skipIf(
+        not MsgpackMessageEncoder.is_available(), "msgpack is not installed."
+    )
+    def test_msgpack_encoder(self):
+        encoder = get_message_encoder("msgpack")
+
+        self.assertTrue(encoder.binary)
+
+        message = encoder.loads(encoder.dumps(self.sample_message))
+        array = message["data"][0]["data"]["scalars"]["array"]["value"]
+
+        self.assertIsInstance(array, np.ndarray)
+        np.testing.assert_array_equal(array, np.arange(5))
+        self.assertEqual(message["data"][0]["data"]["scalars"]["int0"]["value"], 10)
+
+    @unittest.skipIf(
+        not MsgpackMessageEncoder.is_available(), "msgpack is not installed."
+    )
+    def test_msgpack_category_message(self):
+        encoder = get_message_encoder("msgpack")
+        love_manager_message = LoveManagerMessage(
+            component_name="Test", encoder=encoder
+        )
+        love_manager_message.add_metadata(salindex=1)
+        payload = self.sample_message["data"][0]
+
+        for data in (
+            payload,
+            EncodedPayload(get_message_encoder("json").dumps(payload)),
+        ):
+            with self.subTest(data_type=type(data).__name__):
+                message = encoder.loads(
+                    love_manager_message.get_message_category_as_json(
+                        category="telemetry", data=data
+                    )
+                )
+
+                self.assertEqual(
+                    list(message), ["category", "data", "producer_snd", "salindex"]
+                )
+                self.assertEqual(message["category"], "telemetry")
+                self.assertEqual(message["salindex"], 1)
+                self.assertEqual(
+                    message["data"][0]["data"]["scalars"]["string0"]["value"], "test"
+                )
+
+    def test_add_payload_field(self):
+        payload = dict(csc="Test", salindex=1, data=dict(scalars=dict(value=1)))
+
+        encoders = [get_message_encoder("json")]
+        if MsgpackMessageEncoder.is_available():
+            encoders.append(get_message_encoder("msgpack"))
+
+        for encoder in encoders:
+            for data in (payload, encoder.encode_payload(payload)):
+                with self.subTest(encoder=encoder.name, data_type=type(data).__name__):
+                    extended = encoder.add_payload_field(data, "sequence", 3)
+
+                    self.assertIs(type(extended), type(data))
+                    self.assertEqual(
+                        (
+                            extended
+                            if isinstance(extended, dict)
+                            else encoder.loads(extended)
+                        ),
+                        {**payload, "sequence": 3},
+                    )
+
+        self.assertNotIn("sequence", payload)
+
+    def test_add_payload_field_empty_payload(self):
+        encoders = [get_message_encoder("json")]
+        if OrjsonMessageEncoder.is_available():
+            encoders.append(get_message_encoder("orjson"))
+        if MsgpackMessageEncoder.is_available():
+            encoders.append(get_message_encoder("msgpack"))
+
+        for encoder in encoders:
+            with self.subTest(encoder=encoder.name):
+                extended = encoder.add_payload_field(
+                    encoder.encode_payload(dict()), "sequence", 1
+                )
+
+                self.assertEqual(encoder.loads(extended), dict(sequence=1))
+
+    def test_get_message_encoder_bad_name(self):
+        with self.assertRaises(RuntimeError):
+            get_message_encoder("unspecified")
+
+    def test_get_message_encoder_from_environment(self):
+        with utils.modify_environ(LOVE_PRODUCER_MESSAGE_ENCODER="json"):
+            love_manager_message = LoveManagerMessage(component_name="Test")
+
+        self.assertIsInstance(love_manager_message.encoder, JsonMessageEncoder)
+
+    def test_get_message_encoder_binary_from_environment(self):
+        with utils.modify_environ(LOVE_PRODUCER_MESSAGE_ENCODER="msgpack"):
+            with self.assertRaises(RuntimeError):
+                get_message_encoder()
+
+    def test_get_message_encoder_default(self):
+        with utils.modify_environ(LOVE_PRODUCER_MESSAGE_ENCODER=None):
+            encoder = get_message_encoder()
+
+        self.assertIsInstance(encoder, JsonMessageEncoder)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -92,6 +92,33 @@ class TestLoveManagerMessage(unittest.IsolatedAsyncioTestCase):
         self.assertIn("new_metadata", telemetry_data)
         self.assertEqual("test_value", telemetry_data["new_metadata"])
 
+    def test_get_message_category_as_json_matches_message_category(self):
+        self.love_manager_message.add_metadata(salindex=1, name="test")
+
+        telemetry_json = self.love_manager_message.get_message_category_as_json(
+            category="telemetry", data=self.sample_telemetry
+        )
+        telemetry = self.love_manager_message.get_message_category(
+            category="telemetry", data=self.sample_telemetry
+        )
+        telemetry_data = json.loads(telemetry_json)
+
+        self.assertEqual(list(telemetry_data), list(telemetry))
+        telemetry_data.pop("producer_snd")
+        telemetry.pop("producer_snd")
+        self.assertEqual(telemetry_data, telemetry)
+
+    def test_add_metadata_resets_envelope(self):
+        self.love_manager_message.get_message_category_as_json(
+            category="telemetry", data=self.sample_telemetry
+        )
+
+        self.love_manager_message.add_metadata(new_metadata="test_value")
+
+        _, suffix = self.love_manager_message.get_message_category_envelope("telemetry")
+
+        self.assertIn("new_metadata", suffix)
+
     def assert_initial_state_message(self, initial_state_message, component_name):
         for key, value in [
             ("option", "subscribe"),
@@ -0,0 +1,460 @@
+# This file is part of LOVE-producer.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by Inria Chile and
+# the LSST Project (https://www.lsst.org).
+#
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership and dependencies.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+import json
+import unittest
+
+from love.producer import (
+    BackpressureMonitor,
+    DropPolicy,
+    InitialDataScheduler,
+    LoveManagerMessage,
+    MessageBatcher,
+    MessagePriority,
+    MsgpackMessageEncoder,
+    SendQueue,
+    get_message_priority,
+    tag_message,
+)
+
+
+class TestSendQueue(unittest.IsolatedAsyncioTestCase):
+    async def test_priority_order(self):
+        send_queue = SendQueue()
+
+        send_queue.put_nowait(tag_message("telemetry", MessagePriority.TELEMETRY))
+        send_queue.put_nowait(tag_message("event1", MessagePriority.EVENT))
+        send_queue.put_nowait("heartbeat")
+        send_queue.put_nowait(tag_message("event2", MessagePriority.EVENT))
+
+        self.assertEqual(len(send_queue), 4)
+
+        messages = [await send_queue.get() for _ in range(4)]
+
+        self.assertEqual(messages, ["heartbeat", "event1", "event2", "telemetry"])
+
+        stats = send_queue.get_stats()
+
+        self.assertEqual(stats["event"]["enqueued"], 2)
+        self.assertEqual(stats["event"]["dequeued"], 2)
+        self.assertEqual(stats["telemetry"]["depth"], 0)
+
+    async def test_get_waits_for_message(self):
+        send_queue = SendQueue()
+
+        get_task = asyncio.create_task(send_queue.get())
+        await asyncio.sleep(0.1)
+
+        self.assertFalse(get_task.done())
+
+        send_queue.put_nowait(b"binary")
+
+        self.assertEqual(await asyncio.wait_for(get_task, timeout=1.0), b"binary")
+
+    async def test_drop_policies(self):
+        send_queue = SendQueue(
+            capacities={MessagePriority.TELEMETRY: 2, MessagePriority.EVENT: 2},
+            drop_policies={MessagePriority.EVENT: DropPolicy.DROP_NEWEST},
+        )
+
+        for i in range(3):
+            self.assertTrue(
+                send_queue.put_nowait(
+                    tag_message(f"telemetry{i}", MessagePriority.TELEMETRY)
+                )
+            )
+            send_queue.put_nowait(tag_message(f"event{i}", MessagePriority.EVENT))
+
+        self.assertEqual(
+            send_queue.depth,
+            {
+                MessagePriority.HIGH: 0,
+                MessagePriority.EVENT: 2,
+                MessagePriority.TELEMETRY: 2,
+            },
+        )
+        self.assertEqual(send_queue.dropped[MessagePriority.TELEMETRY], 1)
+        self.assertEqual(send_queue.dropped[MessagePriority.EVENT], 1)
+
+        messages = [await send_queue.get() for _ in range(4)]
+
+        self.assertEqual(messages, ["event0", "event1", "telemetry1", "telemetry2"])
+
+    async def test_drop_policies_must_deliver(self):
+        for drop_policy in DropPolicy:
+            with self.subTest(drop_policy=drop_policy):
+                send_queue = SendQueue(
+                    capacities={MessagePriority.EVENT: 2},
+                    drop_policies={MessagePriority.EVENT: drop_policy},
+                )
+
+                send_queue.put_nowait(
+                    tag_message("alarm0", MessagePriority.EVENT, must_deliver=True)
+                )
+                send_queue.put_nowait(tag_message("event0", MessagePriority.EVENT))
+
+                # The pending message that is not flagged is dropped.
+                self.assertTrue(
+                    send_queue.put_nowait(
+                        tag_message("alarm1", MessagePriority.EVENT, must_deliver=True)
+                    )
+                )
+                # The class is full of must deliver messages.
+                self.assertFalse(
+                    send_queue.put_nowait(tag_message("event1", MessagePriority.EVENT))
+                )
+                self.assertFalse(
+                    send_queue.put_nowait(
+                        tag_message("alarm2", MessagePriority.EVENT, must_deliver=True)
+                    )
+                )
+
+                self.assertEqual(send_queue.dropped[MessagePriority.EVENT], 2)
+                self.assertEqual(send_queue.rejected[MessagePriority.EVENT], 1)
+                self.assertTrue(send_queue.is_full(MessagePriority.EVENT))
+                self.assertEqual(
+                    [await send_queue.get() for _ in range(2)], ["alarm0", "alarm1"]
+                )
+                self.assertEqual(send_queue.nbytes, 0)
+
+    async def test_conflate(self):
+        send_queue = SendQueue()
+
+        for i in range(3):
+            send_queue.put_nowait(
+                tag_message(
+                    f"scalars{i}",
+                    MessagePriority.TELEMETRY,
+                    stream=("Test", 1, "tel_scalars"),
+                )
+            )
+            send_queue.put_nowait(
+                tag_message(
+                    f"arrays{i}",
+                    MessagePriority.TELEMETRY,
+                    stream=("Test", 1, "tel_arrays"),
+                )
+            )
+            send_queue.put_nowait(
+                tag_message(
+                    f"logMessage{i}",
+                    MessagePriority.EVENT,
+                    stream=("Test", 1, "evt_logMessage"),
+                    must_deliver=True,
+                )
+            )
+
+        self.assertEqual(len(send_queue), 5)
+        self.assertEqual(send_queue.conflated[MessagePriority.TELEMETRY], 4)
+
+        messages = [await send_queue.get() for _ in range(5)]
+
+        self.assertEqual(
+            messages,
+            ["logMessage0", "logMessage1", "logMessage2", "scalars2", "arrays2"],
+        )
+
+        send_queue.put_nowait(
+            tag_message(
+                "scalars3", MessagePriority.TELEMETRY, stream=("Test", 1, "tel_scalars")
+            )
+        )
+
+        self.assertEqual(await send_queue.get(), "scalars3")
+
+    async def test_no_conflate(self):
+        send_queue = SendQueue(conflate=False)
+
+        for i in range(3):
+            send_queue.put_nowait(
+                tag_message(
+                    f"scalars{i}",
+                    MessagePriority.TELEMETRY,
+                    stream=("Test", 1, "tel_scalars"),
+                )
+            )
+
+        self.assertEqual(len(send_queue), 3)
+
+    async def test_nbytes(self):
+        send_queue = SendQueue()
+        stream = ("Test", 1, "tel_scalars")
+
+        send_queue.put_nowait(tag_message("a" * 10, MessagePriority.TELEMETRY, stream))
+        send_queue.put_nowait(tag_message("b" * 20, MessagePriority.TELEMETRY, stream))
+        send_queue.put_nowait(tag_message("c" * 5, MessagePriority.EVENT))
+
+        self.assertEqual(send_queue.nbytes, 25)
+
+        await send_queue.get()
+
+        self.assertEqual(send_queue.nbytes, 20)
+
+        send_queue.clear()
+
+        self.assertEqual(send_queue.nbytes, 0)
+
+    def test_clear_keep_must_deliver(self):
+        send_queue = SendQueue()
+
+        messages = [
+            tag_message(
+                "scalars", MessagePriority.TELEMETRY, ("Test", 1, "tel_scalars")
+            ),
+            tag_message("state0", MessagePriority.EVENT, must_deliver=True),
+            tag_message("event", MessagePriority.EVENT),
+            tag_message("state1", MessagePriority.EVENT, must_deliver=True),
+        ]
+        for message in messages:
+            send_queue.put_nowait(message)
+
+        send_queue.clear(keep_must_deliver=True)
+
+        self.assertEqual(send_queue.nbytes, len("state0") + len("state1"))
+        self.assertEqual(send_queue.dropped[MessagePriority.TELEMETRY], 1)
+        self.assertEqual(send_queue.dropped[MessagePriority.EVENT], 1)
+        self.assertEqual(send_queue.get_nowait(), "state0")
+        self.assertEqual(send_queue.get_nowait(), "state1")
+        self.assertIsNone(send_queue.get_nowait())
+
+        # The stream of the dropped message is no longer pending.
+        send_queue.put_nowait(messages[0])
+        self.assertEqual(len(send_queue), 1)
+
+    def test_message_priority(self):
+        love_manager_message = LoveManagerMessage("Test")
+
+        for category, priority in (
+            ("telemetry", MessagePriority.TELEMETRY),
+            ("event", MessagePriority.EVENT),
+            ("schema", MessagePriority.HIGH),
+        ):
+            with self.subTest(category=category):
+                message = love_manager_message.get_message_category_as_json(
+                    category=category, data=dict(value=1)
+                )
+                self.assertEqual(get_message_priority(message), priority)
+
+        message = love_manager_message.get_message_category_as_json(
+            category="event", data=dict(value=1), priority=MessagePriority.HIGH
+        )
+
+        self.assertEqual(get_message_priority(message), MessagePriority.HIGH)
+
+
+class TestBackpressureMonitor(unittest.TestCase):
+    def test_from_config(self):
+        backpressure = BackpressureMonitor.from_config("1000:100")
+
+        self.assertEqual(backpressure.high_watermark, 1000)
+        self.assertEqual(backpressure.low_watermark, 100)
+
+        backpressure = BackpressureMonitor.from_config("")
+
+        self.assertEqual(
+            backpressure.high_watermark, BackpressureMonitor.default_high_watermark
+        )
+
+        with self.assertRaises(ValueError):
+            BackpressureMonitor.from_config("100:1000")
+
+    def test_update(self):
+        backpressure = BackpressureMonitor(high_watermark=1000, low_watermark=100)
+        states = []
+        backpressure.add_callback(states.append)
+
+        self.assertFalse(backpressure.update(999))
+        self.assertFalse(backpressure.active)
+        self.assertEqual(backpressure.get_period(2.0), 2.0)
+
+        self.assertTrue(backpressure.update(1000))
+        self.assertTrue(backpressure.active)
+        self.assertEqual(backpressure.get_period(2.0), 2.0 * backpressure.period_factor)
+
+        # Hysteresis: stays active until the low watermark is reached.
+        self.assertFalse(backpressure.update(500))
+        self.assertTrue(backpressure.active)
+
+        self.assertTrue(backpressure.update(100))
+        self.assertFalse(backpressure.active)
+
+        self.assertEqual(states, [True, False])
+        self.assertEqual(backpressure.activations, 1)
+        self.assertEqual(backpressure.max_pending_bytes, 1000)
+
+
+class TestInitialDataScheduler(unittest.IsolatedAsyncioTestCase):
+    def test_order(self):
+        scheduler = InitialDataScheduler()
+
+        messages = scheduler.order(
+            [
+                ("evt_configurationsAvailable", "configurationsAvailable"),
+                ("evt_logLevel", "logLevel"),
+                ("evt_errorCode", "errorCode"),
+                ("_stateStream", "stateStream"),
+                ("evt_summaryState", "summaryState"),
+            ]
+        )
+
+        self.assertEqual(
+            messages,
+            [
+                "summaryState",
+                "errorCode",
+                "logLevel",
+                "stateStream",
+                "configurationsAvailable",
+            ],
+        )
+
+    async def test_send_paced(self):
+        scheduler = InitialDataScheduler(bytes_per_second=1000.0)
+        sent = []
+
+        async def send_message(message):
+            sent.append(message)
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        await scheduler.send(["x" * 100] * 5, send_message)
+
+        self.assertEqual(len(sent), 5)
+        self.assertEqual(scheduler.bytes_sent, 500)
+        self.assertGreaterEqual(loop.time() - start, 0.45)
+
+    async def test_send_waits_backpressure(self):
+        backpressure = BackpressureMonitor(high_watermark=10, low_watermark=0)
+        backpressure.update(10)
+        scheduler = InitialDataScheduler(backpressure=backpressure)
+        sent = []
+
+        async def send_message(message):
+            sent.append(message)
+
+        send_task = asyncio.create_task(scheduler.send(["message"], send_message))
+        await asyncio.sleep(0.2)
+
+        self.assertEqual(sent, [])
+
+        backpressure.update(0)
+        await asyncio.wait_for(send_task, timeout=1.0)
+
+        self.assertEqual(sent, ["message"])
+
+
+class TestMessageBatcher(unittest.TestCase):
+    def setUp(self):
+        self.love_manager_message = LoveManagerMessage("Test")
+        self.batcher = MessageBatcher.from_config("telemetry:10:1000,event:5")
+
+    def make_message(self, category, value):
+        return self.love_manager_message.get_message_category_as_json(
+            category=category, data=dict(value=value)
+        )
+
+    def test_from_config(self):
+        self.assertEqual(self.batcher.windows, dict(telemetry=0.01, event=0.005))
+        self.assertEqual(self.batcher.byte_budgets, dict(telemetry=1000))
+
+    def test_batch(self):
+        self.assertEqual(self.batcher.add(self.make_message("telemetry", 1), 0.0), [])
+        self.assertEqual(self.batcher.add(self.make_message("telemetry", 2), 0.005), [])
+        self.assertEqual(self.batcher.add(self.make_message("event", 3), 0.005), [])
+
+        self.assertAlmostEqual(self.batcher.next_deadline, 0.01)
+        self.assertEqual(self.batcher.pop_expired(0.009), [])
+
+        ready_messages = self.batcher.pop_expired(0.011)
+
+        self.assertEqual(len(ready_messages), 2)
+
+        messages = {
+            message["category"]: message
+            for message in (json.loads(message) for message in ready_messages)
+        }
+
+        self.assertEqual(messages["telemetry"]["data"], [dict(value=1), dict(value=2)])
+        self.assertEqual(messages["event"]["data"], [dict(value=3)])
+        self.assertIsNone(self.batcher.next_deadline)
+
+    def test_batch_keeps_tags(self):
+        first_message = self.make_message("telemetry", 1)
+        self.batcher.add(first_message, 0.0)
+        self.batcher.add(self.make_message("telemetry", 2), 0.0)
+
+        (message,) = self.batcher.pop_all()
+
+        self.assertEqual(get_message_priority(message), MessagePriority.TELEMETRY)
+        self.assertEqual(
+            json.loads(message)["producer_snd"],
+            json.loads(first_message)["producer_snd"],
+        )
+
+    def test_must_deliver_not_batched(self):
+        message = self.love_manager_message.get_message_category_as_json(
+            category="event", data=dict(value=1), must_deliver=True
+        )
+
+        self.assertEqual(self.batcher.add(message, 0.0), [message])
+        self.assertIsNone(self.batcher.next_deadline)
+
+    def test_not_batchable(self):
+        message = self.make_message("schema", 1)
+
+        self.assertEqual(self.batcher.add(message, 0.0), [message])
+        self.assertEqual(self.batcher.add("heartbeat", 0.0), ["heartbeat"])
+
+    def test_byte_budget(self):
+        value = "x" * 400
+
+        self.assertEqual(
+            self.batcher.add(self.make_message("telemetry", value), 0.0), []
+        )
+        self.assertEqual(
+            self.batcher.add(self.make_message("telemetry", value), 0.0), []
+        )
+
+        ready_messages = self.batcher.add(self.make_message("telemetry", value), 0.0)
+
+        self.assertEqual(len(ready_messages), 1)
+        self.assertEqual(len(json.loads(ready_messages[0])["data"]), 2)
+        self.assertEqual(len(self.batcher.pop_all()), 1)
+
+    @unittest.skipIf(not MsgpackMessageEncoder.is_available(), "msgpack not installed")
+    def test_batch_msgpack(self):
+        encoder = MsgpackMessageEncoder()
+        self.love_manager_message.set_encoder(encoder)
+
+        self.batcher.add(self.make_message("telemetry", 1), 0.0)
+        self.batcher.add(self.make_message("telemetry", 2), 0.0)
+
+        (message,) = self.batcher.pop_all()
+
+        self.assertEqual(encoder.loads(message)["data"], [dict(value=1), dict(value=2)])
+
+
+if __name__ == "__main__":
+    unittest.main()
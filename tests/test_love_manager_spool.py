@@ -0,0 +1,103 @@
+# This file is part of LOVE-producer.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by Inria Chile and
+# the LSST Project (https://www.lsst.org).
+#
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership and dependencies.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import os
+import tempfile
+import unittest
+
+from love.producer import MessageSpool
+
+
+class TestMessageSpool(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "love_producer.spool")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_append_pop(self):
+        spool = MessageSpool(self.path, size=1024)
+
+        messages = ['{"value": 1}', b"\x81\xa5value\x02", '{"value": "é"}']
+        for message in messages:
+            self.assertTrue(spool.append(message))
+
+        self.assertEqual(len(spool), 3)
+        self.assertEqual([spool.pop() for _ in range(3)], messages)
+        self.assertIsNone(spool.pop())
+        self.assertEqual(spool.nbytes, 0)
+
+        spool.close()
+
+    def test_wrap_around_and_drop_oldest(self):
+        spool = MessageSpool(self.path, size=MessageSpool._header.size + 100)
+
+        # Each record takes 25 bytes, 4 fit in the spool.
+        for i in range(10):
+            self.assertTrue(spool.append(f"message{i:013d}"))
+
+        self.assertEqual(len(spool), 4)
+        self.assertEqual(spool.dropped, 6)
+        self.assertEqual(
+            [spool.pop() for _ in range(4)],
+            [f"message{i:013d}" for i in range(6, 10)],
+        )
+
+        # Records that do not align with the end of the buffer wrap around.
+        for i in range(3):
+            self.assertTrue(spool.append(f"wrapped{i:020d}"))
+
+        self.assertEqual(
+            [spool.pop() for _ in range(3)],
+            [f"wrapped{i:020d}" for i in range(3)],
+        )
+
+        self.assertFalse(spool.append("x" * 100))
+
+        spool.close()
+
+    def test_reopen(self):
+        spool = MessageSpool(self.path, size=1024)
+        spool.append("message0")
+        spool.append("message1")
+        spool.pop()
+        spool.close()
+
+        spool = MessageSpool(self.path, size=1024)
+
+        self.assertEqual(len(spool), 1)
+        self.assertEqual(spool.pop(), "message1")
+
+        spool.close()
+
+        # A different size discards the previous spool.
+        spool = MessageSpool(self.path, size=2048)
+
+        self.assertEqual(len(spool), 0)
+
+        spool.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
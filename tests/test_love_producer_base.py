@@ -263,6 +263,75 @@ class TestLoveProducerBase(unittest.IsolatedAsyncioTestCase):
             self.sample_summary_state, json.loads(self.messages_received[0])["data"][0]
         )
 
+    async def test_stream_sequences(self):
+        self.setup_for_data_handling_test(salindex=1)
+        self.producer.stream_sequences = True
+
+        for _ in range(2):
+            await self.producer.handle_asynchronous_data_callback(
+                self.get_random_data(name="random")
+            )
+
+        self.assertEqual(
+            [
+                json.loads(message)["data"][0]["sequence"]
+                for message in self.messages_received
+            ],
+            [1, 2],
+        )
+
+        stream_id = self.producer.get_stream_id("random")
+
+        self.assertEqual(stream_id, ("Test", 1, "random"))
+
+        self.messages_received.clear()
+
+        self.assertEqual(await self.producer.send_missed_data({stream_id: 2}), 0)
+        self.assertEqual(await self.producer.send_missed_data({stream_id: 1}), 1)
+        self.assertEqual(await self.producer.send_missed_data(dict()), 1)
+
+        # Samples sent again keep their sequence number.
+        self.assertEqual(
+            [
+                json.loads(message)["data"][0]["sequence"]
+                for message in self.messages_received
+            ],
+            [2, 2],
+        )
+
+    async def test_lazy_data(self):
+        self.setup_for_data_handling_test()
+        self.producer.lazy_data = {"random"}
+        self.producer.lazy_data_period = 0.1
+
+        samples = [self.get_random_data(name="random") for _ in range(3)]
+
+        for sample in samples:
+            await self.producer.handle_asynchronous_data_callback(sample)
+
+        # Samples are stored as received until they are sent or requested.
+        self.assertIs(
+            self.producer._asynchronous_data_last_samples["random"], samples[-1]
+        )
+        self.assertEqual(len(self.messages_received), 0)
+
+        await asyncio.sleep(self.producer.lazy_data_period * 3)
+
+        self.assertEqual(
+            [json.loads(message)["data"][0] for message in self.messages_received],
+            [samples[-1]],
+        )
+
+        await self.producer.handle_asynchronous_data_callback(samples[0])
+
+        self.assertEqual(
+            json.loads(self.producer.retrieve_one_sample("random")), samples[0]
+        )
+
+        await self.producer.close()
+
+        self.assertEqual(len(self.messages_received), 1)
+
     async def test_store_and_retrieve_samples(self):
         self.producer.store_samples(summaryState=self.sample_summary_state)
 
@@ -270,6 +339,32 @@ class TestLoveProducerBase(unittest.IsolatedAsyncioTestCase):
 
         self.assertEqual(sample_summary_state[0], self.sample_summary_state)
 
+    async def test_retrieve_one_encoded_sample(self):
+        self.setup_for_data_handling_test()
+        self.producer.store_samples(summaryState=self.sample_summary_state)
+
+        encoded_sample = self.producer.retrieve_one_encoded_sample("summaryState")
+
+        self.assertEqual(json.loads(encoded_sample), self.sample_summary_state)
+        self.assertIs(
+            self.producer.retrieve_one_encoded_sample("summaryState"), encoded_sample
+        )
+
+        await self.producer.send_initial_data()
+
+        self.assertEqual(
+            json.loads(self.messages_received[0])["data"][0],
+            self.sample_summary_state,
+        )
+
+        new_summary_state = dict(summaryState=2)
+        self.producer.store_samples(summaryState=new_summary_state)
+
+        self.assertEqual(
+            json.loads(self.producer.retrieve_one_encoded_sample("summaryState")),
+            new_summary_state,
+        )
+
     async def assert_monitored_data(self, name, minimum_samples):
         await self.wait_for_number_of_samples(number_of_samples=minimum_samples)
 
@@ -27,7 +27,7 @@ import logging
 import os
 import unittest
 
-from love.producer import LoveProducerCSC
+from love.producer import LoveProducerCSC, get_topic_attribute_names
 from love.producer.test_utils import cancel_task
 from lsst.ts import salobj, utils
 
@@ -119,6 +119,67 @@ class TestLoveProducerCSC(unittest.IsolatedAsyncioTestCase):
             self.producer.get_topic_attribute_name(rev_code), "evt_heartbeat"
         )
 
+    async def test_topic_shards(self):
+        topic_names = get_topic_attribute_names(self.csc)
+
+        self.assertEqual(
+            set(topic_names),
+            {name for name, _ in self.producer.get_event_attribute_names_and_category()}
+            | {
+                name
+                for name, _ in self.producer.get_telemetry_attribute_names_and_category()
+            },
+        )
+
+        shard_topic_names = []
+
+        for index in range(2):
+            producer = LoveProducerCSC(
+                csc=self.csc,
+                salindex=self.salindex,
+                domain=self.domain,
+                topic_shard=(index, 2),
+            )
+            producer.send_message = self.async_send_message
+
+            try:
+                await producer.start_task
+
+                self.assertEqual(
+                    producer._heartbeat_monitor_task is not None, index == 0
+                )
+                self.assertEqual(
+                    "evt_summaryState" in producer.asynchronous_data, index == 0
+                )
+
+                shard_topic_names.append(
+                    set(producer.periodic_data) | set(producer.asynchronous_data)
+                )
+            finally:
+                await producer.close()
+
+        self.assertEqual(shard_topic_names[0] & shard_topic_names[1], set())
+        self.assertEqual(shard_topic_names[0] | shard_topic_names[1], set(topic_names))
+
+    async def test_periodic_keepalive(self):
+        self.producer.periodic_keepalive = 0.5
+
+        data = self.producer.remote.tel_scalars.DataType()
+        data.private_revCode = self.producer.remote.tel_scalars.rev_code
+        data.private_seqNum = 1
+
+        self.assertIsNotNone(self.producer._convert_periodic_data_to_json(data)[1])
+        self.assertIsNone(self.producer._convert_periodic_data_to_json(data)[1])
+
+        data.private_seqNum = 2
+
+        self.assertIsNotNone(self.producer._convert_periodic_data_to_json(data)[1])
+        self.assertIsNone(self.producer._convert_periodic_data_to_json(data)[1])
+
+        await asyncio.sleep(self.producer.periodic_keepalive)
+
+        self.assertIsNotNone(self.producer._convert_periodic_data_to_json(data)[1])
+
     async def test_summary_state(self):
         async with self.setup_test_csc():
             self.standard_timeout = 10
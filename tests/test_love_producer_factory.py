@@ -43,6 +43,10 @@ class TestLoveProducerFactory(unittest.IsolatedAsyncioTestCase):
         self.assertIsInstance(love_producer, LoveProducerBase)
         self.assertEqual(component_name, love_producer.component_name)
 
+    async def test_get_love_producer_from_name_topic_shard_not_csc(self):
+        with self.assertRaises(RuntimeError):
+            LoveProducerFactory.get_love_producer_from_name("UnitTest1@0/2")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,196 @@
+# This file is part of LOVE-producer.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by Inria Chile and
+# the LSST Project (https://www.lsst.org).
+#
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership and dependencies.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import asyncio
+import logging
+import os
+import tempfile
+import time
+import unittest
+import unittest.mock
+
+from love.producer import (
+    LoveManagerClient,
+    LoveProducerSupervisor,
+    set_worker_spool_path,
+)
+
+
+def report_and_exit_worker(
+    index, components, log_level, log_queue, stats_queue, stats_interval, kwargs
+):
+    stats_queue.put(
+        dict(
+            worker=index,
+            pid=0,
+            time=time.time(),
+            cpu_time=0.0,
+            messages_produced={component: 0 for component in components},
+            send_queue=dict(nbytes=0),
+        )
+    )
+
+
+def report_spool_path_worker(
+    index, components, log_level, log_queue, stats_queue, stats_interval, kwargs
+):
+    set_worker_spool_path(index)
+    love_manager_client = LoveManagerClient(logging.getLogger())
+    stats_queue.put(dict(worker=index, spool_path=love_manager_client.spool.path))
+
+
+class TestLoveProducerSupervisor(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.components = ["MTM1M3", "MTMount", "ATDome", "ATMCS", "Test:1"]
+        self.supervisor = LoveProducerSupervisor(
+            components=self.components,
+            workers=2,
+            worker=report_and_exit_worker,
+        )
+
+    def test_workers(self):
+        self.assertEqual(
+            LoveProducerSupervisor(
+                components=["ATDome"], workers=4, worker=report_and_exit_worker
+            ).workers,
+            1,
+        )
+
+        with self.assertRaises(RuntimeError):
+            LoveProducerSupervisor(
+                components=[], workers=4, worker=report_and_exit_worker
+            )
+
+    def test_get_shards(self):
+        self.assertEqual(
+            self.supervisor.shards,
+            [["MTM1M3", "ATDome", "Test:1"], ["MTMount", "ATMCS"]],
+        )
+
+        shards = self.supervisor.get_shards(
+            dict(MTM1M3=0.8, MTMount=0.5, ATDome=0.1, ATMCS=0.2, **{"Test:1": 0.1})
+        )
+
+        self.assertEqual(shards, [["MTM1M3"], ["MTMount", "ATMCS", "ATDome", "Test:1"]])
+        self.assertEqual(sorted(sum(shards, [])), sorted(self.components))
+
+    def test_handle_stats(self):
+        stats = dict(
+            worker=0,
+            pid=1,
+            time=10.0,
+            cpu_time=1.0,
+            messages_produced=dict(MTM1M3=0, ATDome=0, **{"Test:1": 0}),
+        )
+        self.supervisor.handle_stats(stats)
+
+        self.assertEqual(self.supervisor.measured_loads, dict())
+
+        self.supervisor.handle_stats(
+            dict(
+                stats,
+                time=20.0,
+                cpu_time=9.0,
+                messages_produced=dict(MTM1M3=300, ATDome=100, **{"Test:1": 0}),
+            )
+        )
+
+        self.assertAlmostEqual(self.supervisor.worker_loads[0], 0.8)
+        self.assertAlmostEqual(self.supervisor.measured_loads["MTM1M3"], 0.6)
+        self.assertAlmostEqual(self.supervisor.measured_loads["ATDome"], 0.2)
+        self.assertAlmostEqual(self.supervisor.measured_loads["Test:1"], 0.0)
+
+        # A restarted worker (new pid) starts a new measurement.
+        self.supervisor.handle_stats(dict(stats, pid=2, time=30.0))
+
+        self.assertAlmostEqual(self.supervisor.measured_loads["MTM1M3"], 0.6)
+
+    def test_rebalance(self):
+        self.supervisor.measured_loads = dict(
+            MTM1M3=0.9, MTMount=0.1, ATDome=0.8, ATMCS=0.1, **{"Test:1": 0.1}
+        )
+
+        changed = self.supervisor.rebalance()
+
+        self.assertEqual(sorted(changed), [0, 1])
+        self.assertEqual(
+            self.supervisor.get_shard_loads(
+                self.supervisor.shards, self.supervisor.get_component_loads()
+            ),
+            [1.0, 1.0],
+        )
+
+        # Balanced enough, nothing to do.
+        self.assertEqual(self.supervisor.rebalance(), [])
+
+    async def test_restart_workers(self):
+        self.supervisor.restart_wait_time = 0.0
+
+        for index in range(self.supervisor.workers):
+            self.supervisor.start_worker(index)
+
+        try:
+            for process in self.supervisor.processes:
+                await asyncio.get_running_loop().run_in_executor(
+                    None, process.join, 30.0
+                )
+
+            self.supervisor.check_workers()
+            self.supervisor.check_workers()
+
+            self.assertEqual(self.supervisor.restarts, [1, 1])
+
+            await asyncio.sleep(1.0)
+            self.supervisor.read_stats()
+
+            self.assertEqual(set(self.supervisor.worker_stats), {0, 1})
+        finally:
+            await self.supervisor.close()
+
+    async def test_worker_spool_path(self):
+        self.supervisor.worker = report_spool_path_worker
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            spool_path = os.path.join(temp_dir, "love_producer.spool")
+
+            with unittest.mock.patch.dict(
+                os.environ, LOVE_PRODUCER_SPOOL_PATH=spool_path
+            ):
+                for index in range(self.supervisor.workers):
+                    self.supervisor.start_worker(index)
+
+            try:
+                spool_paths = dict()
+                for _ in range(self.supervisor.workers):
+                    stats = await asyncio.get_running_loop().run_in_executor(
+                        None, self.supervisor.stats_queue.get, True, 30.0
+                    )
+                    spool_paths[stats["worker"]] = stats["spool_path"]
+            finally:
+                await self.supervisor.close()
+
+            self.assertEqual(spool_paths, {0: f"{spool_path}.0", 1: f"{spool_path}.1"})
+            self.assertTrue(all(os.path.exists(path) for path in spool_paths.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
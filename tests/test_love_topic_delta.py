@@ -0,0 +1,168 @@
+# This file is part of LOVE-producer.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by Inria Chile and
+# the LSST Project (https://www.lsst.org).
+#
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership and dependencies.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import types
+import unittest
+
+import numpy as np
+from love.producer import TopicConverter, TopicDeltaEncoder, get_deadbands
+
+
+class TestTopicDeltaEncoder(unittest.TestCase):
+    def setUp(self):
+        self.converter = TopicConverter(
+            csc="Test",
+            salindex=1,
+            topic_name="scalars",
+            fields=[
+                ("int0", 0, "Int", ""),
+                ("double0", 0.0, "Float", "deg"),
+                ("arrayDouble", np.zeros(3), "Array<Float>", "s"),
+            ],
+            as_list=False,
+        )
+        self.sample = types.SimpleNamespace(
+            int0=1, double0=float("nan"), arrayDouble=np.arange(3.0)
+        )
+
+    def test_encode(self):
+        delta_encoder = TopicDeltaEncoder(self.converter, keyframe_interval=3)
+
+        keyframe = delta_encoder.encode(self.sample)
+
+        self.assertTrue(keyframe["keyframe"])
+        self.assertEqual(keyframe["sequence"], 1)
+        self.assertEqual(
+            set(keyframe["data"]["scalars"]), {"int0", "double0", "arrayDouble"}
+        )
+
+        self.assertIsNone(delta_encoder.encode(self.sample))
+
+        self.sample.arrayDouble[1] = 10.0
+        delta = delta_encoder.encode(self.sample)
+
+        self.assertFalse(delta["keyframe"])
+        self.assertEqual(delta["sequence"], 2)
+        self.assertEqual(list(delta["data"]["scalars"]), ["arrayDouble"])
+        self.assertEqual(delta["data"]["scalars"]["arrayDouble"]["units"], "s")
+
+        keyframe = delta_encoder.encode(self.sample)
+
+        self.assertTrue(keyframe["keyframe"])
+        self.assertEqual(keyframe["sequence"], 3)
+
+    def test_encode_values_only(self):
+        delta_encoder = TopicDeltaEncoder(
+            self.converter, keyframe_interval=10, values_only=True
+        )
+
+        delta_encoder.encode(self.sample)
+        self.sample.int0 = 2
+        delta = delta_encoder.encode(self.sample)
+
+        self.assertEqual(delta["data"]["scalars"], dict(int0=2))
+
+    def test_reset(self):
+        delta_encoder = TopicDeltaEncoder(self.converter, keyframe_interval=10)
+
+        delta_encoder.encode(self.sample)
+        delta_encoder.reset()
+
+        keyframe = delta_encoder.encode(self.sample)
+
+        self.assertTrue(keyframe["keyframe"])
+        self.assertEqual(keyframe["sequence"], 2)
+
+    def test_encode_deadband(self):
+        delta_encoder = TopicDeltaEncoder(
+            self.converter,
+            keyframe_interval=10,
+            deadbands=dict(double0=(0.5, 0.0), arrayDouble=(0.0, 0.1)),
+        )
+
+        self.sample.double0 = 1.0
+        delta_encoder.encode(self.sample)
+
+        self.sample.double0 = 1.4
+        self.sample.arrayDouble = self.sample.arrayDouble * 1.05
+
+        self.assertIsNone(delta_encoder.encode(self.sample))
+
+        # Changes accumulate against the last sent value.
+        self.sample.double0 = 1.6
+        delta = delta_encoder.encode(self.sample)
+
+        self.assertEqual(list(delta["data"]["scalars"]), ["double0"])
+
+        self.sample.int0 = 2
+        delta = delta_encoder.encode(self.sample)
+
+        self.assertEqual(list(delta["data"]["scalars"]), ["int0"])
+
+    def test_encode_deadband_full_samples(self):
+        delta_encoder = TopicDeltaEncoder(
+            self.converter,
+            keyframe_interval=10,
+            deadbands=dict(double0=(0.5, 0.0)),
+            deltas=False,
+        )
+
+        self.sample.double0 = 1.0
+        delta_encoder.encode(self.sample)
+
+        self.sample.double0 = 1.4
+        self.assertIsNone(delta_encoder.encode(self.sample))
+
+        self.sample.double0 = 2.0
+        payload = delta_encoder.encode(self.sample)
+
+        self.assertNotIn("sequence", payload)
+        self.assertEqual(
+            set(payload["data"]["scalars"]), {"int0", "double0", "arrayDouble"}
+        )
+
+    def test_get_deadbands(self):
+        config = {
+            "Test": {
+                "default": {"absolute": 1.0},
+                "tel_scalars": {"arrayDouble": {"relative": 0.1}},
+            },
+            "Test:2": {"tel_scalars": {"default": {"absolute": 2.0}}},
+        }
+
+        self.assertEqual(
+            get_deadbands(config, "Test", 1, "tel_scalars", self.converter.fields),
+            dict(double0=(1.0, 0.0), arrayDouble=(0.0, 0.1)),
+        )
+        self.assertEqual(
+            get_deadbands(config, "Test", 2, "tel_scalars", self.converter.fields),
+            dict(double0=(2.0, 0.0), arrayDouble=(2.0, 0.0)),
+        )
+        self.assertEqual(
+            get_deadbands(config, "Other", 1, "tel_scalars", self.converter.fields),
+            dict(),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
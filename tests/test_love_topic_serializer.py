@@ -0,0 +1,201 @@
+# This file is part of LOVE-producer.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by Inria Chile and
+# the LSST Project (https://www.lsst.org).
+#
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership and dependencies.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import itertools
+import json
+import types
+import unittest
+
+import numpy as np
+from love.producer import (
+    TopicConverter,
+    TopicSerializer,
+    available_message_encoders,
+    get_message_encoder,
+)
+from love.producer.producer_utils import get_data_type
+
+
+class TestTopicSerializer(unittest.TestCase):
+    def setUp(self):
+        self.encoder = get_message_encoder("json")
+        self.default_sample = types.SimpleNamespace(
+            boolean0=False,
+            int0=0,
+            double0=0.0,
+            string0="",
+            arrayInt=np.zeros(3, dtype=int),
+            arrayDouble=[0.0, 0.0],
+        )
+        self.sample = types.SimpleNamespace(
+            boolean0=True,
+            int0=np.int32(-5),
+            double0=1.0 / 3.0,
+            string0='A "quoted" string\nwith a new line and a ñ.',
+            arrayInt=np.arange(3),
+            arrayDouble=[float("nan"), 1.5e-7],
+        )
+        self.units = dict(double0="deg", arrayDouble="µs")
+
+    def make_fields(self):
+        return [
+            (
+                name,
+                value,
+                get_data_type(value),
+                self.units.get(name, ""),
+            )
+            for name, value in vars(self.default_sample).items()
+        ]
+
+    def make_serializer(self, as_list):
+        return TopicSerializer(
+            csc="Test",
+            salindex=1,
+            topic_name="scalars",
+            fields=self.make_fields(),
+            as_list=as_list,
+        )
+
+    def make_payload(self, as_list):
+        data_stream = {
+            name: dict(
+                value=value,
+                dataType=get_data_type(getattr(self.default_sample, name)),
+                units=self.units.get(name, ""),
+            )
+            for name, value in vars(self.sample).items()
+        }
+        return dict(
+            csc="Test",
+            salindex=1,
+            data=dict(scalars=[data_stream] if as_list else data_stream),
+        )
+
+    def test_serialize(self):
+        for name, as_list in itertools.product(
+            available_message_encoders, (True, False)
+        ):
+            if not available_message_encoders[name].is_available():
+                continue
+            with self.subTest(encoder=name, as_list=as_list):
+                encoder = get_message_encoder(name)
+                serializer = self.make_serializer(as_list=as_list)
+
+                self.assertEqual(
+                    serializer.serialize(self.sample, encoder),
+                    encoder.dumps(self.make_payload(as_list=as_list)),
+                )
+
+    def test_serialize_values_only(self):
+        serializer = TopicSerializer(
+            csc="Test",
+            salindex=1,
+            topic_name="scalars",
+            fields=self.make_fields(),
+            as_list=False,
+            values_only=True,
+        )
+
+        payload = json.loads(serializer.serialize(self.sample, self.encoder))
+
+        self.assertEqual(payload["data"]["scalars"]["int0"], -5)
+        self.assertEqual(payload["data"]["scalars"]["arrayInt"], [0, 1, 2])
+        self.assertEqual(set(payload["data"]["scalars"]), set(vars(self.sample)))
+
+    def test_get_schema(self):
+        converter = TopicConverter(
+            csc="Test",
+            salindex=1,
+            topic_name="scalars",
+            fields=self.make_fields(),
+            as_list=True,
+        )
+
+        schema = converter.get_schema()
+
+        self.assertEqual(schema["csc"], "Test")
+        self.assertEqual(
+            schema["data"]["scalars"]["double0"], dict(dataType="Float", units="deg")
+        )
+
+    def test_convert(self):
+        for as_list in (True, False):
+            with self.subTest(as_list=as_list):
+                converter = TopicConverter(
+                    csc="Test",
+                    salindex=1,
+                    topic_name="scalars",
+                    fields=self.make_fields(),
+                    as_list=as_list,
+                )
+
+                self.assertEqual(
+                    self.encoder.dumps(converter.convert(self.sample)),
+                    self.encoder.dumps(self.make_payload(as_list=as_list)),
+                )
+
+    def test_get_template(self):
+        converter = TopicConverter(
+            csc="Test",
+            salindex=1,
+            topic_name="scalars",
+            fields=self.make_fields(),
+            as_list=False,
+        )
+
+        self.assertEqual(
+            self.encoder.dumps(converter.get_template()),
+            self.encoder.dumps(converter.convert(self.default_sample)),
+        )
+        self.assertEqual(
+            self.encoder.dumps(converter.get_template(values_only=True)),
+            self.encoder.dumps(converter.convert_values(self.default_sample)),
+        )
+
+    def test_convert_single_field(self):
+        converter = TopicConverter(
+            csc="Test",
+            salindex=1,
+            topic_name="scalars",
+            fields=[("int0", 0, "Int", "")],
+            as_list=False,
+        )
+
+        self.assertEqual(
+            converter.convert(self.sample)["data"]["scalars"]["int0"]["value"], -5
+        )
+
+    def test_serialize_is_valid_json(self):
+        serializer = self.make_serializer(as_list=True)
+
+        payload = json.loads(serializer.serialize(self.sample, self.encoder))
+
+        self.assertEqual(payload["data"]["scalars"][0]["int0"]["value"], -5)
+        self.assertTrue(payload["data"]["scalars"][0]["boolean0"]["value"])
+        self.assertEqual(
+            payload["data"]["scalars"][0]["string0"]["value"], self.sample.string0
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
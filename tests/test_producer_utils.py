@@ -0,0 +1,89 @@
+# This file is part of LOVE-producer.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by Inria Chile and
+# the LSST Project (https://www.lsst.org).
+#
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership and dependencies.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import unittest
+
+from love.producer.producer_utils import (
+    get_topic_shard,
+    get_topic_shard_components,
+    parse_topic_shard,
+    parse_topic_shard_counts,
+)
+
+
+class TestProducerUtils(unittest.TestCase):
+    def test_get_topic_shard(self):
+        topic_names = [
+            "evt_heartbeat",
+            "evt_summaryState",
+            "evt_detailedState",
+            "evt_inPosition",
+            "tel_position",
+            "tel_velocity",
+            "tel_temperature",
+        ]
+
+        shards = [get_topic_shard(topic_names, index, 2) for index in range(2)]
+
+        self.assertEqual(
+            shards,
+            [
+                [
+                    "evt_heartbeat",
+                    "evt_summaryState",
+                    "tel_position",
+                    "tel_velocity",
+                    "evt_inPosition",
+                ],
+                ["tel_temperature", "evt_detailedState"],
+            ],
+        )
+        self.assertEqual(
+            sorted(get_topic_shard(topic_names, 0, 1)), sorted(topic_names)
+        )
+
+        with self.assertRaises(ValueError):
+            get_topic_shard(topic_names, 2, 2)
+
+    def test_topic_shard_components(self):
+        self.assertEqual(get_topic_shard_components("MTM1M3", 1), ["MTM1M3"])
+        self.assertEqual(
+            get_topic_shard_components("MTHexapod:1", 2),
+            ["MTHexapod:1@0/2", "MTHexapod:1@1/2"],
+        )
+
+        self.assertEqual(parse_topic_shard("MTM1M3"), ("MTM1M3", None))
+        self.assertEqual(parse_topic_shard("MTHexapod:1@1/2"), ("MTHexapod:1", (1, 2)))
+
+    def test_parse_topic_shard_counts(self):
+        self.assertEqual(
+            parse_topic_shard_counts(["MTM1M3=3", " MTHexapod:1=2", ""]),
+            {"MTM1M3": 3, "MTHexapod:1": 2},
+        )
+
+        for topic_shard in ("MTM1M3", "MTM1M3=", "=3", "MTM1M3=three", "MTM1M3=0"):
+            with self.subTest(topic_shard=topic_shard), self.assertRaises(ValueError):
+                parse_topic_shard_counts([topic_shard])
+
+
+if __name__ == "__main__":
+    unittest.main()